@@ -1,202 +1,412 @@
-# NOTE: Before running this script, update the file paths in the pd.read_csv() calls
+# NOTE: Before running this script, update the default paths of the *_charts() functions
 # to match the location of your Dataset_Election folder.
 # Example: Change 'data/Dataset_Election/...' to your actual path if needed.
 
-#Aditya Deshmukh 
+#Aditya Deshmukh
 # SUID: 668192355
 # Following code visualizes the Twitter, Facebook posts, and Facebook ads datasets for the 2024 US Presidential Election.
 # This script generates various plots to analyze the distribution of civic scores, sources, languages, and other relevant metrics.
 # It uses pandas for data manipulation and matplotlib for plotting.
+#
+# The charts are drawn from compact aggregates, not from the rows themselves:
+# fixed-bin histogram counts and box-plot quartiles of the score columns and
+# value counts of the categorical ones, computed in one chunked pass over the
+# CSV (chart_aggregates) and cached next to the other parsed tables (cache.py),
+# so a multi-GB input needs one streaming pass and small memory, once. Box-plot
+# quartiles can also come from statistics files written with
+# run_analysis.py --stats (stats_output.py). Whiskers and outliers are drawn
+# as DataFrame.boxplot draws them, from the TAIL_VALUES smallest and largest
+# distinct values of each score column.
+#
+# Each visualize_* function collects its charts as (dataset, name, chart
+# function, arguments) specs. By default they are drawn and shown one by one; with an
+# export_dir they are instead drawn headless (Agg backend) in a process pool,
+# saved as PNG and/or SVG files there, and listed in export_dir/manifest.json:
+#   python Visualizations.py --export charts/ --formats png svg --workers 4
+# --trace PATH records the time and peak memory of the aggregate and render
+# stages (instrument.py).
 
 
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from cache import CACHE_DIR, cached
+from instrument import enable as enable_trace, traced
+from pandas_stats import SCHEMAS, ChunkedStats, read_dataset
+from stats_output import read_stats
+
+FORMATS = ('png', 'svg')
+MANIFEST = 'manifest.json'
+
+# Score columns and categorical columns charted per dataset
+CHART_COLUMNS = {
+    'twitter': (['incivility_illuminating', 'scam_illuminating', 'freefair_illuminating', 'fraud_illuminating'],
+                ['source', 'lang', 'month_year']),
+    'fb_posts': (['incivility_illuminating', 'scam_illuminating', 'freefair_illuminating', 'fraud_illuminating'],
+                 ['page_category', 'admin_country', 'type', 'month_year']),
+    'fb_ads': (['incivility_illuminating', 'scam_illuminating', 'freefair_illuminating', 'fraud_illuminating'],
+               ['currency', 'delivery_platform', 'month_year']),
+}
+# *_illuminating scores lie in [0, 1]; histograms use BINS equal bins over
+# SCORE_RANGE (values outside it count in the first / last bin)
+SCORE_RANGE = (0.0, 1.0)
+BINS = 20
+# Most frequent values kept per categorical column
+COUNT_LIMIT = 100
+# Smallest and largest distinct values kept per score column for the box
+# whiskers and outliers
+TAIL_VALUES = 1000
+
 # -------------------------------
-# Twitter Posts Visualizations
+# Aggregates
 # -------------------------------
 
-def visualize_twitter():
-    # Columns to load from Twitter dataset
-    cols = [
-        'incivility_illuminating',
-        'scam_illuminating',
-        'freefair_illuminating',
-        'fraud_illuminating',
-        'source',
-        'lang',
-        'month_year'
-    ]
-    # Load data
-    df = pd.read_csv(
-        'data/Dataset_Election/2024_tw_posts_president_scored_anon.csv',  # <-- Update this path if needed
-        usecols=cols,
-        dtype=str
-    ).dropna(how='all')
-
-    # Convert score columns to numeric
-    score_cols = cols[:4]
-    for c in score_cols:
-        df[c] = pd.to_numeric(df[c], errors='coerce')
-
-    # Plot histogram for incivility score
-    plt.figure()
-    df['incivility_illuminating'].hist(bins=20)
-    plt.title('Incivility Score Distribution (Twitter)')
-    plt.xlabel('incivility_illuminating')
-    plt.ylabel('Count')
-    plt.tight_layout()
-    plt.show()
+def compute_aggregates(path, dataset, chunksize=100_000, bins=BINS):
 
-    # Boxplot for all score columns
-    plt.figure()
-    df[score_cols].boxplot()
-    plt.title('Boxplot of Civic-Score Metrics (Twitter)')
-    plt.tight_layout()
-    plt.show()
-
-    # Top-10 Tweet sources
-    plt.figure()
-    df['source'].value_counts().nlargest(10).plot(kind='bar')
-    plt.title('Top 10 Tweet Sources')
-    plt.xlabel('Source')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
-
-    # Language distribution
-    plt.figure()
-    df['lang'].value_counts().plot(kind='bar')
-    plt.title('Language Distribution')
-    plt.xlabel('Language')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.show()
-
-    # Tweets by month-year
-    plt.figure()
-    df['month_year'].value_counts().sort_index().plot(kind='bar')
-    plt.title('Tweets per Month–Year')
-    plt.xlabel('Month–Year')
-    plt.ylabel('Count')
+    # One chunked pass over a dataset CSV, reading only the charted columns:
+    #   rows        rows with any charted value
+    #   edges       histogram bin edges (bins + 1)
+    #   histograms  {score column: count per bin}
+    #   boxes       {score column: {min, q1, med, q3, max, tails, whislo,
+    #               whishi, fliers}}, quartiles from pandas_stats.ChunkedStats
+    #               (exact up to its sketch size), tails the column's extreme
+    #               distinct values, whiskers and fliers from box_whiskers
+    #   counts      {categorical column: {value: count}}, COUNT_LIMIT most frequent
+    # Everything is plain lists and dicts, so it can be stored as JSON.
+
+    scores, categorical = CHART_COLUMNS[dataset]
+    wanted = set(scores + categorical)
+    edges = np.linspace(*SCORE_RANGE, bins + 1)
+    histograms = {}
+    counts = {}
+    tails = {}
+    box = None
+    rows = 0
+    chunks = read_dataset(path, SCHEMAS[dataset], chunksize=chunksize, usecols=lambda c: c in wanted,
+                          encoding='utf-8')
+    for chunk in chunks:
+        rows += len(chunk)
+        present = [c for c in scores if c in chunk.columns]
+        if box is None:
+            box = ChunkedStats([], present, [])
+        box.add(chunk[present])
+        for col in present:
+            values = chunk[col].dropna().to_numpy(dtype=float)
+            tails[col] = keep_tails(np.union1d(tails.get(col, values[:0]), values))
+            histograms[col] = histograms.get(col, 0) + np.histogram(values.clip(*SCORE_RANGE), bins=edges)[0]
+        for col in (c for c in categorical if c in chunk.columns):
+            vc = chunk[col].value_counts()
+            vc.index = vc.index.astype(object)
+            counts[col] = vc if col not in counts else counts[col].add(vc, fill_value=0)
+    boxes = {}
+    if box is not None:
+        stats = box.result().droplevel(0)
+        for col, s in stats.iterrows():
+            if s['count'] > 0:
+                b = {k: float(s[name]) for k, name in
+                     [('min', 'min'), ('q1', '25%'), ('med', '50%'), ('q3', '75%'), ('max', 'max')]}
+                boxes[col] = box_whiskers(dict(b, tails=tails[col].tolist()))
+    return {
+        'rows': rows,
+        'edges': edges.tolist(),
+        'histograms': {col: h.tolist() for col, h in histograms.items()},
+        'boxes': boxes,
+        'counts': {col: {str(v): int(n) for v, n in vc[vc > 0].sort_values(ascending=False, kind='stable')
+                         .head(COUNT_LIMIT).items()}
+                   for col, vc in counts.items()},
+    }
+
+def keep_tails(values, n=TAIL_VALUES):
+    # The n smallest and n largest of sorted distinct values
+    return values if len(values) <= 2 * n else np.concatenate([values[:n], values[-n:]])
+
+def box_whiskers(box):
+
+    # box with whislo / whishi / fliers added the way matplotlib's boxplot
+    # places them: whiskers at the most extreme values within 1.5 IQR of the
+    # box, every value past them an outlier. The values are the box's tails
+    # (just min and max when it has none); when one side's tail lies wholly
+    # past its fence the whisker stops at the fence and only the tail's
+    # values are drawn as outliers.
+
+    values = np.asarray(box.get('tails', [box['min'], box['max']]), dtype=float)
+    iqr = box['q3'] - box['q1']
+    lo, hi = box['q1'] - 1.5 * iqr, box['q3'] + 1.5 * iqr
+    inside = values[(values >= lo) & (values <= hi)]
+    whislo = min(inside.min(), box['q1']) if len(inside) else lo
+    whishi = max(inside.max(), box['q3']) if len(inside) else hi
+    fliers = values[(values < lo) | (values > hi)]
+    return dict(box, whislo=float(whislo), whishi=float(whishi), fliers=fliers.tolist())
+
+def write_json(obj, path):
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(obj, fh)
+
+def read_json(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+@traced('aggregates', rows=lambda agg: agg['rows'])
+def chart_aggregates(path, dataset, cache_dir=CACHE_DIR, chunksize=100_000):
+    # compute_aggregates through the on-disk cache in cache.py: the aggregates
+    # are recomputed only when the CSV changes.
+    if cache_dir is None:
+        return compute_aggregates(path, dataset, chunksize)
+    return cached(path, f'charts-{dataset}', lambda: compute_aggregates(path, dataset, chunksize),
+                  write_json, read_json, cache_dir, '.charts.json')
+
+def boxes_from_stats(stats_path, dataset):
+    # Box-plot quartiles of the score columns from the overall records of a
+    # statistics file (stats_output.py), for the datasets recorded in it.
+    scores, _ = CHART_COLUMNS[dataset]
+    boxes = {}
+    for record in read_stats(stats_path):
+        if record['dataset'] != dataset or record['grouping'] or record['column'] not in scores:
+            continue
+        box = {'min': record['min'], 'q1': record['p25'], 'med': record['p50'], 'q3': record['p75'],
+               'max': record['max']}
+        if None not in box.values():
+            boxes[record['column']] = box
+    return boxes
+
+def load_aggregates(path, dataset, cache_dir=CACHE_DIR, stats_paths=()):
+    # chart_aggregates, with box quartiles from the statistics files in
+    # stats_paths where they have them
+    agg = chart_aggregates(path, dataset, cache_dir)
+    for stats_path in stats_paths:
+        for col, box in boxes_from_stats(stats_path, dataset).items():
+            tails = agg['boxes'].get(col, {}).get('tails')
+            agg['boxes'][col] = box_whiskers(box if tails is None else dict(box, tails=tails))
+    return agg
+
+def top_counts(agg, col, n=None):
+    # A categorical column's counts as a Series, most frequent first (n of them)
+    counts = pd.Series(agg['counts'].get(col, {}), dtype='int64')
+    return counts if n is None else counts.head(n)
+
+# -------------------------------
+# Chart functions
+# -------------------------------
+# Each draws one figure from small, picklable aggregates and returns it,
+# so that it can run in a worker process as well as in this one.
+
+def draw_histogram(ax, edges, counts):
+    # Bars of precomputed bin counts, drawn the way Series.hist() draws them
+    ax.hist(edges[:-1], bins=edges, weights=counts)
+    ax.grid(True)
+
+def histogram_chart(edges, counts, title, xlabel):
+    # Histogram of one numeric column
+    fig, ax = plt.subplots()
+    draw_histogram(ax, edges, counts)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Count')
+    fig.tight_layout()
+    return fig
+
+def histogram_grid_chart(edges, histograms, title):
+    # One histogram per column, side by side
+    fig, axes = plt.subplots(1, len(histograms), figsize=(12, 4), squeeze=False)
+    for ax, (col, counts) in zip(axes[0], histograms.items()):
+        ax.hist(edges[:-1], bins=edges, weights=counts, edgecolor='black')
+        ax.grid(True)
+        ax.set_title(col)
+    fig.suptitle(title)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+    return fig
+
+def box_chart(boxes, title):
+    # Boxplot of every column from its quartiles, whiskers and outliers
+    # (box_whiskers)
+    fig, ax = plt.subplots()
+    stats = []
+    for col, b in boxes.items():
+        b = b if 'fliers' in b else box_whiskers(b)
+        stats.append({'label': col, 'med': b['med'], 'q1': b['q1'], 'q3': b['q3'],
+                      'whislo': b['whislo'], 'whishi': b['whishi'], 'fliers': b['fliers']})
+    if stats:
+        ax.bxp(stats, showfliers=True)
+    ax.grid(True)
+    ax.set_title(title)
+    fig.tight_layout()
+    return fig
+
+def bar_chart(counts, title, xlabel=None, ylabel=None):
+    # Bar chart of value counts
+    fig = plt.figure()
+    counts.plot(kind='bar')
+    plt.title(title)
+    if xlabel:
+        plt.xlabel(xlabel)
+    if ylabel:
+        plt.ylabel(ylabel)
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
-    plt.show()
+    return fig
 
 # -------------------------------
-# Facebook Posts Visualizations
+# Rendering
 # -------------------------------
 
-def visualize_fb_posts():
-    # Columns to load from Facebook Posts dataset
-    cols = [
-        'incivility_illuminating',
-        'scam_illuminating',
-        'freefair_illuminating',
-        'fraud_illuminating',
-        'page_category',
-        'admin_country',
-        'type',
-        'month_year'
+def use_headless_backend():
+    # Draw without a display (batch jobs, worker processes).
+    plt.switch_backend('Agg')
+
+def save_chart(spec, export_dir, formats):
+    # Draw one (dataset, name, chart function, arguments) spec and save it in
+    # each format; returns its manifest entry.
+    dataset, name, chart, args = spec
+    fig = chart(*args)
+    files = []
+    for fmt in formats:
+        path = os.path.join(export_dir, f'{dataset}_{name}.{fmt}')
+        fig.savefig(path, format=fmt)
+        files.append(path)
+    title = fig.get_suptitle() or fig.axes[0].get_title()
+    plt.close(fig)
+    return {'dataset': dataset, 'chart': name, 'title': title, 'files': files}
+
+def _save_chart(args):
+    return save_chart(*args)
+
+@traced('render')
+def render_charts(specs, export_dir=None, formats=('png',), workers=None):
+
+    # Show the charts one by one (export_dir None), or save them headless to
+    # export_dir: in a pool of `workers` processes (all cores by default, one
+    # draws in this process) and with a manifest.json listing every chart and
+    # its files. Returns the manifest entries ([] when showing).
+
+    if export_dir is None:
+        for _, _, chart, args in specs:
+            chart(*args)
+            plt.show()
+        return []
+    os.makedirs(export_dir, exist_ok=True)
+    jobs = [(spec, export_dir, formats) for spec in specs]
+    if workers == 1:
+        use_headless_backend()
+        entries = [_save_chart(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers, initializer=use_headless_backend) as pool:
+            entries = list(pool.map(_save_chart, jobs))
+    tmp_path = os.path.join(export_dir, MANIFEST + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(entries, fh, indent=2)
+    os.replace(tmp_path, os.path.join(export_dir, MANIFEST))
+    return entries
+
+# -------------------------------
+# Twitter Posts Visualizations
+# -------------------------------
+
+# <-- Update this path if needed
+def twitter_charts(path='data/Dataset_Election/2024_tw_posts_president_scored_anon.csv', cache_dir=CACHE_DIR,
+                   stats_paths=()):
+    agg = load_aggregates(path, 'twitter', cache_dir, stats_paths)
+    edges, hist = agg['edges'], agg['histograms']
+    specs = []
+    # Histogram for incivility score
+    if 'incivility_illuminating' in hist:
+        specs.append(('twitter', 'incivility_hist', histogram_chart,
+                      (edges, hist['incivility_illuminating'], 'Incivility Score Distribution (Twitter)',
+                       'incivility_illuminating')))
+    return specs + [
+        # Boxplot for all score columns
+        ('twitter', 'score_box', box_chart, (agg['boxes'], 'Boxplot of Civic-Score Metrics (Twitter)')),
+        # Top-10 Tweet sources
+        ('twitter', 'top_sources', bar_chart, (top_counts(agg, 'source', 10), 'Top 10 Tweet Sources', 'Source', 'Count')),
+        # Language distribution
+        ('twitter', 'languages', bar_chart, (top_counts(agg, 'lang'), 'Language Distribution', 'Language', 'Count')),
+        # Tweets by month-year
+        ('twitter', 'month_year', bar_chart,
+         (top_counts(agg, 'month_year').sort_index(), 'Tweets per Month–Year', 'Month–Year', 'Count')),
     ]
-    # Load data
-    df = pd.read_csv(
-        'data/Dataset_Election/2024_fb_posts_president_scored_anon.csv',  # <-- Update this path if needed
-        usecols=cols,
-        dtype=str
-    ).dropna(how='all')
-
-    # Convert score columns to numeric
-    score_cols = cols[:4]
-    for c in score_cols:
-        df[c] = pd.to_numeric(df[c], errors='coerce')
-
-    # Histogram for score columns
-    plt.figure(figsize=(12,4))
-    df[score_cols].hist(bins=20, layout=(1, len(score_cols)), edgecolor='black')
-    plt.suptitle('Facebook Posts — Score Distributions')
-    plt.tight_layout(rect=[0,0.03,1,0.95])
-    plt.show()
-
-    # Boxplot for score columns
-    plt.figure()
-    df[score_cols].boxplot()
-    plt.title('Facebook Posts — Score Boxplots')
-    plt.tight_layout()
-    plt.show()
 
+def visualize_twitter(export_dir=None, formats=('png',), workers=None):
+    return render_charts(twitter_charts(), export_dir, formats, workers)
+
+# -------------------------------
+# Facebook Posts Visualizations
+# -------------------------------
+
+# <-- Update this path if needed
+def fb_posts_charts(path='data/Dataset_Election/2024_fb_posts_president_scored_anon.csv', cache_dir=CACHE_DIR,
+                    stats_paths=()):
+    agg = load_aggregates(path, 'fb_posts', cache_dir, stats_paths)
+    specs = [
+        # Histogram for score columns
+        ('fb_posts', 'score_hist', histogram_grid_chart,
+         (agg['edges'], agg['histograms'], 'Facebook Posts — Score Distributions')),
+        # Boxplot for score columns
+        ('fb_posts', 'score_box', box_chart, (agg['boxes'], 'Facebook Posts — Score Boxplots')),
+    ]
     # Top 10 for categorical columns
     for col in ['page_category','admin_country','type','month_year']:
-        if col in df.columns:
-            plt.figure()
-            df[col].value_counts().nlargest(10).plot(kind='bar')
-            plt.title(f'Facebook Posts — Top 10 {col}')
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.show()
+        if col in agg['counts']:
+            specs.append(('fb_posts', f'top_{col}', bar_chart,
+                          (top_counts(agg, col, 10), f'Facebook Posts — Top 10 {col}')))
+    return specs
+
+def visualize_fb_posts(export_dir=None, formats=('png',), workers=None):
+    return render_charts(fb_posts_charts(), export_dir, formats, workers)
 
 # -------------------------------
 # Facebook Ads Visualizations
 # -------------------------------
 
-def visualize_fb_ads():
-    # Columns to load from Facebook Ads dataset
-    cols = [
-        'incivility_illuminating',
-        'scam_illuminating',
-        'freefair_illuminating',
-        'fraud_illuminating',
-        'womens_issue_topic_illuminating',
-        'currency',
-        'delivery_platform',
-        'month_year'
+# <-- Update this path if needed
+def fb_ads_charts(path='data/Dataset_Election/2024_fb_ads_president_scored_anon.csv', cache_dir=CACHE_DIR,
+                  stats_paths=()):
+    agg = load_aggregates(path, 'fb_ads', cache_dir, stats_paths)
+    specs = [
+        # Histogram for score columns
+        ('fb_ads', 'score_hist', histogram_grid_chart,
+         (agg['edges'], agg['histograms'], 'Facebook Ads — Score Distributions')),
+        # Boxplot for score columns
+        ('fb_ads', 'score_box', box_chart, (agg['boxes'], 'Facebook Ads — Score Boxplots')),
     ]
-    # Load data
-    df = pd.read_csv(
-        'data/Dataset_Election/2024_fb_ads_president_scored_anon.csv',  # <-- Update this path if needed
-        usecols=cols,
-        dtype=str
-    ).dropna(how='all')
-
-    # Convert score columns to numeric
-    score_cols = cols[:4]
-    for c in score_cols:
-        df[c] = pd.to_numeric(df[c], errors='coerce')
-
-    # Histogram for score columns
-    plt.figure(figsize=(12,4))
-    df[score_cols].hist(bins=20, layout=(1, len(score_cols)), edgecolor='black')
-    plt.suptitle('Facebook Ads — Score Distributions')
-    plt.tight_layout(rect=[0,0.03,1,0.95])
-    plt.show()
-
-    # Boxplot for score columns
-    plt.figure()
-    df[score_cols].boxplot()
-    plt.title('Facebook Ads — Score Boxplots')
-    plt.tight_layout()
-    plt.show()
-
     # Top 10 for categorical columns
     for col in ['currency','delivery_platform','month_year']:
-        if col in df.columns:
-            plt.figure()
-            df[col].value_counts().nlargest(10).plot(kind='bar')
-            plt.title(f'Facebook Ads — Top 10 {col}')
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.show()
+        if col in agg['counts']:
+            specs.append(('fb_ads', f'top_{col}', bar_chart,
+                          (top_counts(agg, col, 10), f'Facebook Ads — Top 10 {col}')))
+    return specs
+
+def visualize_fb_ads(export_dir=None, formats=('png',), workers=None):
+    return render_charts(fb_ads_charts(), export_dir, formats, workers)
 
 # -------------------------------
 # Main: Run all visualizations
 # -------------------------------
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Charts for the 2024 election datasets.')
+    parser.add_argument('--export', metavar='DIR', help='save the charts headless to DIR instead of showing them')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['png'], help='file formats for --export')
+    parser.add_argument('--workers', type=int, default=None, help='processes drawing charts (default: all cores)')
+    parser.add_argument('--stats', nargs='+', default=(), metavar='FILE',
+                        help='take box-plot quartiles from these statistics files (run_analysis.py --stats)')
+    parser.add_argument('--no-cache', action='store_true', help='recompute the chart aggregates')
+    parser.add_argument('--trace', metavar='PATH', help='write per-stage timings and peak memory here (JSON)')
+    args = parser.parse_args(argv)
+    if args.trace:
+        enable_trace(args.trace)
+
+    # Twitter posts, Facebook posts and Facebook ads; exported charts are all
+    # drawn in one pool and listed in one manifest
+    options = {'cache_dir': None if args.no_cache else CACHE_DIR, 'stats_paths': args.stats}
+    specs = twitter_charts(**options) + fb_posts_charts(**options) + fb_ads_charts(**options)
+    entries = render_charts(specs, args.export, tuple(args.formats), args.workers)
+    if args.export:
+        print(f"{len(entries)} charts written to {args.export} (see {MANIFEST})")
+
 if __name__ == '__main__':
-    # Visualize Twitter posts
-    visualize_twitter()
-    # Visualize Facebook posts
-    visualize_fb_posts()
-    # Visualize Facebook ads
-    visualize_fb_ads()
+    main()
@@ -0,0 +1,368 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Benchmark harness for the three implementations of the analysis
+# (pure_python_stats, pandas_stats, polars_stats).
+# - Generates synthetic CSVs with the fb_ads, fb_posts and twitter schemas
+#   (group keys at realistic cardinalities, *_illuminating score columns,
+#   blank cells), from 10k up to 10M rows, cached in a data directory
+# - Runs each engine's load, overall and grouped stages in a fresh process
+#   and records wall time, CPU time, rows/sec and peak RSS per stage
+# - Writes the results as JSON so runs can be compared between versions
+#
+# Examples:
+#   python benchmark.py --sizes 10000 100000 --engines pure polars
+#   python benchmark.py --compare old_results.json
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import subprocess
+import time
+
+from dataset_registry import DATASETS as REGISTRY
+from instrument import peak_rss_mb, reset_peak_rss
+
+# =========================
+# Synthetic Datasets
+# =========================
+
+# Score columns shared by all three datasets. Most are sparse 0/1 labels.
+ILLUMINATING = [
+    'advocacy_msg_type_illuminating', 'issue_msg_type_illuminating',
+    'attack_msg_type_illuminating', 'image_msg_type_illuminating',
+    'cta_msg_type_illuminating', 'engagement_cta_subtype_illuminating',
+    'fundraising_cta_subtype_illuminating', 'voting_cta_subtype_illuminating',
+    'covid_topic_illuminating', 'economy_topic_illuminating',
+    'education_topic_illuminating', 'environment_topic_illuminating',
+    'foreign_policy_topic_illuminating', 'governance_topic_illuminating',
+    'health_topic_illuminating', 'immigration_topic_illuminating',
+    'lgbtq_issues_topic_illuminating', 'military_topic_illuminating',
+    'race_and_ethnicity_topic_illuminating', 'safety_topic_illuminating',
+    'social_and_cultural_topic_illuminating', 'technology_and_privacy_topic_illuminating',
+    'womens_issue_topic_illuminating', 'incivility_illuminating',
+    'scam_illuminating', 'freefair_illuminating', 'fraud_illuminating',
+]
+
+# Share of rows labelled 1 for the score columns the README reports on;
+# the remaining topics use 5%.
+SCORE_RATES = {
+    'incivility_illuminating': 0.18, 'scam_illuminating': 0.01,
+    'freefair_illuminating': 0.002, 'fraud_illuminating': 0.005,
+    'womens_issue_topic_illuminating': 0.08,
+}
+
+MONTHS = ['2024-0%d' % m for m in range(1, 10)] + ['2024-10', '2024-11']
+MONTH_WEIGHTS = [2, 2, 3, 3, 4, 5, 6, 7, 9, 14, 3]
+
+
+def _key(prefix, rng, groups):
+    # Skewed group key: low-numbered groups get most of the rows.
+    return f'{prefix}{int(groups * rng.random() ** 2)}'
+
+
+def _choice(values, weights=None):
+    return lambda rng, i, n: rng.choices(values, weights)[0]
+
+
+def _count(scale, blank=0.0):
+    # Long-tailed integer metric (interactions, spend, views ...).
+    def gen(rng, i, n):
+        if blank and rng.random() < blank:
+            return ''
+        return str(int(rng.paretovariate(1.2) * scale) - scale)
+    return gen
+
+
+def _score(rate):
+    def gen(rng, i, n):
+        r = rng.random()
+        if r < 0.01:
+            return ''
+        return '1' if r < 0.01 + rate else '0'
+    return gen
+
+
+SCORES = [(col, _score(SCORE_RATES.get(col, 0.05))) for col in ILLUMINATING]
+
+# dataset -> columns [(name, generator(rng, row index, total rows) -> str)]
+# and the key sets the analyses group by (from dataset_registry). Cardinalities follow the real
+# files: ~55 ads per page, ~13 posts per Facebook page, one ad/post/tweet per id.
+DATASETS = {
+    'fb_ads': {
+        'columns': [
+            ('page_id', lambda rng, i, n: _key('', rng, max(1, n // 55))),
+            ('ad_id', lambda rng, i, n: str(7_000_000_000 + i)),
+            ('ad_creation_time', lambda rng, i, n: '2024-%02d-%02d' % (rng.randint(1, 11), rng.randint(1, 28))),
+            ('bylines', lambda rng, i, n: _key('Committee ', rng, max(1, n // 40))),
+            ('currency', _choice(['USD', 'EUR', 'GBP', 'CAD', 'AUD', ''], [82, 5, 4, 4, 3, 2])),
+            ('delivery_by_region', lambda rng, i, n: _key('region_mix_', rng, max(1, n // 2))),
+            ('demographic_distribution', lambda rng, i, n: _key('demo_mix_', rng, n)),
+            ('estimated_audience_size', _count(1000, blank=0.05)),
+            ('estimated_impressions', _count(500)),
+            ('estimated_spend', _count(100)),
+            ('delivery_platform', _choice(['Facebook, Instagram', 'Facebook', 'Instagram',
+                                           'Facebook, Instagram, Messenger'], [87, 8, 3, 2])),
+            ('month_year', _choice(MONTHS, MONTH_WEIGHTS)),
+        ] + SCORES,
+        'keys': REGISTRY['fb_ads']['keys'],
+    },
+    'fb_posts': {
+        'columns': [
+            ('Facebook_Id', lambda rng, i, n: _key('', rng, max(1, n // 13))),
+            ('post_id', lambda rng, i, n: str(9_100_000_000 + i)),
+            ('page_category', _choice(['PERSON', 'ACTOR', 'POLITICIAN', 'NEWS_SITE', 'COMMUNITY', ''],
+                                      [50, 17, 14, 3, 3, 13])),
+            ('admin_country', _choice(['US', ''], [86, 14])),
+            ('type', _choice(['Link', 'Photo', 'Native Video', 'Live Video', 'Status'], [39, 20, 15, 14, 12])),
+            ('Total Interactions', _count(50)),
+            ('Likes', _count(30)),
+            ('Comments', _count(10)),
+            ('Shares', _count(10)),
+            ('month_year', _choice(MONTHS, MONTH_WEIGHTS)),
+        ] + SCORES,
+        'keys': REGISTRY['fb_posts']['keys'],
+    },
+    'twitter': {
+        'columns': [
+            ('id', lambda rng, i, n: str(1_800_000_000_000_000_000 + i)),
+            ('url', lambda rng, i, n: f'https://x.com/user/status/{1_800_000_000_000_000_000 + i}'),
+            ('source', _choice(['Twitter Web App', 'Sprout Social', 'Media Studio', 'Twitter for iPhone',
+                                'Twitter for Android'], [55, 11, 2, 20, 12])),
+            ('lang', _choice(['en', 'es', 'und', ''], [999, 1, 1, 1])),
+            ('retweetCount', _count(20)),
+            ('replyCount', _count(5)),
+            ('likeCount', _count(60)),
+            ('viewCount', _count(2000, blank=0.1)),
+            ('month_year', _choice(MONTHS, MONTH_WEIGHTS)),
+        ] + SCORES,
+        'keys': REGISTRY['twitter']['keys'],
+    },
+}
+
+
+def generate(dataset, rows, path, seed=0):
+
+    # Write a synthetic CSV of `rows` rows for one dataset schema.
+
+    columns = DATASETS[dataset]['columns']
+    rng = random.Random(f'{dataset}:{seed}')
+    tmp = path + '.part'
+    with open(tmp, 'w', newline='', encoding='utf-8', buffering=1 << 20) as fh:
+        writer = csv.writer(fh)
+        writer.writerow([name for name, _ in columns])
+        gens = [gen for _, gen in columns]
+        writer.writerows([gen(rng, i, rows) for gen in gens] for i in range(rows))
+    os.replace(tmp, path)
+
+
+def dataset_path(data_dir, dataset, rows, seed=0):
+    # Path of the cached synthetic file, generating it on first use.
+    path = os.path.join(data_dir, f'{dataset}_{rows}_s{seed}.csv')
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Generating {path}")
+        generate(dataset, rows, path, seed)
+    return path
+
+# =========================
+# Measurement
+# =========================
+
+class Recorder:
+    """Times stages in the benchmark child and reports each one as it finishes."""
+
+    def __init__(self, report, engine, dataset, rows):
+        self.report = report
+        self.base = {'engine': engine, 'dataset': dataset, 'rows': rows}
+
+    def stage(self, name, fn):
+        reset_peak_rss()
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = fn()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        self.report({
+            **self.base, 'stage': name, 'status': 'ok',
+            'seconds': round(wall, 4), 'cpu_seconds': round(cpu, 4),
+            'rows_per_sec': round(self.base['rows'] / wall) if wall else None,
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+        })
+        return result
+
+# =========================
+# Engine Stages
+# =========================
+
+PANDAS_FUNCTIONS = {
+    # dataset -> (loader, overall writer, grouped writer) in pandas_stats
+    'fb_ads': ('load_and_clean_fb_ads', 'overall_stats_fb_ads', 'grouped_stats_fb_ads'),
+    'fb_posts': ('load_and_clean_fb_posts', 'write_overall_stats_fb_posts', 'write_group_stats_fb_posts'),
+    'twitter': ('load_and_clean_twitter', 'write_overall_stats_twitter', 'write_group_stats_twitter'),
+}
+
+
+def bench_pure(rec, dataset, path):
+    import pure_python_stats as pps
+    key_sets = DATASETS[dataset]['keys']
+    keep = {k for keys in key_sets for k in keys}
+    table = rec.stage('load', lambda: pps.load_typed(path, keep_text=keep))
+    rec.stage('overall', lambda: pps.typed_overall_summary(table))
+
+    def grouped():
+        levels = pps.typed_group_accumulators(table, key_sets)
+        sections = [(str(keys), ', '.join(f'{k} = {{}}' for k in keys),
+                     pps.iter_group_stats(groups, table.header))
+                    for keys, groups in zip(key_sets, levels)]
+        pps.write_report(os.devnull, dataset, {}, sections)
+    rec.stage('grouped', grouped)
+
+
+def bench_pandas(rec, dataset, path):
+    import pandas_stats
+    load, overall, grouped = (getattr(pandas_stats, name) for name in PANDAS_FUNCTIONS[dataset])
+    df = rec.stage('load', lambda: load(path))
+    with open(os.devnull, 'w') as out:
+        rec.stage('overall', lambda: overall(df, out))
+        rec.stage('grouped', lambda: [grouped(df, keys, out) for keys in DATASETS[dataset]['keys']])
+
+
+def bench_polars(rec, dataset, path):
+    import polars_stats
+    df = rec.stage('load', lambda: polars_stats.load_and_clean(path))
+    with open(os.devnull, 'w') as out:
+        rec.stage('overall', lambda: polars_stats.overall_stats(df, out))
+        rec.stage('grouped', lambda: [polars_stats.group_stats(df, keys, out)
+                                      for keys in DATASETS[dataset]['keys']])
+
+
+ENGINES = {'pure': bench_pure, 'pandas': bench_pandas, 'polars': bench_polars}
+
+
+def _bench_child(engine, dataset, path, rows, results):
+    # Runs in a fresh process so one engine's memory does not show up in another's peak.
+    rec = Recorder(results.put, engine, dataset, rows)
+    try:
+        ENGINES[engine](rec, dataset, path)
+    except ImportError as exc:
+        results.put({**rec.base, 'stage': None, 'status': 'unavailable', 'error': str(exc)})
+    except Exception as exc:
+        results.put({**rec.base, 'stage': None, 'status': 'error', 'error': repr(exc)})
+    results.put(None)
+
+
+def run_isolated(engine, dataset, path, rows, timeout=None):
+
+    # Run one engine on one file in a child process and collect its stage
+    # records. A run that exceeds `timeout` seconds is killed; the stages it
+    # finished are kept and a 'timeout' record marks where it stopped.
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    proc = ctx.Process(target=_bench_child, args=(engine, dataset, path, rows, results))
+    proc.start()
+    deadline = time.monotonic() + timeout if timeout else None
+    records = []
+    while True:
+        try:
+            item = results.get(timeout=1)
+        except queue.Empty:
+            if not proc.is_alive():
+                records.append({'engine': engine, 'dataset': dataset, 'rows': rows, 'stage': None,
+                                'status': 'error', 'error': f'exit code {proc.exitcode}'})
+                print_record(records[-1])
+                break
+            if deadline and time.monotonic() > deadline:
+                proc.terminate()
+                records.append({'engine': engine, 'dataset': dataset, 'rows': rows, 'stage': None,
+                                'status': 'timeout', 'error': f'exceeded {timeout}s'})
+                print_record(records[-1])
+                break
+            continue
+        if item is None:
+            break
+        records.append(item)
+        print_record(item)
+    proc.join()
+    return records
+
+
+def print_record(r):
+    if r['status'] == 'ok':
+        print(f"  {r['engine']:7} {r['dataset']:9} {r['rows']:>10,} {r['stage']:8} "
+              f"{r['seconds']:9.3f}s {r['rows_per_sec'] or 0:>12,} rows/s "
+              f"{r['peak_rss_mb']:9.1f} MB")
+    else:
+        print(f"  {r['engine']:7} {r['dataset']:9} {r['rows']:>10,} {r['status']}: {r['error']}")
+
+# =========================
+# Results
+# =========================
+
+def environment():
+    # Versions that matter when comparing result files.
+    info = {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    for lib in ('pandas', 'polars'):
+        try:
+            info[lib] = __import__(lib).__version__
+        except ImportError:
+            info[lib] = None
+    try:
+        info['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                        text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+                                        ).stdout.strip() or None
+    except OSError:
+        info['commit'] = None
+    return info
+
+
+def compare(baseline_path, results):
+
+    # Print the wall-time ratio (new / baseline) for every stage present in
+    # both result sets; below 1.0 means the new run is faster.
+
+    with open(baseline_path, encoding='utf-8') as fh:
+        baseline = json.load(fh)
+    key = lambda r: (r['engine'], r['dataset'], r['rows'], r['stage'])
+    old = {key(r): r for r in baseline['results'] if r['status'] == 'ok'}
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    for r in results:
+        base = old.get(key(r))
+        if r['status'] == 'ok' and base and base['seconds']:
+            print(f"  {r['engine']:7} {r['dataset']:9} {r['rows']:>10,} {r['stage']:8} "
+                  f"{base['seconds']:9.3f}s -> {r['seconds']:9.3f}s  x{r['seconds'] / base['seconds']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pure Python, pandas and polars engines.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--datasets', nargs='+', choices=sorted(DATASETS), default=sorted(DATASETS))
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=['pure', 'pandas', 'polars'])
+    parser.add_argument('--data-dir', default='bench_data', help='where synthetic CSVs are cached')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=None, help='seconds allowed per engine run')
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--compare', metavar='BASELINE', help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in sorted(args.sizes):
+        for dataset in args.datasets:
+            path = dataset_path(args.data_dir, dataset, rows, args.seed)
+            for engine in args.engines:
+                results.extend(run_isolated(engine, dataset, path, rows, args.timeout))
+
+    with open(args.out, 'w', encoding='utf-8') as fh:
+        json.dump({'environment': environment(), 'seed': args.seed, 'results': results}, fh, indent=1)
+    print(f"\nResults written to {args.out}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
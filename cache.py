@@ -0,0 +1,120 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# On-disk cache of parsed and cleaned datasets, shared by the analysis scripts.
+# Parsing the CSV is the biggest single cost of a run, so the first run of an
+# engine stores the table it builds in a columnar file next to a small JSON
+# manifest describing the source file (size, mtime and a content hash), and
+# later runs read that file instead while the source is unchanged:
+#   - polars: Arrow IPC, memory-mapped, only the requested columns are read
+#   - pandas: Parquet when pyarrow is installed, so column subsets are read on
+#     their own; a pickled frame otherwise
+#   - Visualizations: the JSON chart aggregates (histogram counts, quartiles,
+#     value counts)
+#   - pure Python: the pickled TypedTable (array('d') columns, kind masks, and
+#     the text of the columns that need it)
+#   - group_index.py: the pickled byte ranges of every group of a key set, and
+#     for pandas the dtypes of the whole file, for summarize_groups
+# A source whose mtime changed but whose content hash did not (copied, touched)
+# still hits the cache. Bump CACHE_VERSION whenever a loader changes what it
+# returns, so older cache files are rebuilt. Only the standard library is used.
+
+import hashlib
+import json
+import os
+import pickle
+
+CACHE_DIR = '.stats_cache'
+CACHE_VERSION = 4
+
+
+def file_hash(path, block=1 << 22):
+    """blake2b digest of a file's content, read in `block`-byte pieces."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fh:
+        for piece in iter(lambda: fh.read(block), b''):
+            digest.update(piece)
+    return digest.hexdigest()
+
+
+def cache_paths(path, kind, cache_dir, suffix):
+    # (data file, manifest) for one source file and kind of cached table. The
+    # source's absolute path is hashed into the name so that files with the
+    # same name in different directories do not collide.
+    where = hashlib.blake2b(os.path.abspath(path).encode('utf-8'), digest_size=4).hexdigest()
+    base = os.path.join(cache_dir, f"{os.path.basename(path)}-{where}.{kind}")
+    return base + suffix, base + '.json'
+
+
+def is_fresh(path, data_path, manifest_path):
+
+    # True when the cached data file was built from the current content of
+    # `path`. Size and mtime decide on their own when both match; a changed
+    # mtime with the same size falls back to comparing content hashes, and a
+    # match refreshes the manifest's mtime.
+
+    try:
+        with open(manifest_path, encoding='utf-8') as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return False
+    st = os.stat(path)
+    if (manifest.get('version') != CACHE_VERSION or manifest.get('size') != st.st_size
+            or not os.path.exists(data_path)):
+        return False
+    if manifest.get('mtime_ns') == st.st_mtime_ns:
+        return True
+    if manifest.get('hash') != file_hash(path):
+        return False
+    manifest['mtime_ns'] = st.st_mtime_ns
+    write_manifest(manifest_path, manifest)
+    return True
+
+
+def write_manifest(manifest_path, manifest):
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def cached(path, kind, build, write, read, cache_dir=CACHE_DIR, suffix='.pkl'):
+
+    # The table for source file `path`: read(data file) from the cache when it
+    # is fresh, otherwise build() it from the CSV and store it with
+    # write(table, data file) for the next run. `kind` names the table (one
+    # per engine / loader) so different tables of one source live side by
+    # side. The data file is written under a temporary name and renamed, and
+    # the manifest only afterwards, so an interrupted run leaves no stale hit.
+    # The source is stat'ed and hashed before build(), so a file changed
+    # while it is read is not recorded as the content the table came from.
+
+    data_path, manifest_path = cache_paths(path, kind, cache_dir, suffix)
+    if is_fresh(path, data_path, manifest_path):
+        return read(data_path)
+    st = os.stat(path)
+    digest = file_hash(path)
+    table = build()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = data_path + '.tmp'
+    write(table, tmp_path)
+    os.replace(tmp_path, data_path)
+    write_manifest(manifest_path, {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(path),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'hash': digest,
+        'kind': kind,
+    })
+    return table
+
+
+def write_pickle(obj, path):
+    with open(path, 'wb') as fh:
+        pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_pickle(path):
+    with open(path, 'rb') as fh:
+        return pickle.load(fh)
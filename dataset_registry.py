@@ -0,0 +1,41 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Registry of the three election datasets: where each file lives by default,
+# the key sets it is grouped by, and the function / report name each engine
+# uses for it. run_analysis.py, benchmark.py and anything else that needs to
+# know "which datasets exist" read it from here instead of hard-coding paths.
+
+import os
+
+DATA_DIR = 'data'
+
+DATASETS = {
+    'fb_ads': {
+        'file': '2024_fb_ads_president_scored_anon.csv',
+        'keys': [['page_id'], ['page_id', 'ad_id']],
+        # engine -> (function in that engine's module, default report path)
+        'pure': ('analyze_facebook_ads', 'fb_ads_president_full_report.txt'),
+        'pandas': ('main_fb_ads', 'fb_ads_pandas_report.txt'),
+        'polars': ('analyze_fb_ads', 'fb_ads_polars_report.txt'),
+    },
+    'fb_posts': {
+        'file': '2024_fb_posts_president_scored_anon.csv',
+        'keys': [['Facebook_Id'], ['Facebook_Id', 'post_id']],
+        'pure': ('analyze_facebook_posts', 'fb_posts_full_report.txt'),
+        'pandas': ('main_fb_posts', 'fb_posts_pandas_report.txt'),
+        'polars': ('analyze_fb_posts', 'fb_posts_polars_report.txt'),
+    },
+    'twitter': {
+        'file': '2024_tw_posts_president_scored_anon.csv',
+        'keys': [['id'], ['id', 'url']],
+        'pure': ('analyze_twitter_posts', 'twitter_full_report.txt'),
+        'pandas': ('main_twitter', 'twitter_pandas_report.txt'),
+        'polars': ('analyze_twitter', 'twitter_polars_report.txt'),
+    },
+}
+
+
+def default_path(name, data_dir=DATA_DIR):
+    # Location of a dataset's CSV under data_dir.
+    return os.path.join(data_dir, DATASETS[name]['file'])
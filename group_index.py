@@ -0,0 +1,134 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Persistent group-key index of a CSV file, for summarizing a few groups (one
+# page_id, one Facebook_Id, one tweet id) without scanning the whole file.
+# One pass over the file records, for every value of a key set, the byte
+# ranges of the records in that group (adjacent records merged into one
+# range, so a file sorted by its keys stores one range per group). The index
+# is pickled in the cache directory of cache.py and rebuilt only when the
+# CSV's size or mtime (then content hash) changes. A lookup then seeks to the
+# group's ranges and reads only those bytes:
+#   index = load_index(path, ['page_id'])
+#   data = index.read(path, [('123',)])     # the header + just those rows, as CSV
+# Each engine summarizes such a subset with its usual grouped statistics
+# (summarize_groups in pure_python_stats.py, pandas_stats.py and
+# polars_stats.py). Key values are compared as the raw cell text, as the pure
+# engine groups them (' 123' and '123' are different groups); a blank key is
+# ''. Only the standard library is used.
+
+import csv
+import io
+from array import array
+
+from cache import CACHE_DIR, cached, read_pickle, write_pickle
+
+
+def group_key(group, width):
+    # A group as a tuple of key texts: a tuple / list of values, or a single
+    # value for a one-column key set
+    values = tuple(group) if isinstance(group, (tuple, list)) else (group,)
+    if len(values) != width:
+        raise ValueError(f"group {group!r} needs {width} key values")
+    return tuple('' if v is None else str(v) for v in values)
+
+
+class GroupIndex:
+    """Byte ranges of every group of one key set in one CSV file."""
+
+    # ranges[key] is an array('Q') of start, end offset pairs in file order;
+    # header is the parsed header row and header_end the offset just past it.
+
+    def __init__(self, keys, header, header_end, ranges):
+        self.keys = keys
+        self.header = header
+        self.header_end = header_end
+        self.ranges = ranges
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __contains__(self, group):
+        return group_key(group, len(self.keys)) in self.ranges
+
+    def spans(self, groups):
+        # (start, end) byte ranges of the listed groups, in file order and
+        # merged where they touch. Groups not in the file are skipped.
+        found = []
+        for group in groups:
+            flat = self.ranges.get(group_key(group, len(self.keys)), ())
+            found.extend(zip(flat[::2], flat[1::2]))
+        found.sort()
+        merged = []
+        for start, end in found:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [tuple(span) for span in merged]
+
+    def read(self, path, groups):
+        # The header and the records of the listed groups, as the bytes of a
+        # CSV file any of the engines' loaders can read from a BytesIO
+        with open(path, 'rb') as fh:
+            parts = [fh.read(self.header_end)]
+            for start, end in self.spans(groups):
+                fh.seek(start)
+                part = fh.read(end - start)
+                if not parts[-1].endswith(b'\n'):
+                    parts[-1] += b'\n'
+                parts.append(part)
+        return b''.join(parts)
+
+    def rows(self, path, groups):
+        # The records of the listed groups, parsed, in file order
+        reader = csv.reader(io.StringIO(self.read(path, groups).decode('utf-8'), newline=''))
+        next(reader)
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield row
+
+
+def build_index(path, keys):
+
+    # One pass over the CSV: the csv module is fed the file line by line, so
+    # after each record the bytes read so far give its end offset (a record
+    # with newlines inside quotes spans several lines). Blank records are
+    # skipped, as the loaders drop them.
+
+    with open(path, 'rb') as fh:
+        offset = 0
+
+        def lines():
+            nonlocal offset
+            for line in fh:
+                offset += len(line)
+                yield line.decode('utf-8')
+
+        reader = csv.reader(lines())
+        header = next(reader)
+        idxs = [header.index(k) for k in keys]
+        header_end = start = offset
+        ranges = {}
+        for row in reader:
+            end = offset
+            if any(cell.strip() for cell in row):
+                key = tuple([row[i] if i < len(row) else '' for i in idxs])
+                flat = ranges.get(key)
+                if flat is None:
+                    ranges[key] = array('Q', (start, end))
+                elif flat[-1] == start:
+                    flat[-1] = end
+                else:
+                    flat.extend((start, end))
+            start = end
+    return GroupIndex(list(keys), header, header_end, ranges)
+
+
+def load_index(path, keys, cache_dir=CACHE_DIR):
+    # build_index through the on-disk cache: built on first use for each key
+    # set of a file, then read back while the file is unchanged
+    if cache_dir is None:
+        return build_index(path, keys)
+    return cached(path, 'index-' + '_'.join(keys), lambda: build_index(path, keys),
+                  write_pickle, read_pickle, cache_dir, '.idx.pkl')
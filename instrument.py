@@ -0,0 +1,216 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Opt-in per-stage instrumentation for the analysis scripts. The engines mark
+# their stages (load, overall, grouped, report, ...) with the traced()
+# decorator or the stage() context manager; while tracing is off both cost one
+# global lookup. Once enable() is called (run_analysis.py --trace, or the
+# STATS_TRACE environment variable for any script) every stage records
+#   stage, function        which stage and which engine function ran it
+#   seconds, cpu_seconds   wall time and CPU time of this process
+#   peak_rss_mb            peak resident memory during the stage (Linux resets
+#                          the high-water mark per top-level stage)
+#   rows, groups           rows processed and groups produced, when known
+#   parent                 the enclosing stage, for nested stages
+# and the trace is written as JSON when the process exits (or on finish()):
+# {"environment": ..., "events": [...], "totals": {stage: sums over top-level
+# events}}. One stage can also be profiled with cProfile (STATS_PROFILE_STAGE /
+# --profile-stage), its stats dumped for pstats / snakeviz. CPU time and memory
+# of worker processes are not included. Only the standard library is used.
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import platform
+import sys
+import time
+
+_trace = None
+
+
+def reset_peak_rss():
+    # Linux lets a process reset its high-water mark (VmHWM) so each stage
+    # gets its own peak; elsewhere the peak is cumulative for the process.
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class Trace:
+    """Events of the traced stages of one process, written as JSON by finish()."""
+
+    def __init__(self, path, profile_stage=None, profile_path=None):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = []
+        self.stack = []
+        self.profile_stage = profile_stage
+        self.profile_path = profile_path or f'{profile_stage}.prof'
+        self.profiler = cProfile.Profile() if profile_stage else None
+        self.profiling = False
+
+    def totals(self):
+        totals = {}
+        for event in self.events:
+            if event['parent'] is not None:
+                continue
+            total = totals.setdefault(event['stage'], {
+                'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_mb': 0.0, 'rows': 0, 'groups': 0})
+            total['calls'] += 1
+            for field in ('seconds', 'cpu_seconds', 'rows', 'groups'):
+                total[field] += event.get(field) or 0
+            total['peak_rss_mb'] = max(total['peak_rss_mb'], event['peak_rss_mb'])
+        for total in totals.values():
+            total['seconds'] = round(total['seconds'], 4)
+            total['cpu_seconds'] = round(total['cpu_seconds'], 4)
+        return totals
+
+    def finish(self):
+        if self.profiler is not None:
+            self.profiler.dump_stats(self.profile_path)
+        trace = {
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'argv': sys.argv, 'cpus': os.cpu_count()},
+            'events': self.events,
+            'totals': self.totals(),
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(trace, fh, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+
+class Stage:
+    """One running stage: stage(...) yields it so the code can record() counts."""
+
+    __slots__ = ('trace', 'name', 'function', 'fields', 'parent', 'wall', 'cpu', 'profiled')
+
+    def __init__(self, trace, name, function=None, **fields):
+        self.trace = trace
+        self.name = name
+        self.function = function
+        self.fields = fields
+
+    def record(self, **fields):
+        # Add counts (rows=, groups=, ...) to the stage's event
+        self.fields.update(fields)
+
+    def __enter__(self):
+        trace = self.trace
+        self.parent = trace.stack[-1].name if trace.stack else None
+        if self.parent is None:
+            reset_peak_rss()
+        trace.stack.append(self)
+        self.profiled = self.name == trace.profile_stage and not trace.profiling
+        if self.profiled:
+            trace.profiling = True
+            trace.profiler.enable()
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall, cpu = time.perf_counter() - self.wall, time.process_time() - self.cpu
+        trace = self.trace
+        if self.profiled:
+            trace.profiler.disable()
+            trace.profiling = False
+        trace.stack.pop()
+        trace.events.append({
+            'stage': self.name, 'function': self.function, 'parent': self.parent,
+            'status': 'ok' if exc_type is None else exc_type.__name__,
+            'seconds': round(wall, 4), 'cpu_seconds': round(cpu, 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1), **self.fields,
+        })
+        return False
+
+
+class _NullStage:
+    """What stage() yields while tracing is off: record() does nothing."""
+
+    __slots__ = ()
+
+    def record(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def enabled():
+    return _trace is not None and _trace.pid == os.getpid()
+
+
+def enable(path, profile_stage=None, profile_path=None):
+    """Start tracing this process; the trace is written to path at exit."""
+    global _trace
+    _trace = Trace(path, profile_stage, profile_path)
+    atexit.register(finish)
+    return _trace
+
+
+def finish():
+    """Write the trace now and stop tracing (a no-op when tracing is off)."""
+    global _trace
+    if enabled():
+        _trace.finish()
+    _trace = None
+
+
+def stage(name, function=None, **fields):
+    """Context manager timing one stage; `with stage('load') as s: ...; s.record(rows=n)`."""
+    if _trace is None or _trace.pid != os.getpid():
+        return _NULL_STAGE
+    return Stage(_trace, name, function, **fields)
+
+
+def traced(name, rows=None, groups=None):
+
+    # Decorator running a function as stage `name`. rows / groups are
+    # optional functions of its return value giving the rows processed and
+    # groups produced, only called while tracing.
+
+    def decorate(func):
+        function = f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace is None or _trace.pid != os.getpid():
+                return func(*args, **kwargs)
+            with Stage(_trace, name, function) as s:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    s.record(rows=rows(result))
+                if groups is not None:
+                    s.record(groups=groups(result))
+            return result
+        return wrapper
+    return decorate
+
+
+# STATS_TRACE=trace.json traces any script that imports this module;
+# STATS_PROFILE_STAGE / STATS_PROFILE pick a stage to profile and where to dump it.
+if os.environ.get('STATS_TRACE'):
+    enable(os.environ['STATS_TRACE'], os.environ.get('STATS_PROFILE_STAGE'), os.environ.get('STATS_PROFILE'))
@@ -15,236 +15,1032 @@
 #   - Computes descriptive statistics (numeric & categorical)
 #   - Groups stats by relevant columns
 #   - Writes a full report to a text file
-# To run a specific analysis, comment/uncomment the relevant main() call at the bottom.
+# To run a specific analysis, comment/uncomment the relevant main() call at the bottom,
+# or use run_analysis.py to pick the dataset, input file and engine.
 
+import contextlib
+import heapq
+import importlib.util
+import io
+import itertools
+import os
+import pickle
+import tempfile
+
+import numpy as np
 import pandas as pd
 
+from cache import CACHE_DIR, cached, read_pickle, write_pickle
+from group_index import load_index
+from instrument import traced
+from sketches import DEFAULT_QUANTILE_K, QUANTILE_SHRINK, CategoricalSketch
+from stats_output import StatsWriter
+
+# Column types for the loaders, per dataset. Numeric ids are read as nullable
+# integers (Int64), numeric like the pure and polars engines summarize them,
+# without a blank cell turning the column into rounded floats; other key
+# columns are read as strings and low-cardinality text as categoricals.
+# Every *_illuminating score column is float64 and anything not listed is
+# inferred by the parser as before.
+SCHEMAS = {
+    'fb_ads': {
+        'page_id': 'Int64', 'ad_id': 'Int64',
+        'currency': 'category', 'delivery_platform': 'category', 'month_year': 'category',
+    },
+    'twitter': {
+        'id': 'Int64', 'url': 'str',
+        'source': 'category', 'lang': 'category', 'month_year': 'category',
+    },
+    'fb_posts': {
+        'Facebook_Id': 'Int64', 'post_id': 'Int64',
+        'page_category': 'category', 'admin_country': 'category', 'type': 'category',
+        'month_year': 'category',
+    },
+}
+SCORE_SUFFIX = '_illuminating'
+
+def read_dataset(path, schema, dtype=None, chunksize=None, **options):
+    # Read a dataset CSV with its schema and drop rows that are entirely
+    # empty. The C parser reads every column straight into its type; then
+    # blank_cells turns whitespace-only cells (spaces, tabs, a quoted "  ")
+    # of the text columns into missing values, one vectorised pass per column
+    # instead of a regex replace over every cell. A numeric column holding a
+    # whitespace-only cell cannot be parsed into its type, so the read is
+    # redone with the numeric columns as text, converted afterwards. dtype
+    # adds types for columns the schema does not name (used for spilled
+    # partitions and chunks). With a chunksize, returns an iterator of
+    # cleaned frames of that many rows instead.
+    columns = pd.read_csv(path, nrows=0, **options).columns
+    types = dict(dtype or {})
+    for col in columns:
+        if col in schema:
+            types[col] = schema[col]
+        elif col.endswith(SCORE_SUFFIX):
+            types[col] = 'float64'
+    numeric = {col: t for col, t in types.items() if pd.api.types.is_numeric_dtype(t)}
+
+    def frames(as_text=()):
+        if hasattr(path, 'seek'):
+            # a file object (summarize_groups) is read more than once
+            path.seek(0)
+        read_types = {col: str if col in as_text else t for col, t in types.items()}
+        reader = pd.read_csv(path, dtype=read_types, chunksize=chunksize or None, **options)
+        for chunk in (reader if chunksize else [reader]):
+            yield blank_cells(chunk, {col: numeric[col] for col in as_text}).dropna(how='all')
+
+    def read():
+        done = 0
+        try:
+            for frame in frames():
+                yield frame
+                done += 1
+        except ValueError:
+            yield from itertools.islice(frames(numeric), done, None)
+
+    return read() if chunksize else next(read())
+
+def blank_cells(df, numeric=None):
+    # Whitespace-only cells of a frame's text (object and category) columns
+    # as missing values. numeric maps columns read as text to the numeric
+    # type they are converted to.
+    numeric = numeric or {}
+    for col in df.columns:
+        values = df[col]
+        if col in numeric:
+            blanked = values.where(values.str.strip() != '')
+            df[col] = pd.to_numeric(blanked, dtype_backend='numpy_nullable').astype(numeric[col])
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            blank = [c for c in values.cat.categories if not str(c).strip()]
+            if blank:
+                df[col] = values.cat.remove_categories(blank)
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            df[col] = values.where(values.str.strip() != '')
+    return df
+
+# Cached frames are Parquet when pyarrow is installed (column subsets are then
+# read on their own), pickled frames otherwise.
+PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+@traced('load', rows=len)
+def load_cached(path, load, cache_dir=None, columns=None):
+    # load(path) through the on-disk cache in cache.py: with a cache_dir the
+    # cleaned frame is stored there on the first run and read back by later
+    # runs while the CSV is unchanged. columns optionally picks a subset.
+    if cache_dir is None:
+        df = load(path)
+    elif PARQUET:
+        df = cached(path, f'pandas-{load.__name__}', lambda: load(path),
+                    lambda frame, p: frame.to_parquet(p),
+                    lambda p: pd.read_parquet(p, columns=columns), cache_dir, '.parquet')
+    else:
+        df = cached(path, f'pandas-{load.__name__}', lambda: load(path), write_pickle, read_pickle, cache_dir)
+    return df if columns is None else df[columns]
+
+def top_values(series, n=5):
+    # value_counts().head(n) without the zero counts a categorical column
+    # reports for categories that never occur, ties in value order (so the
+    # top value is the smallest of the most frequent, as in every engine).
+    vc = series.value_counts(dropna=True)
+    vc = vc[vc > 0].sort_index(kind='stable')
+    return vc.sort_values(ascending=False, kind='stable').head(n)
+
+@traced('overall')
+def overall_summary(df):
+    # (describe() table, [(column, count, unique, top 5 counts)]) for the
+    # overall section. Always exact: once the frame is in memory, value_counts
+    # is both faster and no bigger than feeding a sketch value by value. The
+    # categorical sketches (--approx) bound memory only in chunked mode, where
+    # ChunkedStats feeds them a chunk at a time.
+    categorical = []
+    for col in df.select_dtypes(include=['object', 'category']).columns:
+        categorical.append((col, df[col].count(), df[col].nunique(dropna=True), top_values(df[col])))
+    # float64 throughout: describe() of the nullable Int64 ids is Float64, which
+    # would make the transposed table object-typed
+    return df.describe().T.astype(float), categorical
+
+NUMERIC_STATS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+CATEGORICAL_STATS = ['count', 'unique', 'top', 'freq']
+
+@traced('grouped', groups=lambda frame: frame.index.droplevel(-1).nunique() if frame.index.nlevels > 1 else 0)
+def grouped_frame(df, keys):
+    # Every group's statistics in one frame indexed by (*keys, column), with
+    # the describe() columns (count, mean, std, min, 25%, 50%, 75%, max) for
+    # numeric columns and count / unique / top / freq for categorical ones.
+    # Computed with one grouped aggregation per statistic instead of a
+    # describe() / value_counts() call per group.
+    if df.empty:
+        return pd.DataFrame(columns=NUMERIC_STATS + CATEGORICAL_STATS[1:])
+    grouped = df.groupby(keys)
+    num_cols = [c for c in df.select_dtypes(include='number').columns if c not in keys]
+    cat_cols = [c for c in df.select_dtypes(include=['object', 'category']).columns if c not in keys]
+    parts = []
+    if num_cols:
+        stats = grouped[num_cols].agg(['count', 'mean', 'std', 'min', 'max'])
+        quartiles = grouped[num_cols].quantile([0.25, 0.5, 0.75]).unstack()
+        quartiles.columns = quartiles.columns.set_levels(['25%', '50%', '75%'], level=1)
+        num = pd.concat([stats, quartiles], axis=1).stack(level=0)[NUMERIC_STATS]
+        parts.append(num)
+    if cat_cols:
+        cat = {('count', c): s for c, s in grouped[cat_cols].count().items()}
+        cat.update({('unique', c): s for c, s in grouped[cat_cols].nunique().items()})
+        for col in cat_cols:
+            # most frequent value per group: biggest (group, value) count first
+            sizes = df.groupby(keys + [col], observed=True).size()
+            sizes = sizes.sort_values(ascending=False, kind='stable')
+            top = sizes[~sizes.index.droplevel(-1).duplicated()]
+            where = top.index.droplevel(-1)
+            cat[('top', col)] = pd.Series(top.index.get_level_values(-1), index=where)
+            cat[('freq', col)] = pd.Series(top.to_numpy(), index=where)
+        parts.append(pd.DataFrame(cat).stack(level=1)[CATEGORICAL_STATS])
+    if not parts:
+        return pd.DataFrame(columns=NUMERIC_STATS + CATEGORICAL_STATS[1:])
+    frame = pd.concat(parts)
+    frame.index = frame.index.set_names('column', level=-1)
+    # numeric rows then categorical rows for each group, groups in sorted order
+    position = grouped.size().index.get_indexer(frame.index.droplevel(-1))
+    return frame.iloc[np.argsort(position, kind='stable')]
+
+def _grouped_columns(frame):
+    # (name, kind, values) of a grouped_frame's key levels, then its columns
+    columns = [(level, 'key', values) for level, values in frame.index.to_frame(index=False).items()]
+    for col, values in frame.reset_index(drop=True).items():
+        if col in ('count', 'unique', 'freq'):
+            kind = 'int'
+        elif pd.api.types.is_float_dtype(values):
+            kind = 'float'
+        else:
+            kind = 'text'
+        columns.append((col, kind, values))
+    return columns
+
+def _cell(kind, v, decimals):
+    if kind == 'int':
+        return f'{int(v)}'
+    if kind == 'float':
+        return f'{v:.{decimals}f}'
+    return str(v).replace('\n', '\\n')
+
+def grouped_widths(frame, decimals=6):
+    # Column widths of a grouped_frame's text table: each column's min/max
+    # (numbers) or longest value (text)
+    widths = []
+    for col, kind, values in _grouped_columns(frame):
+        if kind in ('key', 'text'):
+            shown = [_cell(kind, v, decimals) for v in pd.unique(values.dropna())]
+        else:
+            shown = [_cell(kind, v, decimals) for v in (values.min(), values.max()) if v == v]
+        widths.append(max([len(str(col))] + [len(t) for t in shown]))
+    return widths
+
+def write_grouped_rows(frame, out, widths, decimals=6, block=100_000, previous=None):
+    # The rows of a grouped_frame in a table of the given widths, `block` rows
+    # at a time. Repeated group keys are left blank, as to_string() does;
+    # previous is the index tuple of the row above the first one, if any.
+    index = frame.index.to_frame(index=False)
+    if previous is not None:
+        index = pd.concat([pd.DataFrame([previous], columns=index.columns), index], ignore_index=True)
+    repeated = np.ones(len(index), dtype=bool)
+    columns = []  # (kind, values, repeated-key mask or None)
+    for _, kind, values in _grouped_columns(frame):
+        mask = None
+        if kind == 'key':
+            key_values = index[values.name]
+            repeated = repeated & (key_values == key_values.shift()).to_numpy(dtype=bool, na_value=False)
+            mask = repeated[1:] if previous is not None else repeated
+        columns.append((kind, values, mask))
+    for start in range(0, len(frame), block):
+        stop = start + block
+        cells = []
+        for (kind, values, repeated), w in zip(columns, widths):
+            # format each distinct value once: keys repeat down a group and
+            # scores take a handful of values; missing values (code -1) are blank
+            codes, uniques = pd.factorize(values.iloc[start:stop])
+            if kind == 'key':
+                text = [f'{_cell(kind, v, decimals):<{w}}' for v in uniques]
+                codes[repeated[start:stop]] = -1
+            else:
+                text = [f'{_cell(kind, v, decimals):>{w}}' for v in uniques]
+            cells.append(np.array(text + [' ' * w], dtype=object)[codes].tolist())
+        out.write('\n'.join(map(str.rstrip, map('  '.join, zip(*cells)))) + '\n')
+
+@traced('report')
+def write_grouped_frame(frame, out, decimals=6, block=100_000):
+    # Render a grouped_frame (or a SpilledFrame, block by block) as a
+    # fixed-width text table, `block` rows at a time. Column widths come from
+    # grouped_widths, so blocks line up without first formatting the whole
+    # frame as DataFrame.to_string() does (minutes and gigabytes on a few
+    # hundred thousand groups).
+    if frame.empty:
+        return
+    spilled = isinstance(frame, SpilledFrame)
+    sample = frame.extremes if spilled else frame
+    widths = grouped_widths(sample, decimals)
+    header = '  '.join(str(col).ljust(w) if kind == 'key' else str(col).rjust(w)
+                       for (col, kind, _), w in zip(_grouped_columns(sample), widths))
+    out.write(header.rstrip() + '\n')
+    if not spilled:
+        write_grouped_rows(frame, out, widths, decimals, block)
+        return
+    previous = None
+    for part in frame.blocks(block):
+        write_grouped_rows(part, out, widths, decimals, block, previous)
+        previous = part.index[-1]
+
+def _extreme_rows(frame):
+    # The rows of a grouped_frame that set its column widths (longest key and
+    # text values, smallest and largest numbers), so the widths of a frame
+    # split into pieces come from the pieces' extreme rows alone
+    positions = set()
+    for _, kind, values in _grouped_columns(frame):
+        if kind in ('key', 'text'):
+            lengths = values.dropna().astype(str).str.replace('\n', '\\n').str.len()
+            if len(lengths):
+                positions.add(lengths.idxmax())
+        else:
+            numbers = pd.to_numeric(values, errors='coerce')
+            if numbers.notna().any():
+                positions.update((numbers.idxmin(), numbers.idxmax()))
+    return frame.iloc[sorted(positions)]
+
+def _partition_groups(path):
+    # (key tuple, block, start, stop) of every group of a spilled partition,
+    # in the partition's sorted key order
+    for part in _iter_pickled(path):
+        codes = pd.factorize(part.index.droplevel(-1))[0]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        stops = np.r_[starts[1:], len(part)]
+        for name, a, b in zip(part.index.droplevel(-1)[starts], starts, stops):
+            yield (name if isinstance(name, tuple) else (name,)), part, a, b
+
+def _iter_pickled(path):
+    with open(path, 'rb') as fh:
+        while True:
+            try:
+                yield pickle.load(fh)
+            except EOFError:
+                return
+
+class SpilledFrame:
+    """A grouped_frame stored as key-sorted partition files, merged on its keys when read."""
+
+    # write_grouped_spilled builds one per spilled section. Every partition's
+    # frame is pickled in blocks cut at group boundaries; blocks() k-way
+    # merges the partitions on the group key (heapq.merge), so the rows come
+    # out in the same order as grouped_frame of the whole file, a block at a
+    # time. extremes holds the rows that set the table's column widths.
+
+    def __init__(self, paths, extremes, columns):
+        self.paths = paths
+        self.extremes = extremes.reindex(columns=columns)
+        self.columns = columns
+
+    @property
+    def empty(self):
+        return self.extremes.empty
+
+    def blocks(self, block=100_000):
+        pieces, rows = [], 0
+        merged = heapq.merge(*[_partition_groups(p) for p in self.paths], key=lambda group: group[0])
+        for _, part, a, b in merged:
+            pieces.append((part, a, b))
+            rows += b - a
+            if rows >= block:
+                yield self._take(pieces)
+                pieces, rows = [], 0
+        if pieces:
+            yield self._take(pieces)
+
+    def _take(self, pieces):
+        # The rows of (block, start, stop) pieces, in order, as one frame
+        parts = list({id(part): part for part, _, _ in pieces}.values())
+        offsets, total = {}, 0
+        for part in parts:
+            offsets[id(part)] = total
+            total += len(part)
+        positions = np.concatenate([np.arange(offsets[id(part)] + a, offsets[id(part)] + b)
+                                    for part, a, b in pieces])
+        combined = pd.concat([part.reindex(columns=self.columns) for part in parts])
+        return combined.iloc[positions]
+
+    @staticmethod
+    def write_partition(frame, path, block=100_000):
+        # Pickle a partition's grouped_frame in blocks of about `block` rows,
+        # each ending on a group boundary
+        codes = pd.factorize(frame.index.droplevel(-1))[0]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        cuts = [0]
+        for start in starts:
+            if start - cuts[-1] >= block:
+                cuts.append(start)
+        cuts.append(len(frame))
+        with open(path, 'wb') as fh:
+            for a, b in zip(cuts, cuts[1:]):
+                pickle.dump(frame.iloc[a:b], fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+def needs_spill(df, keys, max_groups):
+    # True when grouping df by keys would exceed the max_groups budget.
+    return bool(max_groups) and df.groupby(keys).ngroups > max_groups
+
+# Most partitions write_grouped_spilled writes (one temporary file each)
+MAX_PARTITIONS = 512
+
+def spill_partitions(groups, max_groups):
+    # Partitions for a spilled section so each holds about max_groups groups
+    return max(2, min(MAX_PARTITIONS, -(-groups // max_groups)))
+
+def learn_dtypes(path, chunksize=100_000):
+    # The dtype each column gets when the whole file is read at once, learned
+    # chunk by chunk: columns numeric in every chunk stay numeric (int and
+    # float chunks give float64), anything else becomes object.
+    dtypes = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        for col, dt in chunk.dtypes.items():
+            seen = dtypes.get(col)
+            if seen is not None and seen != dt:
+                dt = 'float64' if seen.kind in 'iuf' and dt.kind in 'iuf' else object
+            dtypes[col] = pd.api.types.pandas_dtype(dt)
+    return dtypes
+
+@traced('spilled')
+def write_grouped_spilled(path, keys, out, load, write_group, partitions=16, chunksize=100_000):
+    # Spill-to-disk version of a grouped section, for when the groups do not fit
+    # in memory next to the frame. The raw CSV is read in chunks and
+    # hash-partitioned on `keys` into `partitions` temporary CSV files
+    # (write_outputs sizes them to the group budget); each partition is
+    # loaded with the dataset's `load` function, summarized by grouped_frame
+    # on its own and its sorted result spilled again. The section is then
+    # written once by `write_group` from a SpilledFrame, which merges the
+    # partitions on the group key, so it matches an in-memory run row for row.
+    # Partitions are written as raw text and read back with the dtypes the
+    # whole file infers to, so a partition that happens to lack blanks or text
+    # still types its columns like the full frame.
+    dtypes = learn_dtypes(path, chunksize)
+
+    with tempfile.TemporaryDirectory(prefix='pandas_spill_') as tmp:
+        part_paths = [os.path.join(tmp, f'part{p}.csv') for p in range(partitions)]
+        written = set()
+        reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize)
+        for chunk in reader:
+            part = pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy() % partitions
+            for p, sub in chunk.groupby(part):
+                sub.to_csv(part_paths[p], mode='a', header=p not in written, index=False)
+                written.add(p)
+
+        result_paths, extremes, columns = [], [], {}
+        for p in sorted(written):
+            df = load(part_paths[p], dtype=dtypes)
+            os.remove(part_paths[p])
+            frame = grouped_frame(df, keys)
+            del df
+            if frame.empty:
+                continue
+            result_paths.append(os.path.join(tmp, f'result{p}.pkl'))
+            SpilledFrame.write_partition(frame, result_paths[-1])
+            extremes.append(_extreme_rows(frame))
+            columns.update(dict.fromkeys(frame.columns))
+            del frame
+        columns = [c for c in NUMERIC_STATS + CATEGORICAL_STATS[1:] if c in columns]
+        extremes = pd.concat(extremes) if extremes else pd.DataFrame(columns=columns)
+        write_group(None, keys, out, frame=SpilledFrame(result_paths, extremes, columns))
+
+def summarize_groups(path, load, keys, groups, cache_dir=CACHE_DIR):
+    # grouped_frame of just the listed groups (key tuples, or single values
+    # for one key column). Only their records are read, through the group-key
+    # index of group_index.py, and loaded with the dataset's `load` function
+    # and the dtypes of the whole file (learn_dtypes, cached next to the
+    # index), so columns are typed as in a full run.
+    index = load_index(path, keys, cache_dir)
+    if cache_dir is None:
+        dtypes = learn_dtypes(path)
+    else:
+        dtypes = cached(path, 'pandas-dtypes', lambda: learn_dtypes(path), write_pickle, read_pickle, cache_dir)
+    return grouped_frame(load(io.BytesIO(index.read(path, groups)), dtype=dtypes), keys)
+
+class ChunkedStats:
+    """Mergeable partial statistics for one grouping, fed one chunk at a time."""
+
+    # Numeric partials are (count, mean, m2, min, max) per (group, column),
+    # merged with Chan et al.'s pairwise update generalised to many parts,
+    # plus quantile samples per (group, column) kept small by compact_samples;
+    # categorical partials are value counts per (group, column, value). An
+    # empty key list treats the whole file as one group. Partials from new
+    # chunks are buffered and folded into the running totals once they
+    # outgrow them, so each row's partials are re-merged O(log chunks) times.
+
+    def __init__(self, keys, num_cols, cat_cols, sketch_categories=False):
+        self.keys = keys
+        self.num_cols = [c for c in num_cols if c not in keys]
+        self.cat_cols = [c for c in cat_cols if c not in keys]
+        self.sketches = {c: CategoricalSketch() for c in self.cat_cols} if sketch_categories else None
+        self.num, self.cat_count, self.cat_values, self.samples = None, None, None, None
+        self.pending = []
+
+    def add(self, df):
+        if df.empty:
+            return
+        by = self.keys or np.zeros(len(df), dtype=np.int8)
+        grouped = df.groupby(by)
+        num = cat_count = cat_values = samples = None
+        if self.num_cols:
+            agg = grouped[self.num_cols].agg(['count', 'mean', 'var', 'min', 'max']).stack(level=0)
+            agg['m2'] = agg['var'].fillna(0) * (agg['count'] - 1).clip(lower=0)
+            num = agg[['count', 'mean', 'm2', 'min', 'max']]
+            # every value, one level-0 sample per (group, column, row)
+            keyed = df.dropna(subset=self.keys).set_index(self.keys) if self.keys else df.set_axis(by)
+            values = keyed[self.num_cols].stack().dropna()
+            samples = pd.DataFrame({'value': values.astype(float), 'level': np.int8(0)})
+        if self.cat_cols:
+            cat_count = grouped[self.cat_cols].count().stack()
+            if self.sketches is not None:
+                for col, sketch in self.sketches.items():
+                    sketch.update(df[col].dropna())
+            else:
+                by_value = list(self.keys) or [pd.Series(by, index=df.index)]
+                sizes = {col: df.groupby(by_value + [df[col]], observed=True).size() for col in self.cat_cols}
+                cat_values = pd.concat(sizes, names=['column'])
+                # (column, *keys, value) -> (*keys, column, value)
+                cat_values = cat_values.reorder_levels(list(range(1, cat_values.index.nlevels - 1)) + [0, -1])
+        self.pending.append((num, cat_count, cat_values, samples))
+        if sum(map(self._size, self.pending)) >= self._size((self.num, self.cat_count)):
+            self._fold()
+
+    @staticmethod
+    def _size(partials):
+        return sum(len(p) for p in partials[:2] if p is not None)
+
+    def _fold(self):
+        parts = [(self.num, self.cat_count, self.cat_values, self.samples)] + self.pending
+        self.pending = []
+        nums = [p[0] for p in parts if p[0] is not None]
+        counts = [p[1] for p in parts if p[1] is not None]
+        values = [p[2] for p in parts if p[2] is not None]
+        samples = [p[3] for p in parts if p[3] is not None]
+        self.num = merge_numeric(nums) if nums else None
+        self.cat_count = sum_partials(counts) if counts else None
+        self.cat_values = sum_partials(values) if values else None
+        self.samples = compact_samples(pd.concat(samples)) if samples else None
+
+    def result(self):
+
+        # Final stats in grouped_frame's layout: index (*keys, column), numeric
+        # rows with describe()'s columns (quartiles exact for groups with up to
+        # DEFAULT_QUANTILE_K values, sketch estimates beyond) and categorical
+        # rows with count / unique / top / freq.
+
+        self._fold()
+        parts = []
+        if self.num is not None:
+            num = self.num
+            quartiles = sample_quantiles(self.samples, QUARTILES).reindex(num.index)
+            parts.append(pd.DataFrame({
+                'count': num['count'], 'mean': num['mean'],
+                'std': np.sqrt(num['m2'] / (num['count'] - 1).where(num['count'] > 1)),
+                'min': num['min'], '25%': quartiles['25%'], '50%': quartiles['50%'],
+                '75%': quartiles['75%'], 'max': num['max'],
+            }))
+        if self.cat_count is not None:
+            cat = pd.DataFrame({'count': self.cat_count})
+            if self.cat_values is not None:
+                values = self.cat_values
+                levels = list(range(values.index.nlevels - 1))
+                cat['unique'] = values.groupby(level=levels, sort=False).size()
+                # ties go to the smallest value, as in grouped_frame
+                ranked = values.sort_index().sort_values(ascending=False, kind='stable')
+                top = ranked[~ranked.index.droplevel(-1).duplicated()]
+                where = top.index.droplevel(-1)
+                cat['top'] = pd.Series(top.index.get_level_values(-1), index=where)
+                cat['freq'] = pd.Series(top.to_numpy(), index=where)
+                cat['unique'] = cat['unique'].fillna(0)
+            parts.append(cat)
+        if not parts:
+            return pd.DataFrame(columns=NUMERIC_STATS + CATEGORICAL_STATS[1:])
+        frame = pd.concat(parts)
+        frame.index = frame.index.set_names('column', level=-1)
+        # groups in sorted order, each group's columns in file order
+        group_index = frame.index.droplevel(-1)
+        groups = group_index.unique().sort_values()
+        order = {c: i for i, c in enumerate(self.num_cols + self.cat_cols)}
+        column_pos = frame.index.get_level_values(-1).map(order).to_numpy()
+        return frame.iloc[np.lexsort((column_pos, groups.get_indexer(group_index)))]
+
+    def overall(self):
+        # (describe() table, [(column, count, unique, top 5 counts)]) as overall_summary
+        # returns it, for the whole-file instance (keys == []).
+        frame = self.result().droplevel(0).rename_axis(None)
+        desc = frame.loc[frame.index.isin(self.num_cols), NUMERIC_STATS].astype(float)
+        categorical = []
+        for col in self.cat_cols:
+            if self.sketches is not None:
+                sketch = self.sketches[col]
+                top = sketch.top(5)
+                index = pd.Index([v for v, _, _ in top], name=col)
+                categorical.append((col, sketch.n, sketch.distinct.count(),
+                                    pd.Series([c for _, c, _ in top], index=index, name='count')))
+                continue
+            counts = self.cat_values.xs(col, level='column') if self.cat_values is not None else pd.Series(dtype=int)
+            # ties in value order, as top_values sorts them
+            counts = counts.droplevel(0).sort_index(kind='stable')
+            counts = counts.sort_values(ascending=False, kind='stable').head(5)
+            counts.index.name, counts.name = col, 'count'
+            categorical.append((col, int(frame.loc[col, 'count']),
+                                int(frame.loc[col, 'unique']) if 'unique' in frame else 0, counts))
+        return desc, categorical
+
+def merge_numeric(parts):
+    # Merge (count, mean, m2, min, max) partials that share index labels.
+    df = pd.concat(parts)
+    levels = list(range(df.index.nlevels))
+    grouped = df.groupby(level=levels, sort=False)
+    n = grouped['count'].sum()
+    has = df['count'] > 0
+    mean = (df['mean'] * df['count']).where(has, 0).groupby(level=levels, sort=False).sum() / n.where(n > 0)
+    spread = (df['count'] * (df['mean'] - mean.reindex(df.index).to_numpy()) ** 2).where(has, 0)
+    m2 = grouped['m2'].sum() + spread.groupby(level=levels, sort=False).sum()
+    return pd.DataFrame({'count': n, 'mean': mean, 'm2': m2,
+                         'min': grouped['min'].min(), 'max': grouped['max'].max()})
+
+QUARTILES = {'25%': 0.25, '50%': 0.5, '75%': 0.75}
+
+def compaction_offsets(n, level):
+    # sketches.compaction_offset for arrays: 0 or 1 per (n, level) pair.
+    with np.errstate(over='ignore'):
+        mixed = (n.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + level.astype(np.uint64)) \
+            * np.uint64(0xBF58476D1CE4E5B9)
+    return (mixed >> np.uint64(63)).astype(np.int8)
+
+def label_ids(index):
+    # (id per entry, unique labels by id) for a MultiIndex, like pd.factorize
+    # but working from the index's level codes instead of hashing tuples.
+    ids = pd.Series(0, index=index).groupby(level=list(range(index.nlevels)), sort=False).ngroup()
+    ids = ids.to_numpy()
+    _, first = np.unique(ids, return_index=True)
+    return ids, index[first]
+
+def compact_samples(samples, k=DEFAULT_QUANTILE_K):
+    # Vectorised QuantileSketch compaction. samples holds (value, level)
+    # rows indexed by (*keys, column), one sketch per index label, each value
+    # standing for 2**level inputs. Any level over its capacity is sorted and
+    # every other value moves up a level, until every level fits; sketches
+    # with at most k values are left as they are, so their quantiles stay exact.
+    # Each round only re-sorts the sketches that still had a level to compact.
+    gid, labels = label_ids(samples.index)
+    level = samples['level'].to_numpy(dtype=np.int8)
+    value = samples['value'].to_numpy(dtype=float)
+    n = np.bincount(gid, weights=np.ldexp(1.0, level), minlength=len(labels))
+    settled = []
+    while len(gid):
+        order = np.lexsort((value, level, gid))
+        gid, level, value = gid[order], level[order], value[order]
+        new = np.ones(len(gid), dtype=bool)
+        new[1:] = (gid[1:] != gid[:-1]) | (level[1:] != level[:-1])
+        starts = np.flatnonzero(new)
+        segment = np.cumsum(new) - 1
+        size = np.diff(np.append(starts, len(gid)))[segment]
+        rank = np.arange(len(gid)) - starts[segment]
+        # capacities as sketches.compactor_capacity, given each sketch's
+        # number of levels (its top level + 1, len(levels) in QuantileSketch)
+        levels = np.zeros(len(labels), dtype=np.int8)
+        np.maximum.at(levels, gid, level + 1)
+        capacity = np.maximum(2, np.ceil(k * QUANTILE_SHRINK ** (levels[gid] - level - 1.0)))
+        paired = (size > capacity) & (rank < size - size % 2)
+        active = np.zeros(len(labels), dtype=bool)
+        active[gid[paired]] = True
+        done = ~active[gid]
+        settled.append((gid[done], level[done], value[done]))
+        promote = paired & (rank % 2 == compaction_offsets(n[gid], level))
+        level = np.where(promote, level + 1, level).astype(np.int8)
+        keep = ~done & (~paired | promote)
+        gid, level, value = gid[keep], level[keep], value[keep]
+    gid, level, value = (np.concatenate(parts) for parts in zip(*settled)) if settled else (gid, level, value)
+    return pd.DataFrame({'value': value, 'level': level}, index=labels.take(gid))
+
+def sample_quantiles(samples, qs):
+    # QuantileSketch.quantiles for every sketch in a compact_samples frame:
+    # one row per index label, one column per {name: q} in qs, interpolated
+    # between the values covering ranks floor and ceil of q * (n - 1).
+    gid, labels = label_ids(samples.index)
+    level = samples['level'].to_numpy()
+    value = samples['value'].to_numpy(dtype=float)
+    order = np.lexsort((value, gid))
+    gid, value, weight = gid[order], value[order], np.left_shift(1, level[order].astype(np.int64))
+    ends = np.cumsum(weight)
+    starts = np.searchsorted(gid, np.arange(len(labels)))
+    base = ends[starts] - weight[starts]
+    total = np.bincount(gid, weights=weight, minlength=len(labels))
+    result = {}
+    for name, q in qs.items():
+        pos = q * (total - 1)
+        lo = np.floor(pos)
+        below = value[np.searchsorted(ends, base + lo, side='right')]
+        above = value[np.searchsorted(ends, base + np.ceil(pos), side='right')]
+        result[name] = below + (above - below) * (pos - lo)
+    return pd.DataFrame(result, index=labels)
+
+def sum_partials(parts):
+    # Add count partials that share index labels.
+    df = pd.concat(parts)
+    return df.groupby(level=list(range(df.index.nlevels)), sort=False).sum()
+
+@traced('chunked')
+def chunked_summaries(path, load, key_sets, chunksize=100_000, approx=False):
+
+    # Overall summary and one grouped frame per key set for a file too big to
+    # load at once: the file is read `chunksize` rows at a time with the
+    # dataset's `load` function and every chunk's partial statistics are merged
+    # into one ChunkedStats per grouping. Memory is bounded by the chunk size
+    # plus the merged per-group partials (one row per group and column, and
+    # one per distinct categorical value in each group).
+
+    dtypes = learn_dtypes(path, chunksize)
+    overall, grouped = None, []
+    for chunk in load(path, dtype=dtypes, chunksize=chunksize):
+        if overall is None:
+            num_cols = list(chunk.select_dtypes(include='number').columns)
+            cat_cols = list(chunk.select_dtypes(include=['object', 'category']).columns)
+            overall = ChunkedStats([], num_cols, cat_cols, sketch_categories=approx)
+            grouped = [ChunkedStats(keys, num_cols, cat_cols) for keys in key_sets]
+        overall.add(chunk)
+        for stats in grouped:
+            stats.add(chunk)
+    return overall.overall(), [stats.result() for stats in grouped]
+
+@traced('report')
+def write_summary_records(writer, summary):
+    # An overall_summary as statistics records (grouping []): the describe()
+    # rows of the numeric columns, then count / unique / top / freq of the
+    # categorical ones.
+    desc, categorical = summary
+    writer.write([], [()] * len(desc), desc.index, {name: desc[name].to_numpy() for name in desc.columns})
+    writer.write([], [()] * len(categorical), [col for col, _, _, _ in categorical], {
+        'count': [count for _, count, _, _ in categorical],
+        'unique': [unique for _, _, unique, _ in categorical],
+        'top': [vc.index[0] if len(vc) else None for _, _, _, vc in categorical],
+        'freq': [vc.iloc[0] if len(vc) else None for _, _, _, vc in categorical],
+    })
+
+@traced('report')
+def write_frame_records(writer, keys, frame):
+    # A grouped_frame as statistics records, one per (group, column) row; a
+    # SpilledFrame is written a block at a time.
+    if frame.empty:
+        return
+    if isinstance(frame, SpilledFrame):
+        for part in frame.blocks():
+            write_frame_records(writer, keys, part)
+        return
+    index = frame.index
+    levels = [index.get_level_values(i) for i in range(index.nlevels - 1)]
+    writer.write(keys, list(zip(*levels)), index.get_level_values(-1),
+                 {name: frame[name].to_numpy() for name in frame.columns})
+
+def recording(write_group, writer):
+    # Wrap a grouped section writer so that the grouped_frame it renders is
+    # also written as statistics records; out=None only records it.
+    def write(df, keys, out, heading=True, frame=None):
+        frame = grouped_frame(df, keys) if frame is None else frame
+        if writer is not None:
+            write_frame_records(writer, keys, frame)
+        if out is not None:
+            write_group(df, keys, out, heading, frame=frame)
+    return write
+
+def open_outputs(report_path, stats_path, dataset):
+    # (text report file or None, StatsWriter or None) as context managers.
+    out = open(report_path, 'w', encoding='utf-8') if report_path else contextlib.nullcontext()
+    writer = StatsWriter(stats_path, dataset, 'pandas') if stats_path else contextlib.nullcontext()
+    return out, writer
+
+def write_outputs(df, data_path, report_path, stats_path, dataset, load, key_sets,
+                  write_overall, write_group, approx=False, max_groups=None):
+
+    # The outputs of a main_* function: the text report unless report_path is
+    # None, and statistics records (stats_output.py) when stats_path is given.
+    # The overall summary and each grouped_frame are computed once and feed
+    # both. When the largest grouping exceeds max_groups the grouped sections
+    # are spilled (write_grouped_spilled) instead of built from df. approx
+    # has no effect here: the frame is already loaded, so the overall summary
+    # is exact (see overall_summary).
+
+    summary = overall_summary(df)
+    report, records = open_outputs(report_path, stats_path, dataset)
+    with report as out, records as writer:
+        if out is not None:
+            write_overall(None, out, False, summary=summary)
+        if writer is not None:
+            write_summary_records(writer, summary)
+        write = recording(write_group, writer)
+        if needs_spill(df, key_sets[-1], max_groups):
+            # size each section's partitions to the budget, then free the
+            # frame; the grouped sections re-read the file partition by partition
+            partitions = [spill_partitions(df.groupby(keys).ngroups, max_groups) for keys in key_sets]
+            del df
+            for keys, parts in zip(key_sets, partitions):
+                write_grouped_spilled(data_path, keys, out, load, write, parts)
+        else:
+            for keys in key_sets:
+                write(df, keys, out)
+
+def write_chunked_report(data_path, report_path, load, key_sets, write_overall, write_group,
+                         chunksize, approx=False, stats_path=None, dataset=None):
+    # Report for a file read in chunks: chunked_summaries, then the dataset's
+    # usual overall and grouped section writers fed the merged results (and
+    # the same results as statistics records when stats_path is given).
+    summary, frames = chunked_summaries(data_path, load, key_sets, chunksize, approx)
+    report, records = open_outputs(report_path, stats_path, dataset)
+    with report as out, records as writer:
+        if out is not None:
+            write_overall(None, out, approx, summary=summary)
+        if writer is not None:
+            write_summary_records(writer, summary)
+        write = recording(write_group, writer)
+        for keys, frame in zip(key_sets, frames):
+            write(None, keys, out, frame=frame)
+
 # ----------------------------------------------------------------------------
 # 1. FACEBOOK ADS DATASET ANALYSIS
 # ----------------------------------------------------------------------------
 
-def load_and_clean_fb_ads(path):
+def load_and_clean_fb_ads(path, dtype=None, chunksize=None):
     """
     Load and clean the Facebook Ads dataset.
-    - Replaces empty/whitespace cells with NaN
+    - Reads columns with the types in SCHEMAS['fb_ads']
+    - Parses empty/whitespace cells as NaN
     - Drops rows that are entirely NaN
+    dtype optionally fixes other column dtypes (used for spilled partitions);
+    with a chunksize an iterator of cleaned chunks is returned.
     """
-    df = pd.read_csv(path, encoding='utf-8')
-    df = df.replace(r'^\s*$', pd.NA, regex=True)
-    df = df.dropna(how='all')
-    return df
+    return read_dataset(path, SCHEMAS['fb_ads'], dtype, chunksize, encoding='utf-8')
 
-def overall_stats_fb_ads(df, out):
+@traced('report')
+def overall_stats_fb_ads(df, out, approx=False, summary=None):
     # Write overall numeric and categorical stats for the Facebook Ads dataset.
+    # approx=True labels unique counts as estimates (chunked mode's sketches).
+    # summary is a precomputed overall_summary (chunked mode); df is then unused.
+    desc, categorical = summary or overall_summary(df)
     out.write('='*60 + '\n')
     out.write('OVERALL DATASET SUMMARY (Pandas)\n')
     out.write('='*60 + '\n')
 
     # Numeric columns summary
     out.write('Numeric columns (describe):\n')
-    desc = df.describe().T.to_string()
-    out.write(desc + '\n\n')
+    out.write(desc.to_string() + '\n\n')
 
     # Categorical columns summary
     out.write('Categorical columns (unique / top values):\n')
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns
-    for col in cat_cols:
+    for col, _, unique, vc in categorical:
         out.write(f"-- {col} --\n")
-        out.write(f"Unique: {df[col].nunique(dropna=True)}\n")
-        vc = df[col].value_counts(dropna=True).head(5)
+        out.write(f"Unique (approx): {unique}\n" if approx else f"Unique: {unique}\n")
         out.write(vc.to_string() + '\n\n')
 
-def grouped_stats_fb_ads(df, keys, out):
-    # Write grouped numeric and categorical stats for the Facebook Ads dataset.
-    group_name = ', '.join(keys)
-    out.write('='*60 + '\n')
-    out.write(f'STATS GROUPED BY ({group_name})\n')
-    out.write('='*60 + '\n')
+def grouped_stats_fb_ads(df, keys, out, heading=True, frame=None):
+    # Write grouped numeric and categorical stats for the Facebook Ads dataset:
+    # one table row per (group, column) from grouped_frame (or a precomputed
+    # frame in chunked mode).
+    if heading:
+        group_name = ', '.join(keys)
+        out.write('='*60 + '\n')
+        out.write(f'STATS GROUPED BY ({group_name})\n')
+        out.write('='*60 + '\n')
 
-    grouped = df.groupby(keys)
-    for name, grp in grouped:
-        out.write(f"Group = {name}\n")
-        # Numeric
-        desc = grp.describe().T.to_string()
-        out.write(desc + '\n')
-        # Categorical
-        cat_cols = grp.select_dtypes(include=['object', 'category']).columns
-        for col in cat_cols:
-            out.write(f"  {col} - Unique: {grp[col].nunique(dropna=True)} | Top 5:\n")
-            vc = grp[col].value_counts(dropna=True).head(5)
-            out.write('    ' + vc.to_string().replace('\n', '\n    ') + '\n')
-        out.write('\n')
+    write_grouped_frame(grouped_frame(df, keys) if frame is None else frame, out)
+    out.write('\n')
 
-def main_fb_ads():
+def main_fb_ads(approx=False, max_groups=None,
+                data_path='data/2024_fb_ads_president_scored_anon.csv',
+                report_path='fb_ads_pandas_report.txt', chunksize=None, cache_dir=None,
+                stats_path=None):
     
     # Main function for Facebook Ads analysis.
+    # chunksize=N reads the file N rows at a time instead of loading it whole;
+    # otherwise cache_dir caches the cleaned frame (load_cached).
+    # report_path=None skips the text report; stats_path also writes the
+    # statistics as JSON Lines / Parquet records (write_outputs).
     
-    data_path = (
-        'data/2024_fb_ads_president_scored_anon.csv'
-    )
-    df = load_and_clean_fb_ads(data_path)
+    if chunksize:
+        print(f"Generating pandas report from {chunksize}-row chunks -> {report_path or stats_path}")
+        write_chunked_report(data_path, report_path, load_and_clean_fb_ads,
+                             [['page_id'], ['page_id', 'ad_id']],
+                             overall_stats_fb_ads, grouped_stats_fb_ads, chunksize, approx,
+                             stats_path, 'fb_ads')
+        print(f"Done! Check {report_path or stats_path} for the pandas analysis.")
+        return
+
+    df = load_cached(data_path, load_and_clean_fb_ads, cache_dir)
 
-    report_path = 'fb_ads_pandas_report.txt'
-    print(f"Generating pandas report -> {report_path}")
+    print(f"Generating pandas report -> {report_path or stats_path}")
 
-    with open(report_path, 'w', encoding='utf-8') as out:
-        overall_stats_fb_ads(df, out)
-        grouped_stats_fb_ads(df, ['page_id'], out)
-        grouped_stats_fb_ads(df, ['page_id', 'ad_id'], out)
+    write_outputs(df, data_path, report_path, stats_path, 'fb_ads', load_and_clean_fb_ads,
+                  [['page_id'], ['page_id', 'ad_id']], overall_stats_fb_ads, grouped_stats_fb_ads,
+                  approx, max_groups)
 
-    print("Done! Check fb_ads_pandas_report.txt for the pandas analysis.")
+    print(f"Done! Check {report_path or stats_path} for the pandas analysis.")
 
 # ----------------------------------------------------------------------------
 # 2. TWITTER POSTS DATASET ANALYSIS
 # ----------------------------------------------------------------------------
 
-def load_and_clean_twitter(path):
+def load_and_clean_twitter(path, dtype=None, chunksize=None):
     """
     Load and clean the Twitter Posts dataset.
-    - Replaces empty/whitespace cells with NaN
+    - Reads columns with the types in SCHEMAS['twitter']
+    - Parses empty/whitespace cells as NaN
     - Drops rows that are entirely NaN
+    dtype optionally fixes other column dtypes (used for spilled partitions);
+    with a chunksize an iterator of cleaned chunks is returned.
     """
-    df = pd.read_csv(path)
-    df = df.replace(r'^\s*$', pd.NA, regex=True)
-    df = df.dropna(how='all')
-    return df
+    return read_dataset(path, SCHEMAS['twitter'], dtype, chunksize)
 
-def write_overall_stats_twitter(df, out):
+@traced('report')
+def write_overall_stats_twitter(df, out, approx=False, summary=None):
     # Write overall numeric and categorical stats for the Twitter Posts dataset.
+    # approx=True labels unique counts as estimates (chunked mode's sketches).
+    # summary is a precomputed overall_summary (chunked mode); df is then unused.
+    desc, categorical = summary or overall_summary(df)
     out.write('='*60 + '\n')
     out.write('TWITTER POSTS DATASET - OVERALL SUMMARY\n')
     out.write('='*60 + '\n')
 
     # Numeric columns
     out.write('\nNumeric columns:\n')
-    num_stats = df.describe().T.round(4)
+    num_stats = desc.round(4)
     out.write(num_stats.to_string() + '\n')
 
     # Categorical columns
     out.write('\nCategorical columns:\n')
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns
-    for col in cat_cols:
+    for col, _, unique, top5 in categorical:
         out.write(f"\nColumn: {col}\n")
-        out.write(f"  - Unique values: {df[col].nunique(dropna=True)}\n")
-        top5 = df[col].value_counts(dropna=True).head(5)
+        if approx:
+            out.write(f"  - Unique values (approx): {unique}\n")
+        else:
+            out.write(f"  - Unique values: {unique}\n")
         out.write("  - Top 5 values:\n")
         out.write(top5.to_string().replace('\n', '\n    ') + '\n')
 
-def write_group_stats_twitter(df, keys, out):
-    # Write grouped numeric and categorical stats for the Twitter Posts dataset.
-    name = ', '.join(keys)
-    out.write('\n' + '='*60 + '\n')
-    out.write(f'STATS GROUPED BY ({name})\n')
-    out.write('='*60 + '\n')
+def write_group_stats_twitter(df, keys, out, heading=True, frame=None):
+    # Write grouped numeric and categorical stats for the Twitter Posts dataset:
+    # one table row per (group, column) from grouped_frame (or a precomputed
+    # frame in chunked mode), 4 decimals.
+    if heading:
+        name = ', '.join(keys)
+        out.write('\n' + '='*60 + '\n')
+        out.write(f'STATS GROUPED BY ({name})\n')
+        out.write('='*60 + '\n')
 
-    for key_vals, group in df.groupby(keys):
-        out.write(f"\nGroup = {key_vals}\n")
-        # Numeric summary
-        num_stats = group.describe().T.round(4)
-        out.write(num_stats.to_string() + '\n')
-        # Categorical summary
-        cat_cols = group.select_dtypes(include=['object', 'category']).columns
-        for col in cat_cols:
-            out.write(f"\nColumn: {col}\n")
-            out.write(f"  - Unique values: {group[col].nunique(dropna=True)}\n")
-            top5 = group[col].value_counts(dropna=True).head(5)
-            out.write("  - Top 5 values:\n")
-            out.write(top5.to_string().replace('\n', '\n    ') + '\n')
+    write_grouped_frame(grouped_frame(df, keys) if frame is None else frame, out, decimals=4)
 
-def main_twitter():
+def main_twitter(approx=False, max_groups=None,
+                 data_path='data/2024_tw_posts_president_scored_anon.csv',
+                 report_path='twitter_pandas_report.txt', chunksize=None, cache_dir=None,
+                 stats_path=None):
     # Main function for Twitter Posts analysis.
-    data_path = (
-        'data/2024_tw_posts_president_scored_anon.csv'
-    )
-    report_path = 'twitter_pandas_report.txt'
+    # chunksize=N reads the file N rows at a time instead of loading it whole;
+    # otherwise cache_dir caches the cleaned frame (load_cached).
+    # report_path=None skips the text report; stats_path also writes the
+    # statistics as JSON Lines / Parquet records (write_outputs).
+
+    if chunksize:
+        print(f"Writing full report from {chunksize}-row chunks of {data_path} to {report_path or stats_path}")
+        write_chunked_report(data_path, report_path, load_and_clean_twitter,
+                             [['id'], ['id', 'url']],
+                             write_overall_stats_twitter, write_group_stats_twitter,
+                             chunksize, approx, stats_path, 'twitter')
+        print(f"Done! Check {report_path or stats_path} for the report.")
+        return
 
     print(f"Loading and cleaning data from {data_path}")
-    df = load_and_clean_twitter(data_path)
+    df = load_cached(data_path, load_and_clean_twitter, cache_dir)
 
-    print(f"Writing full report to {report_path}")
-    with open(report_path, 'w', encoding='utf-8') as out:
-        write_overall_stats_twitter(df, out)
-        write_group_stats_twitter(df, ['id'], out)
-        write_group_stats_twitter(df, ['id', 'url'], out)
+    print(f"Writing full report to {report_path or stats_path}")
+    write_outputs(df, data_path, report_path, stats_path, 'twitter', load_and_clean_twitter,
+                  [['id'], ['id', 'url']], write_overall_stats_twitter, write_group_stats_twitter,
+                  approx, max_groups)
 
-    print("Done! Check twitter_pandas_report.txt for the report.")
+    print(f"Done! Check {report_path or stats_path} for the report.")
 
 # ----------------------------------------------------------------------------
 # 3. FACEBOOK POSTS DATASET ANALYSIS
 # ----------------------------------------------------------------------------
 
-def load_and_clean_fb_posts(path):
+def load_and_clean_fb_posts(path, dtype=None, chunksize=None):
     """
     Load and clean the Facebook Posts dataset.
-    - Replaces empty/whitespace cells with NaN
+    - Reads columns with the types in SCHEMAS['fb_posts']
+    - Parses empty/whitespace cells as NaN
     - Drops rows that are entirely NaN
+    dtype optionally fixes other column dtypes (used for spilled partitions);
+    with a chunksize an iterator of cleaned chunks is returned.
     """
-    df = pd.read_csv(path)
-    df = df.replace(r'^\s*$', pd.NA, regex=True)
-    df = df.dropna(how='all')
-    return df
+    return read_dataset(path, SCHEMAS['fb_posts'], dtype, chunksize)
 
-def write_overall_stats_fb_posts(df, out):
+@traced('report')
+def write_overall_stats_fb_posts(df, out, approx=False, summary=None):
     # Write overall numeric and categorical stats for the Facebook Posts dataset.
+    # approx=True labels unique counts as estimates (chunked mode's sketches).
+    # summary is a precomputed overall_summary (chunked mode); df is then unused.
+    desc, categorical = summary or overall_summary(df)
     out.write('='*60 + '\n')
     out.write('FACEBOOK POSTS DATASET - OVERALL SUMMARY\n')
     out.write('='*60 + '\n')
 
     # Numeric columns
     out.write('\nNumeric columns:\n')
-    num_stats = df.describe().T.round(4)
+    num_stats = desc.round(4)
     out.write(num_stats.to_string() + '\n')
 
     # Categorical columns
     out.write('\nCategorical columns:\n')
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns
-    for col in cat_cols:
+    for col, _, unique, top5 in categorical:
         out.write(f"\nColumn: {col}\n")
-        out.write(f"  - Unique values: {df[col].nunique(dropna=True)}\n")
-        top5 = df[col].value_counts(dropna=True).head(5)
+        if approx:
+            out.write(f"  - Unique values (approx): {unique}\n")
+        else:
+            out.write(f"  - Unique values: {unique}\n")
         out.write("  - Top 5 values:\n")
         out.write(top5.to_string().replace('\n', '\n    ') + '\n')
 
-def write_group_stats_fb_posts(df, keys, out):
-    # Write grouped numeric and categorical stats for the Facebook Posts dataset.
-    name = ', '.join(keys)
-    out.write('\n' + '='*60 + '\n')
-    out.write(f'STATS GROUPED BY ({name})\n')
-    out.write('='*60 + '\n')
+def write_group_stats_fb_posts(df, keys, out, heading=True, frame=None):
+    # Write grouped numeric and categorical stats for the Facebook Posts dataset:
+    # one table row per (group, column) from grouped_frame (or a precomputed
+    # frame in chunked mode), 4 decimals.
+    if heading:
+        name = ', '.join(keys)
+        out.write('\n' + '='*60 + '\n')
+        out.write(f'STATS GROUPED BY ({name})\n')
+        out.write('='*60 + '\n')
 
-    for key_vals, group in df.groupby(keys):
-        out.write(f"\nGroup = {key_vals}\n")
-        # Numeric summary
-        num_stats = group.describe().T.round(4)
-        out.write(num_stats.to_string() + '\n')
-        # Categorical summary
-        cat_cols = group.select_dtypes(include=['object', 'category']).columns
-        for col in cat_cols:
-            out.write(f"\nColumn: {col}\n")
-            out.write(f"  - Unique values: {group[col].nunique(dropna=True)}\n")
-            top5 = group[col].value_counts(dropna=True).head(5)
-            out.write("  - Top 5 values:\n")
-            out.write(top5.to_string().replace('\n', '\n    ') + '\n')
+    write_grouped_frame(grouped_frame(df, keys) if frame is None else frame, out, decimals=4)
 
-def main_fb_posts():
+def main_fb_posts(approx=False, max_groups=None,
+                  data_path='data/2024_fb_posts_president_scored_anon.csv',
+                  report_path='fb_posts_pandas_report.txt', chunksize=None, cache_dir=None,
+                  stats_path=None):
     # Main function for Facebook Posts analysis.
-    data_path = (
-        'data/2024_fb_posts_president_scored_anon.csv'
-    )
-    df = load_and_clean_fb_posts(data_path)
+    # chunksize=N reads the file N rows at a time instead of loading it whole;
+    # otherwise cache_dir caches the cleaned frame (load_cached).
+    # report_path=None skips the text report; stats_path also writes the
+    # statistics as JSON Lines / Parquet records (write_outputs).
+    if chunksize:
+        print(f"Generating pandas report from {chunksize}-row chunks -> {report_path or stats_path}")
+        write_chunked_report(data_path, report_path, load_and_clean_fb_posts,
+                             [['Facebook_Id'], ['Facebook_Id', 'post_id']],
+                             write_overall_stats_fb_posts, write_group_stats_fb_posts,
+                             chunksize, approx, stats_path, 'fb_posts')
+        print(f"Done! Check {report_path or stats_path} for the pandas analysis.")
+        return
+
+    df = load_cached(data_path, load_and_clean_fb_posts, cache_dir)
 
-    report_path = 'fb_posts_pandas_report.txt'
-    print(f"Generating pandas report -> {report_path}")
+    print(f"Generating pandas report -> {report_path or stats_path}")
 
-    with open(report_path, 'w', encoding='utf-8') as out:
-        write_overall_stats_fb_posts(df, out)
-        write_group_stats_fb_posts(df, ['Facebook_Id'], out)
-        write_group_stats_fb_posts(df, ['Facebook_Id', 'post_id'], out)
+    write_outputs(df, data_path, report_path, stats_path, 'fb_posts', load_and_clean_fb_posts,
+                  [['Facebook_Id'], ['Facebook_Id', 'post_id']], write_overall_stats_fb_posts, write_group_stats_fb_posts,
+                  approx, max_groups)
 
-    print("Done! Check fb_posts_pandas_report.txt for the pandas analysis.")
+    print(f"Done! Check {report_path or stats_path} for the pandas analysis.")
 
 # Uncomment the desired main function to run the analysis for that dataset
 
-# main_fb_ads()
-# main_twitter()
-main_fb_posts()
\ No newline at end of file
+if __name__ == '__main__':
+    # main_fb_ads()
+    # main_twitter()
+    main_fb_posts()
\ No newline at end of file
@@ -3,120 +3,382 @@
 
 
 #This script uses Polars to load, clean, and analyze the Twitter posts dataset:
-# - Reads the CSV into a Polars DataFrame
-# - Drops fully blank rows
-# - Prints overall descriptive statistics via DataFrame.describe()
-# - For categorical columns: prints value_counts() and n_unique()
-# - Computes grouped summaries by keys using group_by().agg()
+# - Scans the CSV lazily into a Polars LazyFrame, trims strings, turns blank
+#   cells into nulls and drops fully blank rows, all as native expressions
+#   planned and run together with the aggregations below
+# - Computes the overall statistics of every column in one select(): count,
+#   mean, std, min, quartiles and max of numeric columns, count, n_unique,
+#   top value and its frequency of string columns
+# - Computes the same statistics per group by keys in one group_by().agg()
+# - Optionally writes the same statistics as JSON Lines / Parquet records
+#   (stats_output.py) through a StatsWriter passed as `stats`
+# - analyze_all builds every dataset's overall and grouped queries up front
+#   and runs them together with collect_all, sharing scans and cleaning
+# - With a sink_dir, runs on the streaming engine and sinks each grouping's
+#   complete summary straight to a Parquet or CSV file (for inputs larger
+#   than memory)
 
 
 
+import os
+
 import polars as pl
 
+from cache import CACHE_DIR, cache_paths, cached
+from dataset_registry import DATASETS
+from group_index import load_index
+from instrument import stage, traced
+from sketches import CategoricalSketch
+from stats_output import StatsWriter
+
+# Clean a LazyFrame using Polars: string columns are trimmed and blank
+# strings set to null, and rows where every column is null are dropped.
+# Everything is a native expression, so the cleaning is optimized (projection
+# and predicate pushdown) and run multi-threaded as part of whatever query is
+# built on the returned LazyFrame.
+def clean(lf: pl.LazyFrame) -> pl.LazyFrame:
+    trimmed = pl.col(pl.Utf8).str.strip_chars()
+    lf = lf.with_columns(pl.when(trimmed != "").then(trimmed))
+    return lf.filter(pl.any_horizontal(pl.all().is_not_null()))
+
+# Lazily scan and clean a CSV file
+def scan_and_clean(path: str) -> pl.LazyFrame:
+    return clean(pl.scan_csv(path, infer_schema_length=1000))
+
 # Function to load and clean a CSV file using Polars
 def load_and_clean(path: str) -> pl.DataFrame:
-    # Read CSV file
-    df = pl.read_csv(path, infer_schema_length=1000)
-    # For each string column, trim whitespace and set empty strings to null
-    for col, dtype in zip(df.columns, df.dtypes):
-        if dtype == pl.Utf8:
-            df = df.with_columns(
-                pl.when(pl.col(col).str.strip_chars() == "")
-                  .then(None)
-                  .otherwise(pl.col(col).str.strip_chars())
-                  .alias(col)
-            )
-    # Drop rows where all columns are null
-    df = df.filter(
-        pl.fold(
-            acc=pl.lit(False),
-            function=lambda acc, s: acc | s.is_not_null(),
-            exprs=[pl.col(c) for c in df.columns]
-        )
-    )
-    return df
-
-# Function to write overall statistics to a file
-def overall_stats(df: pl.DataFrame, out) -> None:
-    out.write("--- Overall Numeric Summary ---\n")
-    out.write(str(df.describe()) + "\n\n")
-    # For each string column, write categorical stats
-    for col in df.columns:
-        if df[col].dtype == pl.Utf8:
-            out.write(f"\n--- Categorical summary for '{col}' ---\n")
-            vc = df[col].value_counts()
-            out.write(str(vc) + "\n")
-            out.write(f"Unique values in '{col}': {df[col].n_unique()}\n\n")
-
-# Function to write grouped statistics to a file
-def group_stats(df: pl.DataFrame, keys: list[str], out) -> None:
-    out.write(f"\n--- Grouped Summary by {keys} ---\n")
-    # Find numeric columns
-    numeric_types = (pl.Float64, pl.Int64, pl.UInt64, pl.Float32, pl.Int32, pl.UInt32)
-    numeric_cols = [col for col, dtype in zip(df.columns, df.dtypes) if dtype in numeric_types]
-    if not numeric_cols:
-        out.write("No numeric columns to summarize.\n")
-        return
-    # Prepare aggregation expressions for each numeric column
-    agg_exprs = []
+    return scan_and_clean(path).collect()
+
+# scan_and_clean through the on-disk cache in cache.py: with a cache_dir the
+# cleaned frame is streamed there as Arrow IPC on the first run (sink_ipc, so
+# never held in memory whole), and every run scans that file instead of the
+# CSV while the CSV is unchanged (polars memory-maps local IPC files and reads
+# only the columns a query uses).
+@traced("load")
+def scan_cached(path: str, cache_dir: str | None = None) -> pl.LazyFrame:
+    if cache_dir is None:
+        return scan_and_clean(path)
+    cached(path, "polars", lambda: scan_and_clean(path),
+           lambda lf, p: lf.sink_ipc(p), pl.scan_ipc, cache_dir, ".arrow")
+    # a miss returns the CSV scan; both hits and misses go on from the IPC file
+    return pl.scan_ipc(cache_paths(path, "polars", cache_dir, ".arrow")[0])
+
+# scan_cached, collected (only `columns`, if given)
+def load_cached(path: str, cache_dir: str | None = None, columns: list[str] | None = None) -> pl.DataFrame:
+    lf = scan_cached(path, cache_dir)
+    return (lf if columns is None else lf.select(columns)).collect()
+
+NUMERIC_TYPES = (pl.Float64, pl.Int64, pl.UInt64, pl.Float32, pl.Int32, pl.UInt32)
+
+# Statistics of the combined summaries, named as in stats_output.py
+NUMERIC_STATS = ("count", "mean", "std", "min", "p25", "p50", "p75", "max")
+CATEGORICAL_STATS = ("count", "unique", "top", "freq")
+QUANTILES = {"p25": 0.25, "p50": 0.5, "p75": 0.75}
+
+# Names of the numeric columns of a DataFrame or LazyFrame (from its schema,
+# without running a lazy query)
+def numeric_columns(df: pl.DataFrame | pl.LazyFrame) -> list[str]:
+    return [col for col, dtype in df.collect_schema().items() if dtype in NUMERIC_TYPES]
+
+# Names of the string columns of a DataFrame or LazyFrame
+def string_columns(df: pl.DataFrame | pl.LazyFrame) -> list[str]:
+    return [col for col, dtype in df.collect_schema().items() if dtype == pl.Utf8]
+
+# Aggregation expressions for every statistic of every column, named
+# "<column>_<stat>": count / mean / std / min / quartiles / max of the numeric
+# columns (linear quartiles, as pandas computes them) and count / unique / top
+# / freq of the string columns, nulls ignored. Used in select() for the
+# overall summary and in group_by().agg() for the grouped ones, so each is a
+# single query the engine runs in parallel. approx=True estimates unique with
+# HyperLogLog (approx_n_unique) and leaves out top / freq.
+def summary_exprs(numeric_cols: list[str], string_cols: list[str], approx: bool = False) -> list[pl.Expr]:
+    exprs = []
     for col in numeric_cols:
-        agg_exprs.extend([
-            pl.col(col).mean().alias(f"{col}_mean"),
-            pl.col(col).std().alias(f"{col}_std"),
-            pl.col(col).min().alias(f"{col}_min"),
-            pl.col(col).max().alias(f"{col}_max"),
+        c = pl.col(col).cast(pl.Float64)
+        exprs.extend([
+            c.count().alias(f"{col}_count"),
+            c.mean().alias(f"{col}_mean"),
+            c.std().alias(f"{col}_std"),
+            c.min().alias(f"{col}_min"),
+            *(c.quantile(q, interpolation="linear").alias(f"{col}_{name}") for name, q in QUANTILES.items()),
+            c.max().alias(f"{col}_max"),
         ])
-    # Group by keys and aggregate
-    summary = df.group_by(keys).agg(agg_exprs)
-    out.write(str(summary) + "\n")
+    for col in string_cols:
+        values = pl.col(col).drop_nulls()
+        exprs.append(values.count().alias(f"{col}_count"))
+        if approx:
+            exprs.append(values.approx_n_unique().alias(f"{col}_unique"))
+            continue
+        # most frequent value (the smallest one on ties, as in the other
+        # engines) and its count
+        top = values.mode().min()
+        exprs.extend([
+            values.n_unique().alias(f"{col}_unique"),
+            top.alias(f"{col}_top"),
+            (values == top).sum().cast(pl.Int64).alias(f"{col}_freq"),
+        ])
+    return exprs
+
+# Reshape a wide summary (one row per group, "<column>_<stat>" columns) into
+# one row per (group, column) with a column per statistic: for each group the
+# numeric columns, then the string ones, groups in key order.
+# wide may be a LazyFrame (the result is then lazy too); sort=False leaves the
+# groups in the order the aggregation produced them.
+def long_summary(wide: pl.DataFrame | pl.LazyFrame, keys: list[str], numeric_cols: list[str],
+                 string_cols: list[str], sort: bool = True) -> pl.DataFrame | pl.LazyFrame:
+    names = wide.collect_schema().names()
+    parts = []
+    for cols, stat_names in ((numeric_cols, NUMERIC_STATS), (string_cols, CATEGORICAL_STATS)):
+        for col in cols:
+            stats = [pl.col(f"{col}_{s}").alias(s) for s in stat_names if f"{col}_{s}" in names]
+            parts.append(wide.select(*keys, pl.lit(col).alias("column"), *stats))
+    if not parts:
+        empty = pl.DataFrame(schema={**{k: pl.Utf8 for k in keys}, "column": pl.Utf8})
+        return empty.lazy() if isinstance(wide, pl.LazyFrame) else empty
+    summary = pl.concat(parts, how="diagonal_relaxed")
+    return summary.sort(keys, maintain_order=True) if keys and sort else summary
+
+# The overall summary query of df, unevaluated: one select() of summary_exprs
+def overall_query(df: pl.DataFrame | pl.LazyFrame, approx: bool = False) -> pl.LazyFrame:
+    return df.lazy().select(summary_exprs(numeric_columns(df), string_columns(df), approx))
+
+# Overall statistics of every column as a long_summary (no keys), from one
+# select() over df, run on the given polars engine ("streaming" for inputs
+# larger than memory), or from wide, that query's already collected result.
+# With approx=True, unique is estimated in that query and top / freq come
+# from a Space-Saving sketch fed the string columns a batch at a time.
+@traced("overall")
+def overall_summary(df: pl.DataFrame | pl.LazyFrame, approx: bool = False, engine: str = "auto",
+                    wide: pl.DataFrame | None = None) -> pl.DataFrame:
+    numeric_cols, string_cols = numeric_columns(df), string_columns(df)
+    if wide is None:
+        wide = overall_query(df, approx).collect(engine=engine)
+    summary = long_summary(wide, [], numeric_cols, string_cols)
+    if approx and string_cols:
+        sketches = {col: CategoricalSketch() for col in string_cols}
+        for batch in df.lazy().select(string_cols).collect_batches(engine=engine):
+            for col, sketch in sketches.items():
+                sketch.update(batch[col].drop_nulls())
+        tops = {}
+        for col, sketch in sketches.items():
+            top = sketch.top(1)
+            tops[col] = (top[0][0], top[0][1]) if top else (None, None)
+        summary = summary.with_columns(
+            pl.Series("top", [tops.get(col, (None, None))[0] for col in summary["column"]], dtype=pl.Utf8),
+            pl.Series("freq", [tops.get(col, (None, None))[1] for col in summary["column"]], dtype=pl.Int64),
+        )
+    return summary
+
+# A summary frame as text, every column shown; all rows and whole strings too
+# when full=True
+def render(frame: pl.DataFrame, full: bool = False) -> str:
+    longest = 80
+    if full and string_columns(frame):
+        lengths = frame.select(pl.col(pl.Utf8).str.len_chars().max()).row(0)
+        longest = max([longest] + [n for n in lengths if n is not None])
+    with pl.Config(tbl_cols=-1, tbl_rows=-1 if full else None, tbl_width_chars=1000, fmt_str_lengths=longest):
+        return str(frame)
+
+# Function to write overall statistics to a file: one table for the numeric
+# columns and one for the string columns (count / unique / top / freq).
+# approx=True estimates unique and top (see overall_summary). summary is a
+# precomputed overall_summary; df is then unused.
+@traced("report")
+def overall_stats(df: pl.DataFrame | pl.LazyFrame, out, approx: bool = False,
+                  summary: pl.DataFrame | None = None) -> None:
+    if summary is None:
+        summary = overall_summary(df, approx)
+    # string columns are the rows with a unique count
+    is_string = pl.col("unique").is_not_null() if "unique" in summary.columns else pl.lit(False)
+    sections = (("Numeric", ~is_string, NUMERIC_STATS),
+                ("Categorical (approx)" if approx else "Categorical", is_string, CATEGORICAL_STATS))
+    for title, rows, names in sections:
+        part = summary.filter(rows)
+        out.write(f"--- Overall {title} Summary ---\n")
+        out.write(render(part.select([c for c in ("column", *names) if c in part.columns]), True) + "\n\n")
+
+# Write the rows of a long_summary as records to a StatsWriter
+@traced("report")
+def write_records(summary: pl.DataFrame, keys: list[str], stats: StatsWriter) -> None:
+    if summary.is_empty():
+        return
+    stat_names = [s for s in dict.fromkeys(NUMERIC_STATS + CATEGORICAL_STATS) if s in summary.columns]
+    stats.write(keys, summary.select(keys).rows() if keys else [()] * len(summary), summary["column"],
+                {s: summary[s] for s in stat_names})
+
+# Overall statistics as records (grouping []), from overall_summary or a
+# precomputed summary.
+def overall_records(df: pl.DataFrame | pl.LazyFrame, stats: StatsWriter, approx: bool = False,
+                    summary: pl.DataFrame | None = None) -> None:
+    write_records(overall_summary(df, approx) if summary is None else summary, [], stats)
+
+SINK_FORMATS = ("parquet", "csv")
+
+# File a streamed grouping is sunk to: <sink_dir>/<name>_by_<keys>.<fmt>
+def sink_path(sink_dir: str, name: str, keys: list[str], fmt: str = "parquet") -> str:
+    return os.path.join(sink_dir, f"{name}_by_{'_'.join(keys)}.{fmt}")
+
+# Scan a sunk summary file
+def scan_sink(path: str) -> pl.LazyFrame:
+    return pl.scan_csv(path) if path.endswith(".csv") else pl.scan_parquet(path)
+
+# The numeric and string columns summarized when grouping df by keys
+def group_columns(df: pl.DataFrame | pl.LazyFrame, keys: list[str]) -> tuple[list[str], list[str]]:
+    return ([c for c in numeric_columns(df) if c not in keys],
+            [c for c in string_columns(df) if c not in keys])
+
+# The grouped summary query of df by keys, unevaluated: one group_by().agg()
+# of summary_exprs
+def group_query(df: pl.DataFrame | pl.LazyFrame, keys: list[str]) -> pl.LazyFrame:
+    return df.lazy().group_by(keys).agg(summary_exprs(*group_columns(df, keys)))
+
+# Function to write grouped statistics to a file (out=None skips it) and/or
+# as records to a StatsWriter: every numeric and string column other than the
+# keys, summarized per group by one group_by().agg() with summary_exprs. With
+# a LazyFrame the aggregation runs as one query with the scan and cleaning;
+# wide is group_query's result when it was already collected (analyze_all).
+# With a sink (a .parquet or .csv path) the query runs on the streaming engine
+# and its result goes straight to that file, complete and unsorted, instead of
+# being collected; the report then only names the file, and records are read
+# back from it a batch at a time.
+def group_stats(df: pl.DataFrame | pl.LazyFrame, keys: list[str], out, stats: StatsWriter | None = None,
+                sink: str | None = None, wide: pl.DataFrame | None = None) -> None:
+    if out is not None:
+        out.write(f"\n--- Grouped Summary by {keys} ---\n")
+    numeric_cols, string_cols = group_columns(df, keys)
+    if not numeric_cols and not string_cols:
+        if out is not None:
+            out.write("No columns to summarize.\n")
+        return
+    if sink is not None:
+        summary = long_summary(group_query(df, keys), keys, numeric_cols, string_cols, sort=False)
+        with stage("grouped", "polars_stats.group_stats", sink=sink):
+            if sink.endswith(".csv"):
+                summary.sink_csv(sink)
+            else:
+                summary.sink_parquet(sink)
+        if out is not None:
+            out.write(f"Written to {sink}\n")
+        if stats is not None:
+            for batch in scan_sink(sink).collect_batches(engine="streaming"):
+                write_records(batch, keys, stats)
+        return
+    if wide is None:
+        with stage("grouped", "polars_stats.group_stats") as s:
+            wide = group_query(df, keys).collect()
+            s.record(groups=wide.height)
+    summary = long_summary(wide, keys, numeric_cols, string_cols)
+    if out is not None:
+        out.write(render(summary, True) + "\n")
+    if stats is not None:
+        write_records(summary, keys, stats)
+
+# Grouped summary (long_summary) of just the listed groups of keys (key
+# tuples, or single values for one key column). Only their records are read,
+# through the group-key index of group_index.py, and parsed with the schema
+# the whole file is scanned with, so columns are typed as in a full run.
+def summarize_groups(path: str, keys: list[str], groups: list, cache_dir: str | None = CACHE_DIR) -> pl.DataFrame:
+    index = load_index(path, keys, cache_dir)
+    schema = pl.scan_csv(path, infer_schema_length=1000).collect_schema()
+    df = clean(pl.read_csv(index.read(path, groups), schema=schema).lazy())
+    return long_summary(group_query(df, keys).collect(), keys, *group_columns(df, keys))
+
+# Report titles of the datasets in dataset_registry.py
+TITLES = {"twitter": "Twitter Posts", "fb_ads": "Facebook Ads", "fb_posts": "Facebook Posts"}
+
+# The queries of one dataset: the overall summary, then one per key set
+def dataset_queries(df: pl.LazyFrame, key_sets: list[list[str]], approx: bool = False) -> list[pl.LazyFrame]:
+    return [overall_query(df, approx)] + [group_query(df, keys) for keys in key_sets]
+
+# Write one dataset's report and/or records from its collected dataset_queries
+def write_dataset(df: pl.LazyFrame, out, title: str, key_sets: list[list[str]], approx: bool,
+                  stats: StatsWriter | None, frames: list[pl.DataFrame]) -> None:
+    if out is not None:
+        out.write(f"=== Analyzing {title} ===\n")
+    summary = overall_summary(df, approx, wide=frames[0])
+    if out is not None:
+        overall_stats(df, out, approx, summary)
+    if stats is not None:
+        overall_records(df, stats, approx, summary)
+    for keys, wide in zip(key_sets, frames[1:]):
+        group_stats(df, keys, out, stats, wide=wide)
+
+# Overall and grouped statistics of one dataset, to the report and/or records.
+# The overall and grouped queries run together in one collect_all, so the
+# scan and cleaning are shared. With a sink_dir every grouping is instead
+# streamed to its own sink_format file there and the overall summary runs on
+# the streaming engine as well.
+def analyze(path: str, out, title: str, name: str, key_sets: list[list[str]], approx: bool = False,
+            cache_dir: str | None = None, stats: StatsWriter | None = None,
+            sink_dir: str | None = None, sink_format: str = "parquet") -> None:
+    df = scan_cached(path, cache_dir)
+    if sink_dir is None:
+        with stage("queries", "polars_stats.analyze") as s:
+            frames = pl.collect_all(dataset_queries(df, key_sets, approx))
+            s.record(groups=sum(frame.height for frame in frames[1:]))
+        write_dataset(df, out, title, key_sets, approx, stats, frames)
+        return
+    if out is not None:
+        out.write(f"=== Analyzing {title} ===\n")
+    summary = overall_summary(df, approx, "streaming")
+    if out is not None:
+        overall_stats(df, out, approx, summary)
+    if stats is not None:
+        overall_records(df, stats, approx, summary)
+    os.makedirs(sink_dir, exist_ok=True)
+    for keys in key_sets:
+        group_stats(df, keys, out, stats, sink_path(sink_dir, name, keys, sink_format))
+
+# Batch mode: analyze several datasets at once. jobs maps dataset names of
+# dataset_registry.py to (csv path, report file or None, StatsWriter or None).
+# Every dataset's overall and grouped queries are built up front and run in a
+# single collect_all, so polars schedules them in parallel and the whole set
+# takes about as long as the slowest dataset; the reports are then written
+# one after another.
+def analyze_all(jobs: dict[str, tuple[str, object, StatsWriter | None]], approx: bool = False,
+                cache_dir: str | None = None) -> None:
+    frames = {name: scan_cached(path, cache_dir) for name, (path, _, _) in jobs.items()}
+    queries = {name: dataset_queries(df, DATASETS[name]["keys"], approx) for name, df in frames.items()}
+    with stage("queries", "polars_stats.analyze_all", datasets=list(jobs)):
+        results = iter(pl.collect_all([q for qs in queries.values() for q in qs]))
+    for name, (_, out, stats) in jobs.items():
+        write_dataset(frames[name], out, TITLES[name], DATASETS[name]["keys"], approx, stats,
+                      [next(results) for _ in queries[name]])
 
 # Analyze Twitter posts and write results to a file
-def analyze_twitter(path: str, out) -> None:
-    out.write("=== Analyzing Twitter Posts ===\n")
-    df = load_and_clean(path)
-    overall_stats(df, out)
-    for keys in [["id"], ["id", "url"]]:
-        group_stats(df, keys, out)
+def analyze_twitter(path: str, out, approx: bool = False, cache_dir: str | None = None,
+                    stats: StatsWriter | None = None, sink_dir: str | None = None,
+                    sink_format: str = "parquet") -> None:
+    analyze(path, out, TITLES["twitter"], "twitter", [["id"], ["id", "url"]], approx, cache_dir, stats,
+            sink_dir, sink_format)
 
 # Analyze Facebook Ads and write results to a file
-def analyze_fb_ads(path: str, out) -> None:
-    out.write("=== Analyzing Facebook Ads ===\n")
-    df = load_and_clean(path)
-    overall_stats(df, out)
-    group_stats(df, ["page_id"], out)
-    group_stats(df, ["page_id", "ad_id"], out)
+def analyze_fb_ads(path: str, out, approx: bool = False, cache_dir: str | None = None,
+                   stats: StatsWriter | None = None, sink_dir: str | None = None,
+                   sink_format: str = "parquet") -> None:
+    analyze(path, out, TITLES["fb_ads"], "fb_ads", [["page_id"], ["page_id", "ad_id"]], approx, cache_dir,
+            stats, sink_dir, sink_format)
 
 # Analyze Facebook Posts and write results to a file
-def analyze_fb_posts(path: str, out) -> None:
-    out.write("=== Analyzing Facebook Posts ===\n")
-    df = load_and_clean(path)
-    overall_stats(df, out)
-    group_stats(df, ["Facebook_Id"], out)
-    group_stats(df, ["Facebook_Id", "post_id"], out)
+def analyze_fb_posts(path: str, out, approx: bool = False, cache_dir: str | None = None,
+                     stats: StatsWriter | None = None, sink_dir: str | None = None,
+                     sink_format: str = "parquet") -> None:
+    analyze(path, out, TITLES["fb_posts"], "fb_posts", [["Facebook_Id"], ["Facebook_Id", "post_id"]], approx,
+            cache_dir, stats, sink_dir, sink_format)
 
 if __name__ == '__main__':
-    # Analyze Twitter posts and export to file
-    twitter_path = (
-        '/Users/adityadeshmukh/Downloads/OPT_project/Dataset_Election/'
-        '2024_tw_posts_president_scored_anon.csv'
-    )
-    with open("twitter_polars_report.txt", "w", encoding="utf-8") as out:
-        analyze_twitter(twitter_path, out)
-
-    # Analyze Facebook ads and export to file
-    fb_ads_path = (
-        '/Users/adityadeshmukh/Downloads/OPT_project/Dataset_Election/'
-        '2024_fb_ads_president_scored_anon.csv'
-    )
-    with open("fb_ads_polars_report.txt", "w", encoding="utf-8") as out:
-        analyze_fb_ads(fb_ads_path, out)
-
-    # Analyze Facebook posts and export to file
-    fb_posts_path = (
-        '/Users/adityadeshmukh/Downloads/OPT_project/Dataset_Election/'
-        '2024_fb_posts_president_scored_anon.csv'
-    )
-    with open("fb_posts_polars_report.txt", "w", encoding="utf-8") as out:
-        analyze_fb_posts(fb_posts_path, out)
+    # Analyze Twitter posts, Facebook ads and Facebook posts together and
+    # export each to its report file
+    paths = {
+        "twitter": ('data/2024_tw_posts_president_scored_anon.csv', "twitter_polars_report.txt"),
+        "fb_ads": ('data/2024_fb_ads_president_scored_anon.csv', "fb_ads_polars_report.txt"),
+        "fb_posts": ('data/2024_fb_posts_president_scored_anon.csv', "fb_posts_polars_report.txt"),
+    }
+    outs = {name: open(report, "w", encoding="utf-8") for name, (_, report) in paths.items()}
+    try:
+        analyze_all({name: (path, outs[name], None) for name, (path, _) in paths.items()})
+    finally:
+        for out in outs.values():
+            out.close()
 
     print("\nAnalysis complete. Results exported to report files.")
@@ -20,8 +20,25 @@
 #at the bottom of the script.
 
 import csv
+import hashlib
+import heapq
+import io
 import math
-from collections import Counter, defaultdict
+import mmap
+import os
+import pickle
+import tempfile
+import zlib
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress
+
+from cache import CACHE_DIR, cached, read_pickle, write_pickle
+from group_index import load_index
+from instrument import traced
+from sketches import CategoricalSketch, HyperLogLog, QuantileSketch, sorted_quantile
+from stats_output import StatsWriter
 
 # =========================
 # Utility Functions
@@ -35,24 +52,52 @@ def is_number(val):
     except ValueError:
         return False
 
+# Percentiles reported for numeric columns, labelled like describe().
+QUARTILES = (0.25, 0.5, 0.75)
+QUARTILE_LABELS = ('25%', '50%', '75%')
+
 def stats_numeric(vals):
     
 # Compute statistics for numeric columns: count, mean, min, max, std deviation
+# and the 25% / 50% / 75% percentiles
   
-    nums = [float(x) for x in vals]
+    return stats_floats([float(x) for x in vals])
+
+def stats_floats(nums):
+
+    # stats_numeric for values that are already floats.
+
     n = len(nums)
     mean = sum(nums) / n if n else 0
     mn = min(nums) if nums else 0
     mx = max(nums) if nums else 0
-    var = sum((x - mean) ** 2 for x in nums) / n if n else 0
-    std = math.sqrt(var)
-    return {
+    m2 = sum((x - mean) ** 2 for x in nums)
+    quartiles = ()
+    if n:
+        ordered = sorted(nums)
+        quartiles = [sorted_quantile(ordered, q) for q in QUARTILES]
+    return numeric_stats(n, mean, m2, mn, mx, quartiles)
+
+class NumericStats(dict):
+    """A stats_numeric dict that also keeps its statistics record in .record."""
+
+    # The dict itself is what the text report prints (mean and percentiles
+    # rounded to 4 places, population std); .record holds the same statistics
+    # unrounded with the sample std (None below two values), as pandas and
+    # polars compute them, for the records of stats_output.py.
+
+def numeric_stats(n, mean, m2, mn, mx, quartiles):
+    stats = NumericStats({
         'count': n,
         'mean': round(mean, 4),
         'min': mn,
         'max': mx,
-        'std': round(std, 4)
-    }
+        'std': round(math.sqrt(m2 / n if n else 0), 4)
+    })
+    stats.update(zip(QUARTILE_LABELS, [round(x, 4) for x in quartiles]))
+    stats.record = dict(stats, mean=mean, std=math.sqrt(m2 / (n - 1)) if n > 1 else None)
+    stats.record.update(zip(QUARTILE_LABELS, quartiles))
+    return stats
 
 def stats_categorical(vals):
   
@@ -61,10 +106,18 @@ def stats_categorical(vals):
     # and ignores blank values.
     
     cleaned = [v for v in vals if v.strip()]
-    ctr = Counter(cleaned)
+    return stats_counter(Counter(cleaned))
+
+def stats_counter(ctr):
+
+    # stats_categorical for values that are already counted.
+
+    # the top value is the smallest of the most frequent ones, as in the
+    # pandas and polars engines
     count = sum(ctr.values())
     unique = len(ctr)
-    top, freq = ctr.most_common(1)[0] if ctr else (None, 0)
+    freq = max(ctr.values()) if ctr else 0
+    top = min(v for v, c in ctr.items() if c == freq) if ctr else None
     return {
         'count': count,
         'unique': unique,
@@ -81,24 +134,35 @@ def summarize_column(col_vals):
         return stats_numeric(non_blank)
     return stats_categorical(col_vals)
 
+def iter_csv_rows(path):
+
+    # Yield the header, then every row that is not entirely blank, one at a time.
+    # Nothing is kept in memory beyond the current row.
+
+    with open(path, encoding='utf-8', newline='') as fh:
+        reader = csv.reader(fh)
+        yield next(reader)
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield row
+
+@traced('load', rows=lambda loaded: len(loaded[1]))
 def load_csv(path):
-    
+
     # Load a CSV file, dropping rows where every cell is blank.
     # Returns header and list of rows.
 
-    with open(path, encoding='utf-8', newline='') as fh:
-        reader = csv.reader(fh)
-        header = next(reader)
-        rows = [row for row in reader if any(cell.strip() for cell in row)]
-    return header, rows
+    rows = iter_csv_rows(path)
+    header = next(rows)
+    return header, list(rows)
 
+@traced('overall')
 def overall_summary(header, rows):
     
     # Compute summary statistics for all columns in the dataset.
     # Returns a dictionary: column name -> stats dict.
     
-    cols = list(zip(*rows))
-    return {name: summarize_column(vals) for name, vals in zip(header, cols)}
+    return typed_overall_summary(TypedTable.from_rows(header, rows))
 
 def grouped_summary(header, rows, keys):
     
@@ -106,186 +170,1033 @@ def grouped_summary(header, rows, keys):
     # then calculate descriptive stats for each group.
     # The result maps each unique key tuple to its stats dictionary.
     
-    idxs = [header.index(k) for k in keys]
-    buckets = defaultdict(list)
+    return grouped_summaries(header, rows, [keys])[0]
+
+
+# =========================
+# Streaming Accumulators
+# =========================
+
+class ColumnAccumulator:
+    """Running stats for one column, updated one value at a time."""
+
+    # A column starts out numeric (a running sum for the mean, Welford's
+    # update for the variance, min/max and a QuantileSketch for the
+    # percentiles) and switches to a Counter at its
+    # first non-numeric value. If numbers were
+    # already seen by then, the Counter is missing them and the column is
+    # marked stale; restart_counts() + recount() fill it in from a re-read.
+    # With sketch=CategoricalSketch the Counter is replaced by that bounded-
+    # memory sketch, so unique/top/freq become estimates (see sketches.py).
+    # The mean is reported as total / n, as stats_floats computes it; the
+    # Welford running mean drifts from that in the last digits.
+
+    __slots__ = ('n', 'total', 'mean', 'm2', 'mn', 'mx', 'quantiles', 'counter', 'stale', 'sketch')
+
+    def __init__(self, sketch=None):
+        self.sketch = sketch
+        self.n = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.mn = None
+        self.mx = None
+        self.quantiles = None
+        self.counter = None
+        self.stale = False
+
+    def add(self, val):
+        if not val.strip():
+            return
+        if self.counter is None:
+            try:
+                x = float(val)
+            except ValueError:
+                x = None
+            self.add_parsed(val, x)
+        elif self.sketch is None:
+            self.counter[val] += 1
+        else:
+            self.counter.add(val)
+
+    def add_parsed(self, val, x):
+        # val is a non-blank cell and x its float value, or None if it is not a number.
+        if self.counter is None:
+            if x is not None:
+                if self.n:
+                    self.quantile_sketch().add(x)
+                self.n += 1
+                self.total += x
+                delta = x - self.mean
+                self.mean += delta / self.n
+                self.m2 += delta * (x - self.mean)
+                if self.mn is None or x < self.mn:
+                    self.mn = x
+                if self.mx is None or x > self.mx:
+                    self.mx = x
+                return
+            self.counter = self.new_counter()
+            self.stale = self.n > 0
+        if self.sketch is None:
+            self.counter[val] += 1
+        else:
+            self.counter.add(val)
+
+    def merge(self, other):
+        # Fold in the state of another accumulator for the same column (Chan et
+        # al. pairwise update for the numeric part). Mixing a numeric side that
+        # has values with a categorical side leaves the counts stale.
+        self.stale = self.stale or other.stale
+        if other.counter is not None:
+            if self.counter is None:
+                self.stale = self.stale or self.n > 0
+                self.counter = self.new_counter()
+            if self.sketch is None:
+                self.counter.update(other.counter)
+            else:
+                self.counter.merge(other.counter)
+            return
+        if self.counter is not None:
+            self.stale = self.stale or other.n > 0
+            return
+        if not other.n:
+            return
+        if not self.n:
+            self.n, self.total, self.mean, self.m2 = other.n, other.total, other.mean, other.m2
+            self.mn, self.mx = other.mn, other.mx
+            self.quantiles = other.quantiles
+            return
+        self.quantile_sketch().merge(other.quantile_sketch())
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.total += other.total
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.mn = min(self.mn, other.mn)
+        self.mx = max(self.mx, other.mx)
+
+    def quantile_sketch(self):
+        # The sketch is only built at the second number; a single number is mn.
+        if self.quantiles is None:
+            self.quantiles = QuantileSketch()
+            if self.n:
+                self.quantiles.add(self.mn)
+        return self.quantiles
+
+    def new_counter(self):
+        return Counter() if self.sketch is None else self.sketch()
+
+    def restart_counts(self):
+        self.counter = self.new_counter()
+        self.stale = False
+
+    def recount(self, val):
+        if not val.strip():
+            return
+        if self.sketch is None:
+            self.counter[val] += 1
+        else:
+            self.counter.add(val)
+
+    def result(self):
+        # Same dict shapes as stats_numeric / stats_categorical. Percentiles
+        # are exact up to the sketch's k values and estimates beyond that.
+        if self.counter is None and self.n:
+            if self.quantiles is None:
+                quartiles = [self.mn] * len(QUARTILES)
+            else:
+                quartiles = self.quantiles.quantiles(QUARTILES)
+            return numeric_stats(self.n, self.total / self.n, self.m2, self.mn, self.mx, quartiles)
+        if self.counter is None:
+            return {'count': 0, 'unique': 0, 'top': None, 'freq': 0}
+        if self.sketch is not None:
+            return self.counter.result()
+        return stats_counter(self.counter)
+
+class TableAccumulator:
+    """One ColumnAccumulator per header column, fed whole rows."""
+
+    __slots__ = ('columns', 'width', 'rows')
+
+    def __init__(self, ncols, sketch=None):
+        self.columns = [ColumnAccumulator(sketch) for _ in range(ncols)]
+        # zip(*rows) in overall_summary stops at the shortest row; track it.
+        self.width = ncols
+        self.rows = 0
+
+    def add_row(self, row):
+        self.rows += 1
+        if len(row) < self.width:
+            self.width = len(row)
+        for acc, val in zip(self.columns, row):
+            acc.add(val)
+
+    def add_cells(self, cells, length):
+        # Feed a row already split by parse_row; length is the original row length.
+        self.rows += 1
+        if length < self.width:
+            self.width = length
+        columns = self.columns
+        for i, val, x in cells:
+            columns[i].add_parsed(val, x)
+
+    def merge(self, other):
+        self.rows += other.rows
+        if other.width < self.width:
+            self.width = other.width
+        for acc, part in zip(self.columns, other.columns):
+            acc.merge(part)
+
+    def stale_columns(self):
+        return [i for i, acc in enumerate(self.columns) if acc.stale]
+
+    def result(self, header):
+        if not self.rows:
+            return {}
+        return {name: acc.result() for name, acc in zip(header[:self.width], self.columns)}
+
+def restart_stale(groups):
+
+    # Reset the counts of every stale column in a dict of TableAccumulators.
+    # Returns key -> (accumulator, stale column indexes) for a recount pass.
+
+    stale = {}
+    for key, acc in groups.items():
+        idxs = acc.stale_columns()
+        if idxs:
+            for i in idxs:
+                acc.columns[i].restart_counts()
+            stale[key] = (acc, idxs)
+    return stale
+
+def stream_summary(path, approx=False):
+
+    # Streaming version of load_csv + overall_summary: reads the CSV one row at a
+    # time into a TableAccumulator, so memory does not grow with the row count.
+    # Columns that turn out to be mixed after some numeric values get one extra
+    # read of the file, touching only those columns.
+    # approx=True swaps the categorical Counters for CategoricalSketch.
+    # Returns header and the column name -> stats dict.
+
+    rows = iter_csv_rows(path)
+    header = next(rows)
+    table = TableAccumulator(len(header), CategoricalSketch if approx else None)
+    for row in rows:
+        table.add_row(row)
+
+    stale = table.stale_columns()
+    if stale:
+        for i in stale:
+            table.columns[i].restart_counts()
+        rows = iter_csv_rows(path)
+        next(rows)
+        for row in rows:
+            for i in stale:
+                if i < len(row):
+                    table.columns[i].recount(row[i])
+    return header, table.result(header)
+
+
+# =========================
+# Typed Columns
+# =========================
+
+BLANK, NUMBER, TEXT = 0, 1, 2
+
+class TypedTable:
+    """Columns parsed once: array('d') numbers, a per-cell kind mask and text where needed."""
+
+    # masks[i][r] is BLANK, NUMBER or TEXT for row r of column i and nums[i][r]
+    # holds the parsed float (0.0 when the cell is not a number). Raw strings
+    # are only kept (texts[i]) for columns that contain text or are listed in
+    # keep_text (group keys); purely numeric columns live in the array alone.
+
+    def __init__(self, header, keep_text=()):
+        self.header = header
+        self.ncols = len(header)
+        self.nums = [array('d') for _ in header]
+        self.masks = [bytearray() for _ in header]
+        keep = {header.index(k) for k in keep_text}
+        self.texts = [[] if i in keep else None for i in range(self.ncols)]
+        self.nrows = 0
+        # row index -> length, for the rare rows shorter than the header
+        self.short = {}
+        # numeric-looking columns that hit text after numbers; see refill_text()
+        self.missing_text = set()
+
+    def append(self, row):
+        length = len(row)
+        if length < self.ncols:
+            self.short[self.nrows] = length
+        for i in range(self.ncols):
+            val = row[i] if i < length else ''
+            texts = self.texts[i]
+            if not val.strip():
+                self.masks[i].append(BLANK)
+                self.nums[i].append(0.0)
+            else:
+                try:
+                    x = float(val)
+                except ValueError:
+                    self.masks[i].append(TEXT)
+                    self.nums[i].append(0.0)
+                    if texts is None:
+                        if NUMBER in self.masks[i]:
+                            self.missing_text.add(i)
+                        texts = self.texts[i] = [''] * self.nrows
+                else:
+                    self.masks[i].append(NUMBER)
+                    self.nums[i].append(x)
+            if texts is not None:
+                texts.append(val)
+        self.nrows += 1
+
+    def refill_text(self, rows):
+        # Re-read raw strings for columns that turned out to hold text after
+        # their first numbers. rows must repeat the rows given to append().
+        if not self.missing_text:
+            return
+        cols = sorted(self.missing_text)
+        for r, row in enumerate(rows):
+            for i in cols:
+                if i < len(row):
+                    self.texts[i][r] = row[i]
+        self.missing_text = set()
+
+    def is_text(self, i):
+        return TEXT in self.masks[i]
+
+    def key_texts(self, keys):
+        cols = []
+        for k in keys:
+            texts = self.texts[self.header.index(k)]
+            if texts is None:
+                raise ValueError(f"column {k!r} was loaded without its text; pass it in keep_text")
+            cols.append(texts)
+        return cols
+
+    @classmethod
+    def from_rows(cls, header, rows, keep_text=()):
+        table = cls(header, keep_text)
+        for row in rows:
+            table.append(row)
+        table.refill_text(rows)
+        return table
+
+def load_typed(path, keep_text=()):
+
+    # Load a CSV straight into a TypedTable, parsing every cell exactly once.
+    # keep_text lists the columns whose raw strings are needed later (group keys).
+
+    rows = iter_csv_rows(path)
+    table = TypedTable(next(rows), keep_text)
     for row in rows:
-        key = tuple(row[i] for i in idxs)
-        buckets[key].append(row)
-    return {key: overall_summary(header, grp_rows) for key, grp_rows in buckets.items()}
+        table.append(row)
+    if table.missing_text:
+        rows = iter_csv_rows(path)
+        next(rows)
+        table.refill_text(rows)
+    return table
+
+@traced('load', rows=lambda table: table.nrows)
+def load_typed_cached(path, keep_text=(), cache_dir=None):
+
+    # load_typed through the on-disk cache in cache.py: with a cache_dir the
+    # TypedTable is pickled there on the first run and read back by later runs
+    # while the CSV is unchanged, skipping the parse. Tables are cached per
+    # set of keep_text columns.
+
+    if cache_dir is None:
+        return load_typed(path, keep_text)
+    keep = sorted(keep_text)
+    kind = 'typed-' + hashlib.blake2b('\x1f'.join(keep).encode('utf-8'), digest_size=4).hexdigest()
+    return cached(path, kind, lambda: load_typed(path, keep), write_pickle, read_pickle, cache_dir)
 
+def summarize_typed(table, i, approx=False):
+
+    # Stats for column i of a TypedTable; same result as summarize_column.
+    # approx=True summarizes text columns with a CategoricalSketch instead.
+
+    mask = table.masks[i]
+    if TEXT in mask:
+        if approx:
+            sketch = CategoricalSketch()
+            sketch.update(compress(table.texts[i], mask))
+            return sketch.result()
+        return stats_counter(Counter(compress(table.texts[i], mask)))
+    if NUMBER not in mask:
+        return stats_counter(Counter())
+    nums = table.nums[i]
+    return stats_floats(nums if BLANK not in mask else list(compress(nums, mask)))
+
+@traced('overall')
+def typed_overall_summary(table, approx=False):
+
+    # overall_summary over a TypedTable: column name -> stats dict.
+
+    if not table.nrows:
+        return {}
+    width = min(table.short.values(), default=table.ncols)
+    return {table.header[i]: summarize_typed(table, i, approx) for i in range(width)}
+
+@traced('grouped', groups=lambda levels: sum(map(len, levels)))
+def typed_group_accumulators(table, key_sets, approx=False):
+
+    # Hash-aggregate a TypedTable for several groupings at once, e.g.
+    # [['page_id'], ['page_id', 'ad_id']]. Each row is read from the typed arrays
+    # and fed to one TableAccumulator per group and grouping, so groups never
+    # hold row copies and no cell is parsed again. An empty key list gives the
+    # whole table under the key (). approx=True uses CategoricalSketch counts.
+    # Returns one dict (key tuple -> TableAccumulator) per entry of key_sets.
+
+    ncols, short = table.ncols, table.short
+    sketch = CategoricalSketch if approx else None
+    levels = [(table.key_texts(keys), {}) for keys in key_sets]
+    cols = [(i, table.masks[i], table.nums[i], table.texts[i]) for i in range(ncols)]
+    for r in range(table.nrows):
+        cells = []
+        for i, mask, nums, texts in cols:
+            kind = mask[r]
+            if kind == NUMBER:
+                cells.append((i, texts[r] if texts is not None else None, nums[r]))
+            elif kind == TEXT:
+                cells.append((i, texts[r], None))
+        length = short.get(r, ncols)
+        for key_cols, groups in levels:
+            key = tuple([texts[r] for texts in key_cols])
+            acc = groups.get(key)
+            if acc is None:
+                acc = groups[key] = TableAccumulator(ncols, sketch)
+            acc.add_cells(cells, length)
+
+    # Second pass only for groups where a column turned mixed after numbers.
+    stale_levels = []
+    for key_cols, groups in levels:
+        stale = restart_stale(groups)
+        if stale:
+            stale_levels.append((key_cols, stale))
+    for r in range(table.nrows if stale_levels else 0):
+        for key_cols, stale in stale_levels:
+            hit = stale.get(tuple([texts[r] for texts in key_cols]))
+            if hit is not None:
+                acc, idxs = hit
+                for i in idxs:
+                    if table.masks[i][r]:
+                        acc.columns[i].recount(table.texts[i][r])
+
+    return [groups for _, groups in levels]
+
+def typed_grouped_summaries(table, key_sets, approx=False):
+
+    # Grouped stats over a TypedTable for several groupings in one pass.
+    # Returns one dict (key tuple -> stats dictionary) per entry of key_sets.
+
+    return [
+        {key: acc.result(table.header) for key, acc in groups.items()}
+        for groups in typed_group_accumulators(table, key_sets, approx)
+    ]
+
+@traced('grouped', groups=len)
+def summarize_groups(path, keys, groups, approx=False, cache_dir=CACHE_DIR):
+
+    # grouped_summary of just the listed groups (key tuples, or single values
+    # for one key column), e.g. summarize_groups(path, ['page_id'], ['123']).
+    # Only their records are read, through the group-key index of group_index.py
+    # (built and cached on first use), instead of the whole file.
+    # Returns key tuple -> stats dictionary; groups not in the file are left out.
+
+    index = load_index(path, keys, cache_dir)
+    rows = list(index.rows(path, groups))
+    return typed_grouped_summaries(TypedTable.from_rows(index.header, rows, keys), [keys], approx)[0]
+
+@traced('grouped', groups=lambda levels: sum(map(len, levels)))
+def grouped_summaries(header, rows, key_sets):
+
+    # grouped_summary for several groupings at once over in-memory rows.
+    # An empty key list gives the whole table under the key ().
+
+    keep = {k for keys in key_sets for k in keys}
+    return typed_grouped_summaries(TypedTable.from_rows(header, rows, keep), key_sets)
+
+
+# =========================
+# Parallel Sharded Scan
+# =========================
+
+def _count_quotes(mm, start, end, block=1 << 22):
+    n = 0
+    for a in range(start, end, block):
+        n += mm[a:min(a + block, end)].count(b'"')
+    return n
+
+def shard_offsets(path, shards):
+
+    # Split a CSV file into at most `shards` byte ranges that start and end on
+    # record boundaries. Quote parity is tracked from the start of the file, so
+    # a newline inside a quoted field never ends a shard.
+    # Returns the header end offset and a list of (start, end) ranges.
+
+    size = os.path.getsize(path)
+    with open(path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = []
+        pos = quotes = 0
+        for target in [0] + [size * k // shards for k in range(1, shards)]:
+            if target > pos:
+                quotes += _count_quotes(mm, pos, target)
+                pos = target
+            # move to the end of the record that contains pos
+            while pos < size:
+                nl = mm.find(b'\n', pos)
+                end = size if nl < 0 else nl + 1
+                quotes += _count_quotes(mm, pos, end)
+                pos = end
+                if quotes % 2 == 0:
+                    break
+            bounds.append(pos)
+    bounds.append(size)
+    header_end = bounds[0]
+    return header_end, [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+def iter_shard_rows(path, start, end):
+
+    # Yield the non-blank CSV rows stored in bytes [start, end) of the file.
+
+    def lines():
+        with open(path, 'rb') as fh:
+            fh.seek(start)
+            left = end - start
+            while left > 0:
+                line = fh.readline(left)
+                if not line:
+                    break
+                left -= len(line)
+                yield line.decode('utf-8')
+
+    for row in csv.reader(lines()):
+        if any(cell.strip() for cell in row):
+            yield row
+
+def _scan_shard(args):
+    # Worker: summarize one byte range into mergeable accumulators.
+    path, start, end, header, key_sets, approx = args
+    keep = {k for keys in key_sets for k in keys}
+    table = TypedTable(header, keep)
+    for row in iter_shard_rows(path, start, end):
+        table.append(row)
+    if table.missing_text:
+        table.refill_text(iter_shard_rows(path, start, end))
+    return typed_group_accumulators(table, [[]] + key_sets, approx)
+
+@traced('grouped', groups=lambda result: sum(map(len, result[1][1:])))
+def parallel_group_accumulators(path, key_sets, workers=None, approx=False):
+
+    # Multi-process version of load_typed + typed_group_accumulators.
+    # The file is cut into one shard per worker; each shard is summarized in its
+    # own process and the partial accumulators are merged in file order, so
+    # group order matches a single-process run. Columns whose type differs
+    # between shards get one sequential recount of just those cells.
+    # Returns header and one dict (key tuple -> TableAccumulator) for the whole
+    # table (key ()) followed by one per key set.
+
+    workers = workers or os.cpu_count() or 1
+    header_end, shards = shard_offsets(path, workers)
+    with open(path, 'rb') as fh:
+        header = next(csv.reader(io.StringIO(fh.read(header_end).decode('utf-8'))))
+    jobs = [(path, a, b, header, key_sets, approx) for a, b in shards]
+
+    levels = [{} for _ in range(len(key_sets) + 1)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for parts in pool.map(_scan_shard, jobs):
+            merge_levels(levels, parts)
+    recount_stale(path, header, key_sets, levels, header_end, os.path.getsize(path))
+    return header, levels
+
+def merge_levels(levels, parts):
+
+    # Merge per-grouping dicts of TableAccumulators (parts) into levels, in
+    # order, so groups keep their first-seen order.
+
+    for merged, groups in zip(levels, parts):
+        for key, acc in groups.items():
+            seen = merged.get(key)
+            if seen is None:
+                merged[key] = acc
+            else:
+                seen.merge(acc)
+
+def recount_stale(path, header, key_sets, levels, start, end):
+
+    # Re-read bytes [start, end) of the file to fill in the counts of columns
+    # left stale by merges (numbers on one side, text on the other). levels is
+    # the whole-table dict followed by one dict per key set.
+
+    idx_sets = [[]] + [[header.index(k) for k in keys] for keys in key_sets]
+    stale_levels = [(idxs, restart_stale(groups)) for idxs, groups in zip(idx_sets, levels)]
+    stale_levels = [(idxs, stale) for idxs, stale in stale_levels if stale]
+    if not stale_levels:
+        return
+    for row in iter_shard_rows(path, start, end):
+        for idxs, stale in stale_levels:
+            hit = stale.get(tuple([row[i] if i < len(row) else '' for i in idxs]))
+            if hit is not None:
+                acc, cols = hit
+                for i in cols:
+                    if i < len(row):
+                        acc.columns[i].recount(row[i])
+
+def parallel_summaries(path, key_sets, workers=None, approx=False):
+
+    # Multi-process version of load_csv + overall_summary + grouped_summaries.
+    # Returns header, overall stats dict, and one grouped dict per key set.
+
+    header, levels = parallel_group_accumulators(path, key_sets, workers, approx)
+    overall = levels[0].get(())
+    overall = overall.result(header) if overall is not None else {}
+    grouped = [dict(iter_group_stats(groups, header)) for groups in levels[1:]]
+    return header, overall, grouped
+
+def iter_group_stats(groups, header):
+
+    # Yield (key, stats dict) from a dict of TableAccumulators one group at a
+    # time, so only the group being written has its stats built.
+
+    for key, acc in groups.items():
+        yield key, acc.result(header)
+
+# =========================
+# Incremental Runs
+# =========================
+
+STATE_VERSION = 3
+
+def last_record_end(path, start):
+
+    # Offset just past the last complete record at or after `start` (a record
+    # boundary). A trailing record that is still being written, i.e. without
+    # its closing newline, is left for the next run.
+
+    size = os.path.getsize(path)
+    if size <= start:
+        return start
+    with open(path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        quotes = _count_quotes(mm, start, size)
+        end = size
+        while end > start:
+            nl = mm.rfind(b'\n', start, end)
+            if nl < 0:
+                break
+            quotes -= _count_quotes(mm, nl + 1, end)
+            if quotes % 2 == 0:
+                return nl + 1
+            end = nl
+    return start
+
+def file_fingerprint(path, end, span=1 << 16):
+
+    # Hash of the first and last `span` bytes before `end`, used to tell an
+    # appended-to file from one that was rewritten.
+
+    with open(path, 'rb') as fh:
+        digest = hashlib.blake2b(fh.read(min(span, end)), digest_size=16)
+        fh.seek(max(0, end - span))
+        digest.update(fh.read(end - max(0, end - span)))
+    return digest.hexdigest()
+
+def load_state(state_path, path, key_sets, approx):
+
+    # Load a checkpoint written by save_state, or None if there is none or it
+    # no longer matches the data file (rewritten, truncated) or the run options.
+
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, 'rb') as fh:
+        state = pickle.load(fh)
+    if (state.get('version') != STATE_VERSION
+            or state['key_sets'] != [list(keys) for keys in key_sets]
+            or state['approx'] != approx
+            or state['end'] > os.path.getsize(path)
+            or state['fingerprint'] != file_fingerprint(path, state['end'])):
+        return None
+    return state
+
+def save_state(state_path, state):
+
+    # Write the checkpoint atomically so a crash never leaves half a state file.
+
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'wb') as fh:
+        pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, state_path)
+
+@traced('grouped', groups=lambda result: sum(map(len, result[1][1:])))
+def incremental_group_accumulators(path, key_sets, state_path, approx=False):
+
+    # Append-only version of typed_group_accumulators. The per-column and
+    # per-group accumulators are pickled to state_path together with the byte
+    # offset they cover; the next run only parses rows appended after that
+    # offset and merges them in. A missing or mismatched checkpoint (file
+    # rewritten, different groupings) starts over from the header. Columns
+    # whose type changes with the new rows get one recount over the history.
+    # Returns header and the levels (whole table first, then one per key set).
+
+    state = load_state(state_path, path, key_sets, approx)
+    if state is None:
+        header_end, _ = shard_offsets(path, 1)
+        with open(path, 'rb') as fh:
+            header = next(csv.reader(io.StringIO(fh.read(header_end).decode('utf-8'))))
+        state = {
+            'version': STATE_VERSION,
+            'header': header,
+            'header_end': header_end,
+            'key_sets': [list(keys) for keys in key_sets],
+            'approx': approx,
+            'end': header_end,
+            'levels': [{} for _ in range(len(key_sets) + 1)],
+        }
+    header, levels, start = state['header'], state['levels'], state['end']
+
+    end = last_record_end(path, start)
+    if end > start:
+        table = TypedTable(header, {k for keys in key_sets for k in keys})
+        for row in iter_shard_rows(path, start, end):
+            table.append(row)
+        if table.missing_text:
+            table.refill_text(iter_shard_rows(path, start, end))
+        merge_levels(levels, typed_group_accumulators(table, [[]] + key_sets, approx))
+        recount_stale(path, header, key_sets, levels, state['header_end'], end)
+        state['end'] = end
+        state['fingerprint'] = file_fingerprint(path, end)
+        save_state(state_path, state)
+    return header, levels
+
+# =========================
+# External (Spill-to-Disk) Grouping
+# =========================
+
+# Most partitions external_group_stats writes at once (one open file each)
+MAX_PARTITIONS = 512
+
+def count_groups(path, key_sets, limit):
+
+    # Count distinct keys over all key sets: exactly while the total stays
+    # within `limit`, then estimated (HyperLogLog, about 1% error) once it
+    # passes it, so no more than `limit` key tuples are ever held and a file
+    # that needs spilling still gets a group count to size its partitions by.
+
+    rows = iter_csv_rows(path)
+    header = next(rows)
+    idx_sets = [[header.index(k) for k in keys] for keys in key_sets]
+    seen = [set() for _ in key_sets]
+    total = 0
+    for row in rows:
+        for idxs, keys in zip(idx_sets, seen):
+            key = '\x1f'.join([row[i] if i < len(row) else '' for i in idxs])
+            if key not in keys:
+                keys.add(key)
+                total += 1
+        if total > limit:
+            break
+    else:
+        return total
+    # over the limit: hand the keys seen so far to sketches and go on with those
+    sketches = []
+    for keys in seen:
+        sketch = HyperLogLog()
+        for key in keys:
+            sketch.add(key)
+        sketches.append(sketch)
+    del seen
+    for row in rows:
+        for idxs, sketch in zip(idx_sets, sketches):
+            sketch.add('\x1f'.join([row[i] if i < len(row) else '' for i in idxs]))
+    return max(sum(sketch.count() for sketch in sketches), limit + 1)
+
+def spill_partitions(groups, max_groups):
+    # Partitions for external grouping so each holds about max_groups groups
+    return max(2, min(MAX_PARTITIONS, math.ceil(groups / max_groups)))
+
+def _iter_pickled(path):
+    with open(path, 'rb') as fh:
+        while True:
+            try:
+                yield pickle.load(fh)
+            except EOFError:
+                return
+
+def _merged_group_stats(spill_dir, paths):
+    # Merge per-partition (first row, key, stats) files on the first row number.
+    # spill_dir is held here so the temporary files outlive the caller.
+    for _, key, stats in heapq.merge(*[_iter_pickled(p) for p in paths]):
+        yield key, stats
+
+@traced('grouped')
+def external_group_stats(path, key_sets, partitions=64, approx=False):
+
+    # Grouped stats when the group table does not fit in memory. Rows are
+    # hash-partitioned on the key columns shared by every key set into
+    # `partitions` temporary CSV files (spill_partitions sizes them to the
+    # group budget), each row tagged with its row number.
+    # Each partition is then loaded and aggregated on its own, and its groups
+    # are written out in first-seen order; the partitions are finally merged
+    # on the row number of each group's first row, so groups come out in the
+    # same order as an in-memory run. The overall stats are accumulated while
+    # partitioning.
+    # Returns the overall stats dict and one lazy (key, stats) stream per key set.
+
+    shared = [k for k in key_sets[0] if all(k in keys for keys in key_sets)]
+    if not shared:
+        raise ValueError('key sets share no column to partition on; group them separately')
+    spill_dir = tempfile.TemporaryDirectory(prefix='stats_spill_')
+    part_paths = [os.path.join(spill_dir.name, f'part{p}.csv') for p in range(partitions)]
+
+    rows = iter_csv_rows(path)
+    header = next(rows)
+    part_idxs = [header.index(k) for k in shared]
+    overall = TableAccumulator(len(header), CategoricalSketch if approx else None)
+    files = [open(p, 'w', encoding='utf-8', newline='') for p in part_paths]
+    try:
+        writers = [csv.writer(fh) for fh in files]
+        for r, row in enumerate(rows):
+            overall.add_row(row)
+            key = '\x1f'.join([row[i] if i < len(row) else '' for i in part_idxs])
+            writers[zlib.crc32(key.encode('utf-8')) % partitions].writerow([r] + row)
+    finally:
+        for fh in files:
+            fh.close()
+    stale = overall.stale_columns()
+    if stale:
+        for i in stale:
+            overall.columns[i].restart_counts()
+        rows = iter_csv_rows(path)
+        next(rows)
+        for row in rows:
+            for i in stale:
+                if i < len(row):
+                    overall.columns[i].recount(row[i])
+
+    keep = {k for keys in key_sets for k in keys}
+    results = [[] for _ in key_sets]
+    for p, part_path in enumerate(part_paths):
+        with open(part_path, encoding='utf-8', newline='') as fh:
+            tagged = list(csv.reader(fh))
+        os.remove(part_path)
+        if not tagged:
+            continue
+        row_nums = [int(row[0]) for row in tagged]
+        table = TypedTable.from_rows(header, [row[1:] for row in tagged], keep)
+        del tagged
+        levels = typed_group_accumulators(table, key_sets, approx)
+        for li, (keys, groups) in enumerate(zip(key_sets, levels)):
+            key_cols = table.key_texts(keys)
+            first = {}
+            for j, r in enumerate(row_nums):
+                first.setdefault(tuple([texts[j] for texts in key_cols]), r)
+            result_path = os.path.join(spill_dir.name, f'result{li}_{p}.pkl')
+            with open(result_path, 'wb') as out:
+                for key, acc in groups.items():
+                    pickle.dump((first[key], key, acc.result(header)), out)
+            results[li].append(result_path)
+
+    return overall.result(header), [_merged_group_stats(spill_dir, paths) for paths in results]
+
+
+# =========================
+# Dataset Summary
+# =========================
+
+def summarize_dataset(data_path, key_sets, workers=1, approx=False, state_path=None,
+                      max_groups=None, cache_dir=None):
+
+    # Overall stats plus one lazy (key, stats) stream per key set for a CSV file,
+    # computed on one core from a TypedTable, with workers > 1 by
+    # parallel_group_accumulators, or with a state_path by
+    # incremental_group_accumulators. With max_groups set, a file with more
+    # groups than that (over all key sets) is grouped on disk by
+    # external_group_stats instead. approx=True gives bounded-memory estimates
+    # for categorical columns. cache_dir caches the single-core TypedTable
+    # (load_typed_cached); the other paths read the CSV by byte ranges.
+    # Incremental state holds every group's accumulators, so it cannot be
+    # combined with a group budget.
+
+    if max_groups and state_path:
+        raise ValueError('max_groups cannot be combined with state_path')
+    if max_groups:
+        groups = count_groups(data_path, key_sets, max_groups)
+        if groups > max_groups:
+            return external_group_stats(data_path, key_sets, spill_partitions(groups, max_groups), approx)
+    if state_path or workers > 1:
+        if state_path:
+            header, levels = incremental_group_accumulators(data_path, key_sets, state_path, approx)
+        else:
+            header, levels = parallel_group_accumulators(data_path, key_sets, workers, approx)
+        overall = levels[0].get(())
+        overall = overall.result(header) if overall is not None else {}
+        return overall, [iter_group_stats(groups, header) for groups in levels[1:]]
+    table = load_typed_cached(data_path, {k for keys in key_sets for k in keys}, cache_dir)
+    overall = typed_overall_summary(table, approx)
+    levels = typed_group_accumulators(table, key_sets, approx)
+    return overall, [iter_group_stats(groups, table.header) for groups in levels]
+
+# =========================
+# Report Writer
+# =========================
+
+def write_report(report_path, title, overall, sections, batch=8192):
+
+    # Write the text report shared by the analyze_* functions: an overall
+    # section, then one section per grouping. sections is a list of
+    # (heading, label, groups) where label is a format string filled with the
+    # key values (e.g. 'PAGE_ID = {}, AD_ID = {}') and groups yields
+    # (key, stats) pairs. Groups are consumed one at a time and written in
+    # joined batches of about `batch` lines through a 1 MB file buffer.
+
+    sep = '=' * 60 + '\n'
+    with open(report_path, 'w', encoding='utf-8', buffering=1 << 20) as out:
+        parts = [sep, title, '\n', sep]
+        for col, stats in overall.items():
+            parts.append(f"Column: {col}\n")
+            parts.extend(f"  - {metric}: {val}\n" for metric, val in stats.items())
+            parts.append('\n')
+
+        for heading, label, groups in sections:
+            parts += [sep, heading, '\n', sep]
+            for key, stats in groups:
+                parts.append(label.format(*key) + '\n')
+                for col, col_stats in stats.items():
+                    parts.append(f"  Column: {col}\n")
+                    parts.extend(f"    - {m}: {v}\n" for m, v in col_stats.items())
+                parts.append('\n')
+                if len(parts) >= batch:
+                    out.write(''.join(parts))
+                    parts.clear()
+        out.write(''.join(parts))
+
+def record_stats(items):
+    # (key, stats) pairs with each numeric column's stats swapped for its
+    # unrounded statistics record (NumericStats.record)
+    for key, by_column in items:
+        yield key, {col: getattr(stats, 'record', stats) for col, stats in by_column.items()}
+
+def recorded(writer, keys, groups, batch=50_000):
+
+    # Pass (key, stats) pairs through unchanged while writing them to a
+    # StatsWriter in batches, so one pass over the lazy groups feeds both the
+    # text report and the statistics records.
+
+    pending = []
+    for item in groups:
+        pending.append(item)
+        yield item
+        if len(pending) >= batch:
+            writer.write_dicts(keys, record_stats(pending))
+            pending.clear()
+    writer.write_dicts(keys, record_stats(pending))
+
+@traced('report')
+def write_outputs(report_path, stats_path, dataset, key_sets, title, overall, sections):
+
+    # The outputs of an analyze_* function: the text report (write_report)
+    # unless report_path is None, and the statistics records in the schema of
+    # stats_output.py when stats_path is given. sections are write_report's,
+    # one per entry of key_sets.
+
+    if stats_path is None:
+        write_report(report_path, title, overall, sections)
+        return
+    with StatsWriter(stats_path, dataset, 'pure') as writer:
+        writer.write_dicts([], record_stats([((), overall)]))
+        if report_path is None:
+            for keys, (_, _, groups) in zip(key_sets, sections):
+                writer.write_dicts(keys, record_stats(groups))
+            return
+        write_report(report_path, title, overall, [
+            (heading, label, recorded(writer, keys, groups))
+            for keys, (heading, label, groups) in zip(key_sets, sections)
+        ])
 
 # =========================
 # 1. Twitter Posts Dataset
 # =========================
 
-def analyze_twitter_posts():
+def analyze_twitter_posts(workers=1, approx=False, state_path=None, max_groups=None,
+                          data_path='data/2024_tw_posts_president_scored_anon.csv',
+                          report_path='twitter_full_report.txt',
+                          cache_dir=None, stats_path=None):
     
-    # Analyze the Twitter posts dataset and write a full report.
+    # Analyze the Twitter posts dataset and write a full report (report_path=None
+    # skips it) and/or statistics records to stats_path (write_outputs).
     
-    data_path = (
-        'data/2024_tw_posts_president_scored_anon.csv'
+    key_sets = [['id'], ['id', 'url']]
+    overall, (by_id, by_combo) = summarize_dataset(
+        data_path, key_sets, workers, approx, state_path, max_groups,
+        cache_dir
     )
-    header, rows = load_csv(data_path)
-    sep = '=' * 60
-    report_path = 'twitter_full_report.txt'
-
-    print(f"Generating full report -> {report_path}")
-
-    with open(report_path, 'w', encoding='utf-8') as out:
-        # Overall stats
-        out.write(sep + '\n')
-        out.write('TWITTER POSTS DATASET - OVERALL SUMMARY\n')
-        out.write(sep + '\n')
-        overall = overall_summary(header, rows)
-        for col, stats in overall.items():
-            out.write(f"Column: {col}\n")
-            for metric, val in stats.items():
-                out.write(f"  - {metric}: {val}\n")
-            out.write('\n')
-
-        # Group by 'id'
-        out.write(sep + '\n')
-        out.write("SUMMARY BY 'id'\n")
-        out.write(sep + '\n')
-        by_id = grouped_summary(header, rows, ['id'])
-        for (id_val,), stats in by_id.items():
-            out.write(f"id = {id_val}\n")
-            for col, col_stats in stats.items():
-                out.write(f"  Column: {col}\n")
-                for m, v in col_stats.items():
-                    out.write(f"    - {m}: {v}\n")
-            out.write('\n')
-
-        # Group by ('id', 'url')
-        out.write(sep + '\n')
-        out.write("SUMMARY BY (id, url)\n")
-        out.write(sep + '\n')
-        by_combo = grouped_summary(header, rows, ['id', 'url'])
-        for (id_val, url_val), stats in by_combo.items():
-            out.write(f"id = {id_val}, url = {url_val}\n")
-            for col, col_stats in stats.items():
-                out.write(f"  Column: {col}\n")
-                for m, v in col_stats.items():
-                    out.write(f"    - {m}: {v}\n")
-            out.write('\n')
-
-    print("Done! Check twitter_full_report.txt for the report.")
+    print(f"Generating full report -> {report_path or stats_path}")
+
+    write_outputs(report_path, stats_path, 'twitter', key_sets,
+                  'TWITTER POSTS DATASET - OVERALL SUMMARY', overall, [
+        ("SUMMARY BY 'id'", 'id = {}', by_id),
+        ('SUMMARY BY (id, url)', 'id = {}, url = {}', by_combo),
+    ])
+
+    print(f"Done! Check {report_path or stats_path} for the report.")
 
 # =========================
 # 2. Facebook Posts Dataset
 # =========================
 
-def analyze_facebook_posts():
+def analyze_facebook_posts(workers=1, approx=False, state_path=None, max_groups=None,
+                           data_path='data/2024_fb_posts_president_scored_anon.csv',
+                           report_path='fb_posts_full_report.txt',
+                           cache_dir=None, stats_path=None):
     
-   # Analyze the Facebook posts dataset and write a full report.
+   # Analyze the Facebook posts dataset and write a full report (report_path=None
+   # skips it) and/or statistics records to stats_path (write_outputs).
     
-    data_path = (
-        'data/2024_fb_posts_president_scored_anon.csv'
+    key_sets = [['Facebook_Id'], ['Facebook_Id', 'post_id']]
+    overall, (by_fb, by_combo) = summarize_dataset(
+        data_path, key_sets, workers, approx, state_path, max_groups,
+        cache_dir
     )
-    header, rows = load_csv(data_path)
-    sep = '=' * 60
-    report_file = 'fb_posts_full_report.txt'
-
-    print(f"Generating Facebook Posts full report -> {report_file}")
-    with open(report_file, 'w', encoding='utf-8') as out:
-        # Overall Summary
-        out.write(sep + '\n')
-        out.write('FACEBOOK POSTS DATASET - OVERALL SUMMARY\n')
-        out.write(sep + '\n')
-        overall = overall_summary(header, rows)
-        for col, stats in overall.items():
-            out.write(f"Column: {col}\n")
-            for metric, val in stats.items():
-                out.write(f"  - {metric}: {val}\n")
-            out.write('\n')
-
-        # Summary by Facebook_Id
-        out.write(sep + '\n')
-        out.write("SUMMARY BY 'Facebook_Id'\n")
-        out.write(sep + '\n')
-        by_fb = grouped_summary(header, rows, ['Facebook_Id'])
-        for (fb_id,), stats in by_fb.items():
-            out.write(f"Facebook_Id = {fb_id}\n")
-            for col, col_stats in stats.items():
-                out.write(f"  Column: {col}\n")
-                for m, v in col_stats.items():
-                    out.write(f"    - {m}: {v}\n")
-            out.write('\n')
-
-        # Summary by (Facebook_Id, post_id)
-        out.write(sep + '\n')
-        out.write("SUMMARY BY (Facebook_Id, post_id)\n")
-        out.write(sep + '\n')
-        by_combo = grouped_summary(header, rows, ['Facebook_Id', 'post_id'])
-        for (fb_id, post_id), stats in by_combo.items():
-            out.write(f"Facebook_Id = {fb_id}, post_id = {post_id}\n")
-            for col, col_stats in stats.items():
-                out.write(f"  Column: {col}\n")
-                for m, v in col_stats.items():
-                    out.write(f"    - {m}: {v}\n")
-            out.write('\n')
-
-    print("Done! Check fb_posts_full_report.txt for the complete report.")
+    print(f"Generating Facebook Posts full report -> {report_path or stats_path}")
+
+    write_outputs(report_path, stats_path, 'fb_posts', key_sets,
+                  'FACEBOOK POSTS DATASET - OVERALL SUMMARY', overall, [
+        ("SUMMARY BY 'Facebook_Id'", 'Facebook_Id = {}', by_fb),
+        ('SUMMARY BY (Facebook_Id, post_id)', 'Facebook_Id = {}, post_id = {}', by_combo),
+    ])
+
+    print(f"Done! Check {report_path or stats_path} for the complete report.")
 
 
 # =========================
 # 3. Facebook Ads Dataset
 # =========================
 
-def analyze_facebook_ads():
-    
-    # Analyze the Facebook ads dataset and write a full report.
+def analyze_facebook_ads(workers=1, approx=False, state_path=None, max_groups=None,
+                         data_path='data/2024_fb_ads_president_scored_anon.csv',
+                         report_path='fb_ads_president_full_report.txt',
+                         cache_dir=None, stats_path=None):
     
-    data_path = (
-        'data/2024_fb_ads_president_scored_anon.csv'
-    )
+    # Analyze the Facebook ads dataset and write a full report (report_path=None
+    # skips it) and/or statistics records to stats_path (write_outputs).
 
     # load and clean data
-    header, rows = load_csv(data_path)
-
-    # file to write the full report
-    report_path = 'fb_ads_president_full_report.txt'
-    sep = '=' * 60
-
-    print(f"Starting report generation of: {report_path}")
-
-    with open(report_path, 'w', encoding='utf-8') as report:
-        # Overall stats
-        report.write(sep + '\n')
-        report.write('OVERALL DATASET SUMMARY\n')
-        report.write(sep + '\n')
-        overall_stats = overall_summary(header, rows)
-        for col, stats in overall_stats.items():
-            report.write(f"Column: {col}\n")
-            for metric, val in stats.items():
-                report.write(f"  - {metric}: {val}\n")
-            report.write('\n')
-
-        # Stats by page_id
-        report.write(sep + '\n')
-        report.write('SUMMARY BY PAGE_ID\n')
-        report.write(sep + '\n')
-        page_stats = grouped_summary(header, rows, ['page_id'])
-        for (page_id,), stats in page_stats.items():
-            report.write(f"PAGE_ID = {page_id}\n")
-            for col, col_stats in stats.items():
-                report.write(f"  Column: {col}\n")
-                for metric, val in col_stats.items():
-                    report.write(f"    - {metric}: {val}\n")
-            report.write('\n')
-
-        # Stats by (page_id, ad_id)
-        report.write(sep + '\n')
-        report.write('SUMMARY BY (PAGE_ID, AD_ID)\n')
-        report.write(sep + '\n')
-        combo_stats = grouped_summary(header, rows, ['page_id', 'ad_id'])
-        for (page_id, ad_id), stats in combo_stats.items():
-            report.write(f"PAGE_ID = {page_id}, AD_ID = {ad_id}\n")
-            for col, col_stats in stats.items():
-                report.write(f"  Column: {col}\n")
-                for metric, val in col_stats.items():
-                    report.write(f"    - {metric}: {val}\n")
-            report.write('\n')
+    # overall stats, then per-page and per-(page, ad) stats in one pass over the rows
+    key_sets = [['page_id'], ['page_id', 'ad_id']]
+    overall_stats, (page_stats, combo_stats) = summarize_dataset(
+        data_path, key_sets, workers, approx, state_path, max_groups,
+        cache_dir
+    )
+
+    print(f"Starting report generation of: {report_path or stats_path}")
+
+    write_outputs(report_path, stats_path, 'fb_ads', key_sets,
+                  'OVERALL DATASET SUMMARY', overall_stats, [
+        ('SUMMARY BY PAGE_ID', 'PAGE_ID = {}', page_stats),
+        ('SUMMARY BY (PAGE_ID, AD_ID)', 'PAGE_ID = {}, AD_ID = {}', combo_stats),
+    ])
 
     print("Report generated successfully!")
 
@@ -296,6 +1207,7 @@ def analyze_facebook_ads():
 if __name__ == '__main__':
     # Uncomment the function for the dataset you want to analyze
     # The Default is Facebook Ads
+    # (or use run_analysis.py to pick the dataset, input file and engine)
    
     # analyze_twitter_posts()
     # analyze_facebook_posts() 
@@ -0,0 +1,244 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Single entry point for the analysis scripts. Picks the dataset(s), input
+# file(s) and engine from the command line instead of commenting calls in and
+# out at the bottom of each module.
+#
+# Examples:
+#   python run_analysis.py fb_ads                       # auto engine, data/ default path
+#   python run_analysis.py twitter -i tweets.csv --engine pandas
+#   python run_analysis.py all --data-dir /mnt/election --engine pure --workers 8
+#
+# Parsed and cleaned tables are cached under --cache-dir (cache.py), so a second
+# run on an unchanged CSV skips parsing it; --no-cache turns this off.
+#
+# --stats PATH also writes the statistics as records in one schema shared by
+# the engines (stats_output.py): Parquet when PATH ends in .parquet, JSON Lines
+# otherwise. With several datasets the dataset name is added before the
+# extension. --no-report skips the text report.
+#
+# --sink-dir DIR (polars) runs on the polars streaming engine and writes each
+# grouping's complete summary to its own file in DIR (--sink-format parquet or
+# csv) instead of into the report, for inputs larger than memory.
+#
+# --batch runs every dataset that uses polars in one go (polars_stats.analyze_all):
+# all their queries are collected together, so the set takes about as long as
+# the slowest dataset instead of the sum of all of them.
+#
+# --trace PATH records the wall time, CPU time, peak memory and row / group
+# counts of every stage (load, overall, grouped, report, ...) as JSON in PATH
+# (instrument.py); --profile-stage STAGE also profiles that stage with cProfile
+# and dumps it to --profile-out. Tracing is off, and costs nothing, otherwise.
+#
+# --engine auto picks, per file, the fastest engine in benchmark.py that can run it:
+#   - polars when it is installed and the file fits comfortably in memory
+#   - then pandas under the same conditions
+#   - otherwise the pure Python engine, sharded over all cores for large files
+#     and grouping on disk when the file would not fit in memory
+
+import argparse
+import importlib
+import importlib.util
+import os
+import sys
+
+from cache import CACHE_DIR
+from dataset_registry import DATASETS, DATA_DIR, default_path
+from instrument import enable as enable_trace
+from stats_output import StatsWriter
+
+ENGINES = ('pure', 'pandas', 'polars')
+MODULES = {'pure': 'pure_python_stats', 'pandas': 'pandas_stats', 'polars': 'polars_stats'}
+
+# polars / pandas hold the parsed file in memory at a few times its CSV size.
+IN_MEMORY_FACTOR = 4
+# Files at least this big are worth sharding across processes (pure engine).
+PARALLEL_MIN_BYTES = 64 << 20
+# Group budget used when auto falls back to on-disk grouping.
+AUTO_MAX_GROUPS = 1_000_000
+
+
+def engine_available(engine):
+    # pure only needs the standard library; the others need their package.
+    return engine == 'pure' or importlib.util.find_spec(engine) is not None
+
+
+def total_memory():
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def choose_engine(path, state_path=None, max_groups=None, streaming=False):
+
+    # Engine and options for --engine auto: (engine, {extra keyword arguments}).
+    # Incremental state is pure-engine only and polars has no group budget.
+    # streaming (--sink-dir) runs polars out of core, so polars needs no
+    # memory then; pandas still has to fit.
+
+    size = os.path.getsize(path)
+    memory = total_memory()
+    fits = memory is None or size * IN_MEMORY_FACTOR < memory
+    if state_path is None:
+        if (fits or streaming) and not max_groups and engine_available('polars'):
+            return 'polars', {}
+        if fits and engine_available('pandas'):
+            return 'pandas', {}
+    options = {}
+    if size >= PARALLEL_MIN_BYTES:
+        options['workers'] = os.cpu_count() or 1
+    if not fits and state_path is None:
+        options['max_groups'] = AUTO_MAX_GROUPS
+    return 'pure', options
+
+
+def run(dataset, engine, data_path, report_path=None, workers=1, approx=False,
+        state_path=None, max_groups=None, chunksize=None, cache_dir=None,
+        stats_path=None, text_report=True, sink_dir=None, sink_format='parquet'):
+
+    # Run one dataset through one engine and write its report, and its
+    # statistics records when stats_path is given. text_report=False skips
+    # the text report (it then needs a stats_path). sink_dir / sink_format
+    # stream the polars grouped summaries to files.
+
+    name, default_report = DATASETS[dataset][engine]
+    report_path = (report_path or default_report) if text_report else None
+    func = getattr(importlib.import_module(MODULES[engine]), name)
+    if engine == 'pure':
+        func(workers, approx, state_path, max_groups, data_path=data_path, report_path=report_path,
+             cache_dir=cache_dir, stats_path=stats_path)
+    elif engine == 'pandas':
+        func(approx, max_groups, data_path=data_path, report_path=report_path, chunksize=chunksize,
+             cache_dir=cache_dir, stats_path=stats_path)
+    else:
+        print(f"Generating polars report -> {report_path or stats_path}")
+        out = open(report_path, 'w', encoding='utf-8') if report_path else None
+        stats = StatsWriter(stats_path, dataset, 'polars') if stats_path else None
+        try:
+            func(data_path, out, approx, cache_dir, stats, sink_dir, sink_format)
+        finally:
+            for f in (out, stats):
+                if f is not None:
+                    f.close()
+        print(f"Done! Check {report_path or stats_path} for the polars analysis.")
+    return report_path
+
+
+def run_polars_batch(jobs, approx=False, cache_dir=None, text_report=True):
+
+    # Run several datasets through polars together. jobs maps dataset names
+    # to (data path, report path or None, stats path or None).
+
+    import polars_stats
+    outs, writers = {}, {}
+    try:
+        for dataset, (data_path, report_path, stats_path) in jobs.items():
+            report_path = (report_path or DATASETS[dataset]['polars'][1]) if text_report else None
+            print(f"Generating polars report -> {report_path or stats_path}")
+            outs[dataset] = open(report_path, 'w', encoding='utf-8') if report_path else None
+            writers[dataset] = StatsWriter(stats_path, dataset, 'polars') if stats_path else None
+        polars_stats.analyze_all({dataset: (data_path, outs[dataset], writers[dataset])
+                                  for dataset, (data_path, _, _) in jobs.items()}, approx, cache_dir)
+    finally:
+        for f in (*outs.values(), *writers.values()):
+            if f is not None:
+                f.close()
+    print(f"Done! polars analysis of {', '.join(jobs)} complete.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Descriptive statistics for the 2024 election datasets.')
+    parser.add_argument('datasets', nargs='+', choices=sorted(DATASETS) + ['all'])
+    parser.add_argument('--engine', choices=ENGINES + ('auto',), default='auto')
+    parser.add_argument('-i', '--input', help='CSV to analyze (one dataset only)')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding the default CSV files')
+    parser.add_argument('-o', '--report', help='report path (one dataset only)')
+    parser.add_argument('--workers', type=int, default=None, help='processes for the pure engine')
+    parser.add_argument('--approx', action='store_true', help='sketch high-cardinality categorical columns (pandas: only with --chunksize)')
+    parser.add_argument('--max-groups', type=int, default=None,
+                        help='group budget before grouping spills to disk (pure, pandas)')
+    parser.add_argument('--state', help='incremental state file (pure engine)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='read the file this many rows at a time instead of loading it whole (pandas)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='where parsed tables are cached')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the CSV')
+    parser.add_argument('--stats', help='also write statistics records here (.parquet or JSON Lines)')
+    parser.add_argument('--no-report', action='store_true', help='skip the text report (needs --stats)')
+    parser.add_argument('--sink-dir', help='stream grouped summaries to files in this directory (polars)')
+    parser.add_argument('--sink-format', choices=('parquet', 'csv'), default='parquet',
+                        help='file format for --sink-dir')
+    parser.add_argument('--batch', action='store_true',
+                        help='run all polars datasets together in one query batch')
+    parser.add_argument('--trace', metavar='PATH', help='write per-stage timings and peak memory here (JSON)')
+    parser.add_argument('--profile-stage', metavar='STAGE', help='profile this stage with cProfile (needs --trace)')
+    parser.add_argument('--profile-out', metavar='PATH', help='cProfile output of --profile-stage (default STAGE.prof)')
+    args = parser.parse_args(argv)
+
+    datasets = sorted(DATASETS) if 'all' in args.datasets else list(dict.fromkeys(args.datasets))
+    if (args.input or args.report) and len(datasets) > 1:
+        parser.error('--input and --report need a single dataset')
+    if args.engine != 'auto' and not engine_available(args.engine):
+        parser.error(f'{args.engine} is not installed')
+    if args.engine not in ('auto', 'pure') and (args.state or args.workers):
+        parser.error('--state and --workers are only supported by the pure engine')
+    if args.engine == 'polars' and args.max_groups:
+        parser.error('--max-groups is not supported by the polars engine')
+    if args.chunksize and args.engine != 'pandas':
+        parser.error('--chunksize needs --engine pandas')
+    if args.state and len(datasets) > 1:
+        parser.error('--state needs a single dataset')
+    if args.state and args.max_groups:
+        parser.error('--state and --max-groups cannot be combined (the state holds every group)')
+    if args.no_report and not args.stats:
+        parser.error('--no-report needs --stats')
+    if args.sink_dir and args.engine not in ('auto', 'polars'):
+        parser.error('--sink-dir needs --engine polars')
+    if args.sink_dir and not engine_available('polars'):
+        parser.error('--sink-dir needs polars, which is not installed')
+    if args.batch and args.sink_dir:
+        parser.error('--batch and --sink-dir cannot be combined')
+    if (args.profile_stage or args.profile_out) and not args.trace:
+        parser.error('--profile-stage and --profile-out need --trace')
+    if args.trace:
+        enable_trace(args.trace, args.profile_stage, args.profile_out)
+
+    batch = {}
+
+    for dataset in datasets:
+        data_path = args.input or default_path(dataset, args.data_dir)
+        if not os.path.exists(data_path):
+            parser.error(f'{data_path} does not exist')
+        engine, options = args.engine, {}
+        if engine == 'auto':
+            engine, options = choose_engine(data_path, args.state, args.max_groups, bool(args.sink_dir))
+            print(f"{dataset}: using the {engine} engine")
+        if args.workers:
+            options['workers'] = args.workers
+        if args.max_groups:
+            options['max_groups'] = args.max_groups
+        if engine != 'pure':
+            options.pop('workers', None)
+        if args.chunksize:
+            options['chunksize'] = args.chunksize
+        if args.sink_dir:
+            if engine != 'polars':
+                parser.error('--sink-dir needs the polars engine')
+            options.update(sink_dir=args.sink_dir, sink_format=args.sink_format)
+        stats_path = args.stats
+        if stats_path and len(datasets) > 1:
+            root, ext = os.path.splitext(stats_path)
+            stats_path = f'{root}_{dataset}{ext}'
+        if args.batch and engine == 'polars':
+            batch[dataset] = (data_path, args.report, stats_path)
+            continue
+        run(dataset, engine, data_path, args.report, approx=args.approx,
+            state_path=args.state, cache_dir=None if args.no_cache else args.cache_dir,
+            stats_path=stats_path, text_report=not args.no_report, **options)
+    if batch:
+        run_polars_batch(batch, args.approx, None if args.no_cache else args.cache_dir, not args.no_report)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Bounded-memory sketches shared by the pure Python, pandas and polars scripts.
+# They stand in for a full Counter / value_counts() on high-cardinality
+# categorical columns (url, ad_id, post_id, free text) when approximate
+# results are good enough:
+# - HyperLogLog: distinct count, relative standard error about 1.04 / sqrt(2**p)
+#   (0.8% for the default p = 14), exact up to 2**p / 64 distinct values
+# - SpaceSaving: top-k values; every reported count overestimates the true
+#   count by at most `error` <= N / k, and any value seen more than N / k times
+#   is guaranteed to be reported
+# - QuantileSketch: percentiles of a numeric column (KLL compactors), rank
+#   error about 1.7 / k (under 1% for the default k = 200), exact while a
+#   column or group has at most k values
+# All are mergeable, so partial sketches from shards or chunks can be combined.
+# Only the standard library is used.
+
+import bisect
+import hashlib
+import heapq
+import itertools
+import math
+
+DEFAULT_PRECISION = 14
+DEFAULT_TOP_K = 1000
+DEFAULT_QUANTILE_K = 200
+# Each compactor level below the top holds this fraction of the one above it.
+QUANTILE_SHRINK = 2 / 3
+
+
+def hash64(value):
+    """Stable 64-bit hash of a value (same in every process, unlike hash())."""
+    data = value.encode('utf-8') if isinstance(value, str) else str(value).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Approximate distinct counter with 2**p registers."""
+
+    # Small inputs are kept as an exact set of hashes and only switched to the
+    # dense registers once that set would outgrow them.
+
+    __slots__ = ('p', 'registers', 'exact')
+
+    def __init__(self, p=DEFAULT_PRECISION):
+        self.p = p
+        self.registers = None
+        self.exact = set()
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h):
+        if self.registers is None:
+            self.exact.add(h)
+            if len(self.exact) > (1 << self.p) >> 6:
+                self._densify()
+            return
+        self._set_register(h)
+
+    def _set_register(self, h):
+        bits = 64 - self.p
+        w = h & ((1 << bits) - 1)
+        rank = bits - w.bit_length() + 1
+        idx = h >> bits
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def _densify(self):
+        self.registers = bytearray(1 << self.p)
+        for h in self.exact:
+            self._set_register(h)
+        self.exact = None
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError('cannot merge HyperLogLog sketches with different precision')
+        if other.registers is None:
+            for h in other.exact:
+                self.add_hash(h)
+            return
+        if self.registers is None:
+            self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        if self.registers is None:
+            return len(self.exact)
+        m = 1 << self.p
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate in the small range
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in at most k counters (Metwally et al.)."""
+
+    # counts[v] is an upper bound on v's frequency and errors[v] how much of it
+    # may be overestimate. The heap holds one (count, seq, value) entry per
+    # tracked value; entries go stale when a count grows and are refreshed
+    # lazily when the minimum is needed.
+
+    __slots__ = ('k', 'counts', 'errors', 'heap', 'seq')
+
+    def __init__(self, k=DEFAULT_TOP_K):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+        self.heap = []
+        self.seq = 0
+
+    def add(self, value, count=1):
+        counts = self.counts
+        if value in counts:
+            counts[value] += count
+            return
+        self.seq += 1
+        if len(counts) < self.k:
+            counts[value] = count
+            self.errors[value] = 0
+            heapq.heappush(self.heap, (count, self.seq, value))
+            return
+        heap = self.heap
+        while True:
+            c, _, v = heap[0]
+            if counts[v] == c:
+                break
+            heapq.heapreplace(heap, (counts[v], self.seq, v))
+            self.seq += 1
+        del counts[v]
+        del self.errors[v]
+        counts[value] = c + count
+        self.errors[value] = c
+        heapq.heapreplace(heap, (c + count, self.seq, value))
+
+    def _floor(self):
+        # Largest count an untracked value could have.
+        return min(self.counts.values()) if len(self.counts) >= self.k else 0
+
+    def merge(self, other):
+        floor_a, floor_b = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for v in list(self.counts) + [v for v in other.counts if v not in self.counts]:
+            counts[v] = self.counts.get(v, floor_a) + other.counts.get(v, floor_b)
+            errors[v] = self.errors.get(v, floor_a) + other.errors.get(v, floor_b)
+        keep = heapq.nlargest(self.k, counts, key=counts.get)
+        self.counts = {v: counts[v] for v in keep}
+        self.errors = {v: errors[v] for v in keep}
+        self.heap = [(c, i, v) for i, (v, c) in enumerate(self.counts.items())]
+        heapq.heapify(self.heap)
+        self.seq = len(self.heap)
+
+    def top(self, n=None):
+        """[(value, count, error), ...] by descending count, earliest tracked first on ties."""
+        items = sorted(self.counts, key=self.counts.get, reverse=True)[:n]
+        return [(v, self.counts[v], self.errors[v]) for v in items]
+
+
+class CategoricalSketch:
+    """Approximate stand-in for the Counter behind stats_categorical."""
+
+    __slots__ = ('n', 'distinct', 'heavy')
+
+    def __init__(self, p=DEFAULT_PRECISION, k=DEFAULT_TOP_K):
+        self.n = 0
+        self.distinct = HyperLogLog(p)
+        self.heavy = SpaceSaving(k)
+
+    def add(self, value):
+        self.n += 1
+        self.distinct.add(value)
+        self.heavy.add(value)
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        self.n += other.n
+        self.distinct.merge(other.distinct)
+        self.heavy.merge(other.heavy)
+
+    def top(self, n=None):
+        return self.heavy.top(n)
+
+    def result(self):
+        # Same keys as stats_categorical; unique and freq are estimates.
+        top = self.heavy.top(1)
+        value, freq = (top[0][0], top[0][1]) if top else (None, 0)
+        return {
+            'count': self.n,
+            'unique': self.distinct.count(),
+            'top': value,
+            'freq': freq
+        }
+
+
+def compactor_capacity(k, height, level):
+    """Values a QuantileSketch level may hold before it is compacted."""
+    return max(2, math.ceil(k * QUANTILE_SHRINK ** (height - level - 1)))
+
+
+def compaction_offset(n, level):
+    """0 or 1, pseudo-random in (n, level): which half of a level is promoted."""
+    return ((n * 0x9E3779B97F4A7C15 + level) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF) >> 63
+
+
+def sorted_quantile(values, q):
+    """q-quantile of a sorted list, interpolated linearly like numpy / pandas."""
+    pos = q * (len(values) - 1)
+    lo = int(pos)
+    below = values[lo]
+    if lo + 1 == len(values):
+        return below
+    return below + (values[lo + 1] - below) * (pos - lo)
+
+
+def interpolate(values, ends, q):
+    """sorted_quantile for weighted values; ends[i] is the rank just past values[i]."""
+    pos = q * (ends[-1] - 1)
+    lo = math.floor(pos)
+    below = values[bisect.bisect_right(ends, lo)]
+    above = values[bisect.bisect_right(ends, math.ceil(pos))]
+    return below + (above - below) * (pos - lo)
+
+
+class QuantileSketch:
+    """Mergeable quantile estimates for a stream of numbers (Karnin, Lang & Liberty)."""
+
+    # levels[h] holds values that each stand for 2**h inputs. A level over its
+    # capacity (compactor_capacity) is sorted and every other value moves up a
+    # level, starting from the first or the second (compaction_offset) so that
+    # neither half is favoured; an odd value out stays behind. Until the first
+    # compaction level 0 holds every value and quantiles are exact.
+
+    __slots__ = ('k', 'n', 'levels')
+
+    def __init__(self, k=DEFAULT_QUANTILE_K):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+
+    def add(self, x):
+        level = self.levels[0]
+        level.append(x)
+        self.n += 1
+        if len(level) > self.k:
+            self._compress()
+
+    def update(self, values):
+        for x in values:
+            self.add(x)
+
+    def _compress(self):
+        levels = self.levels
+        for h, level in enumerate(levels):
+            if len(level) <= compactor_capacity(self.k, len(levels), h):
+                continue
+            if h + 1 == len(levels):
+                levels.append([])
+            level.sort()
+            odd = [level.pop()] if len(level) % 2 else []
+            levels[h + 1].extend(level[compaction_offset(self.n, h)::2])
+            levels[h] = odd
+
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError('cannot merge quantile sketches with different k')
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, values in zip(self.levels, other.levels):
+            level.extend(values)
+        self.n += other.n
+        self._compress()
+
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def quantiles(self, qs):
+        """Estimates for each q in qs (0 <= q <= 1), or None for an empty sketch."""
+        if not self.n:
+            return [None for _ in qs]
+        if len(self.levels) == 1:
+            values = sorted(self.levels[0])
+            return [sorted_quantile(values, q) for q in qs]
+        weighted = sorted((x, 1 << h) for h, level in enumerate(self.levels) for x in level)
+        values = [x for x, _ in weighted]
+        ends = list(itertools.accumulate(w for _, w in weighted))
+        return [interpolate(values, ends, q) for q in qs]
@@ -0,0 +1,171 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Machine-readable statistics output shared by the three engines. Every engine
+# writes the same records, one per (grouping, group key, column), so that
+# downstream jobs can load a run without parsing the text reports:
+#   dataset, engine          which data and which script produced the record
+#   grouping                 the key columns joined by ',' ('' for the overall stats)
+#   key                      the group's key values as strings ([] overall)
+#   column                   the summarized column
+#   count, mean, std, min, p25, p50, p75, max    numeric columns
+#   count, unique, top, freq                     categorical columns
+# Statistics that do not apply, or that an engine does not compute, are null;
+# key columns are not summarized within their own grouping, numeric ids are
+# numeric in every engine and top is the smallest of the most frequent values.
+# Files ending in .parquet are written with polars; anything else is JSON
+# Lines, which only needs the standard library.
+
+import json
+import math
+
+FIELDS = ('dataset', 'engine', 'grouping', 'key', 'column',
+          'count', 'mean', 'std', 'min', 'p25', 'p50', 'p75', 'max', 'unique', 'top', 'freq')
+STAT_FIELDS = FIELDS[5:]
+# describe()-style statistic names used by the engines -> record field names
+RENAMES = {'25%': 'p25', '50%': 'p50', '75%': 'p75'}
+DESCRIBE_NAMES = {field: name for name, field in RENAMES.items()}
+INT_FIELDS = ('count', 'unique', 'freq')
+TEXT_FIELDS = ('top',)
+
+
+def parquet_schema():
+    import polars as pl
+    schema = {'dataset': pl.Utf8, 'engine': pl.Utf8, 'grouping': pl.Utf8,
+              'key': pl.List(pl.Utf8), 'column': pl.Utf8}
+    schema.update({f: pl.Int64 if f in INT_FIELDS else pl.Utf8 if f in TEXT_FIELDS else pl.Float64
+                   for f in STAT_FIELDS})
+    return schema
+
+
+def clean(value, field):
+    # One statistic as a JSON / Parquet value: NaN becomes null, counts ints,
+    # the top value text, and numpy scalars plain Python numbers.
+    if value is None:
+        return None
+    if field in TEXT_FIELDS:
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return value if isinstance(value, str) else str(value)
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return int(value) if field in INT_FIELDS else value
+
+
+def _values(stats, n):
+    # stats (describe()-style or record field names -> values) as one cleaned
+    # list of n values per record field, null where a statistic is missing.
+    # A column with no values in a group (count 0) has every other statistic
+    # null, whether the engine saw it as numeric or categorical there.
+    stats = {RENAMES.get(name, name): values for name, values in stats.items()}
+    values = {field: [clean(v, field) for v in stats[field]] if field in stats else [None] * n
+              for field in STAT_FIELDS}
+    for i, count in enumerate(values['count']):
+        if count == 0:
+            for field in STAT_FIELDS[1:]:
+                values[field][i] = None
+    return values
+
+
+def _records(dataset, engine, group, keys, columns, values):
+    head = {'dataset': dataset, 'engine': engine, 'grouping': group}
+    for i, (key, column) in enumerate(zip(keys, columns)):
+        record = dict(head, key=key, column=column)
+        for field in STAT_FIELDS:
+            record[field] = values[field][i]
+        yield record
+
+
+def records(dataset, engine, grouping, keys, columns, stats):
+
+    # The records StatsWriter.write would write for one batch, as a list of
+    # dicts (same arguments after dataset and engine), for serving them
+    # without a file.
+
+    keys = [[str(k) for k in key] for key in keys]
+    return list(_records(dataset, engine, ','.join(grouping), keys, columns, _values(stats, len(columns))))
+
+
+class StatsWriter:
+    """Writes statistics records to a JSON Lines or Parquet file, a batch at a time."""
+
+    # JSON Lines batches are written out as they come; Parquet batches are
+    # kept as columnar polars frames and written in one go by close().
+
+    def __init__(self, path, dataset, engine):
+        self.path = path
+        self.dataset = dataset
+        self.engine = engine
+        self.parquet = path.endswith('.parquet')
+        self.batches = []
+        self.out = None if self.parquet else open(path, 'w', encoding='utf-8', buffering=1 << 20)
+
+    def write(self, grouping, keys, columns, stats):
+
+        # One batch of records for a grouping (a list of key column names):
+        # keys[i] and columns[i] name record i, and stats maps statistic names
+        # (describe()-style or record field names) to one value per record.
+        # Statistics missing from stats are written as null.
+
+        values = _values(stats, len(columns))
+        keys = [[str(k) for k in key] for key in keys]
+        group = ','.join(grouping)
+        if self.parquet:
+            import polars as pl
+            n = len(columns)
+            self.batches.append(pl.DataFrame({
+                'dataset': [self.dataset] * n, 'engine': [self.engine] * n, 'grouping': [group] * n,
+                'key': keys, 'column': list(columns), **values,
+            }, schema=parquet_schema()))
+            return
+        lines = [json.dumps(record, ensure_ascii=False)
+                 for record in _records(self.dataset, self.engine, group, keys, columns, values)]
+        if lines:
+            self.out.write('\n'.join(lines) + '\n')
+
+    def write_dicts(self, grouping, items, batch=50_000):
+
+        # Records from (key, {column: stats dict}) pairs as the pure Python
+        # engine produces them (describe()-style stats names), written
+        # `batch` records at a time. The grouping's own key columns are left
+        # out, as the other engines do not summarize them.
+
+        rows = []
+        for key, by_column in items:
+            rows.extend((key, column, col_stats) for column, col_stats in by_column.items()
+                        if column not in grouping)
+            if len(rows) >= batch:
+                self._write_rows(grouping, rows)
+                rows = []
+        self._write_rows(grouping, rows)
+
+    def _write_rows(self, grouping, rows):
+        names = [DESCRIBE_NAMES.get(field, field) for field in STAT_FIELDS]
+        self.write(grouping, [key for key, _, _ in rows], [column for _, column, _ in rows],
+                   {name: [col_stats.get(name) for _, _, col_stats in rows] for name in names})
+
+    def close(self):
+        if self.parquet:
+            import polars as pl
+            frame = pl.concat(self.batches) if self.batches else pl.DataFrame(schema=parquet_schema())
+            frame.write_parquet(self.path)
+            self.batches = []
+        elif self.out is not None:
+            self.out.close()
+            self.out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_stats(path):
+    """Records of a file written by StatsWriter, as a list of dicts."""
+    if path.endswith('.parquet'):
+        import polars as pl
+        return pl.read_parquet(path).to_dicts()
+    with open(path, encoding='utf-8') as fh:
+        return [json.loads(line) for line in fh]
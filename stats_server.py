@@ -0,0 +1,322 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Local statistics query service. Loads each dataset once, keeps it in memory
+# as a polars DataFrame (columnar, cleaned as polars_stats.py cleans it and
+# read from the same cache), and answers overall and per-group queries over
+# HTTP with the records of stats_output.py, so looking up one page_id or one
+# Facebook_Id does not re-read the CSV or recompute every group.
+#
+#   python stats_server.py fb_ads fb_posts --port 8765
+#   python stats_server.py all --socket /tmp/stats.sock
+#
+#   GET /datasets                                   loaded datasets, rows, columns, key sets, cache
+#   GET /stats/fb_ads                               overall statistics
+#   GET /stats/fb_ads?by=page_id                    every page_id group
+#   GET /stats/fb_ads?by=page_id&key=123            one group
+#   GET /stats/fb_ads?by=page_id,ad_id&key=123&key=9   one group of a multi-column key set
+#
+# Responses are JSON: a list of records (dataset, engine, grouping, key, column
+# and the statistics), or {"error": ...} with a 4xx status. Key values are
+# matched as the records print them (str of the value, "None" for nulls).
+#
+# The server is one asyncio event loop; every query runs in a thread pool
+# (polars releases the GIL while it computes), so requests are served
+# concurrently. For a single-group lookup each key set gets, on first use, a
+# copy of the dataset sorted by its keys and the row range of every group, so
+# a group is a zero-copy slice summarized with the same summary_exprs as the
+# polars engine. Results are kept in an LRU cache (--cache-size entries);
+# identical queries arriving together share one computation.
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import polars as pl
+
+from cache import CACHE_DIR
+from dataset_registry import DATASETS, DATA_DIR, default_path
+from polars_stats import (CATEGORICAL_STATS, NUMERIC_STATS, group_columns, group_query, load_cached,
+                          long_summary, overall_summary)
+from stats_output import records
+
+ENGINE = 'polars'
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class QueryError(Exception):
+    """A query the server cannot answer; status is the HTTP status to reply with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """The last maxsize results, least recently used evicted first."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        if key not in self.items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def discard(self, key):
+        self.items.pop(key, None)
+
+    def info(self):
+        return {'entries': len(self.items), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+# Records of a long_summary (polars_stats.long_summary) for grouping keys
+def summary_records(dataset, summary, keys):
+    stat_names = [s for s in dict.fromkeys(NUMERIC_STATS + CATEGORICAL_STATS) if s in summary.columns]
+    return records(dataset, ENGINE, keys, summary.select(keys).rows() if keys else [()] * len(summary),
+                   summary['column'], {s: summary[s] for s in stat_names})
+
+
+class GroupIndex:
+    """A dataset sorted by one key set, with the row range of every group."""
+
+    def __init__(self, df, keys):
+        self.keys = keys
+        self.frame = df.sort(keys).rechunk()
+        sizes = self.frame.group_by(keys, maintain_order=True).agg(pl.len().alias('rows'))
+        names = sizes.select(pl.col(k).cast(pl.Utf8).fill_null('None') for k in keys).rows()
+        self.ranges = {}
+        offset = 0
+        for name, rows in zip(names, sizes['rows']):
+            self.ranges[name] = (offset, rows)
+            offset += rows
+
+    def group(self, key):
+        # The rows of one group (key: its values as strings), or None
+        found = self.ranges.get(tuple(key))
+        return None if found is None else self.frame.slice(*found)
+
+
+class StatsService:
+    """The loaded datasets and the queries on them, shared by all connections."""
+
+    def __init__(self, frames, cache_size=1024, workers=None, index_size=8):
+        self.frames = frames
+        self.cache = LRUCache(cache_size)
+        # each GroupIndex holds a sorted copy of its dataset, so only a few are kept
+        self.indexes = LRUCache(index_size)
+        self.pool = ThreadPoolExecutor(workers)
+
+    async def shared(self, table, key, compute):
+
+        # compute() in the thread pool, its result stored in table (an
+        # LRUCache) under key. The pending task itself is stored, so concurrent
+        # callers of the same key wait for one computation; a failed one is
+        # dropped to be retried.
+
+        task = table.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().run_in_executor(self.pool, compute)
+            table.put(key, task)
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            table.discard(key)
+            raise
+
+    def frame(self, dataset):
+        if dataset not in self.frames:
+            raise QueryError(404, f'unknown dataset {dataset!r} (loaded: {", ".join(self.frames)})')
+        return self.frames[dataset]
+
+    def describe(self):
+        return {
+            'datasets': {name: {'rows': df.height, 'columns': df.columns, 'keys': DATASETS[name]['keys']}
+                         for name, df in self.frames.items()},
+            'cache': self.cache.info(),
+        }
+
+    async def index(self, dataset, keys):
+        df = self.frame(dataset)
+        return await self.shared(self.indexes, (dataset, tuple(keys)), lambda: GroupIndex(df, keys))
+
+    async def stats(self, dataset, keys=(), key=None):
+
+        # Records of the overall statistics (no keys), of every group of keys
+        # (key None) or of the one group whose key values are key.
+
+        df = self.frame(dataset)
+        keys = list(keys)
+        missing = [k for k in keys if k not in df.columns]
+        if missing:
+            raise QueryError(400, f'{dataset} has no column {", ".join(missing)}')
+        if key is not None and len(key) != len(keys):
+            raise QueryError(400, f'by={",".join(keys)} needs {len(keys)} key values, got {len(key)}')
+        if not keys:
+            compute = lambda: summary_records(dataset, overall_summary(df), [])
+        elif key is None:
+            compute = lambda: summary_records(
+                dataset, long_summary(group_query(df, keys).collect(), keys, *group_columns(df, keys)), keys)
+        else:
+            index = await self.index(dataset, keys)
+            rows = index.group(key)
+            if rows is None:
+                raise QueryError(404, f'no {",".join(keys)} group {",".join(key)} in {dataset}')
+            compute = lambda: summary_records(
+                dataset, long_summary(group_query(rows, keys).collect(), keys, *group_columns(df, keys)), keys)
+        return await self.shared(self.cache, (dataset, tuple(keys), None if key is None else tuple(key)), compute)
+
+    async def handle(self, method, target):
+        # (status, JSON-able body) of one request
+        if method != 'GET':
+            raise QueryError(405, 'only GET is supported')
+        url = urlsplit(target)
+        parts = [p for p in url.path.split('/') if p]
+        query = parse_qs(url.query)
+        if parts == ['datasets']:
+            return self.describe()
+        if len(parts) == 2 and parts[0] == 'stats':
+            keys = [k for by in query.get('by', []) for k in by.split(',') if k]
+            key = query.get('key')
+            if key is not None and not keys:
+                raise QueryError(400, 'key needs by')
+            return await self.stats(parts[1], keys, key)
+        raise QueryError(404, f'no such path {url.path}')
+
+
+async def read_request(reader):
+    # (method, target, headers) of the next HTTP request, or None at EOF
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length') or 0)
+    if length:
+        await reader.readexactly(length)
+    return method, target, headers
+
+
+def response(status, body, keep_alive):
+    payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    head = (f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(payload)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('latin-1') + payload
+
+
+def connection_handler(service):
+
+    # asyncio stream handler serving HTTP/1.1 requests on one connection
+    # (kept alive until the client closes it or asks to) from service.
+
+    async def serve(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    writer.write(response(400, {'error': 'malformed request'}, False))
+                    break
+                if request is None:
+                    break
+                method, target, headers = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, body = 200, await service.handle(method, target)
+                except QueryError as exc:
+                    status, body = exc.status, {'error': str(exc)}
+                except Exception as exc:
+                    status, body = 500, {'error': f'{type(exc).__name__}: {exc}'}
+                writer.write(response(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return serve
+
+
+async def serve(service, host='127.0.0.1', port=8765, socket_path=None):
+    handler = connection_handler(service)
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, socket_path)
+        where = socket_path
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        where = f'http://{host}:{port}'
+    # serve until SIGINT / SIGTERM
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+    print(f"Serving {', '.join(service.frames)} on {where}", flush=True)
+    async with server:
+        await stop.wait()
+
+
+def load_frames(paths, cache_dir=CACHE_DIR):
+    # dataset name -> cleaned polars DataFrame, loaded in parallel
+    with ThreadPoolExecutor(len(paths) or 1) as pool:
+        loaded = {name: pool.submit(load_cached, path, cache_dir) for name, path in paths.items()}
+        return {name: future.result().rechunk() for name, future in loaded.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve statistics of the election datasets from memory.')
+    parser.add_argument('datasets', nargs='+', choices=sorted(DATASETS) + ['all'])
+    parser.add_argument('-i', '--input', help='CSV to serve (one dataset only)')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding the default CSV files')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', metavar='PATH', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--cache-size', type=int, default=1024, help='query results kept in memory')
+    parser.add_argument('--workers', type=int, default=None, help='threads running queries')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='where parsed tables are cached')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the CSV')
+    args = parser.parse_args(argv)
+
+    datasets = sorted(DATASETS) if 'all' in args.datasets else list(dict.fromkeys(args.datasets))
+    if args.input and len(datasets) > 1:
+        parser.error('--input needs a single dataset')
+    paths = {name: args.input or default_path(name, args.data_dir) for name in datasets}
+    for path in paths.values():
+        if not os.path.exists(path):
+            parser.error(f'{path} does not exist')
+    frames = load_frames(paths, None if args.no_cache else args.cache_dir)
+    service = StatsService(frames, args.cache_size, args.workers)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket))
+    finally:
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
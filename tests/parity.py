@@ -0,0 +1,89 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Helpers shared by the parity tests: small synthetic versions of the three
+# datasets (a few columns of each kind, blank cells, quoted commas and
+# newlines, tied most frequent values, one-row groups) and the comparison of
+# two runs' statistics records.
+
+import csv
+import json
+import math
+import random
+
+from run_analysis import run
+
+# dataset -> (key columns, text columns, numeric columns)
+COLUMNS = {
+    'fb_ads': (['page_id', 'ad_id'], ['currency', 'demographic_distribution', 'delivery_platform', 'month_year'],
+               ['estimated_spend', 'attack_msg_type_illuminating', 'incivility_illuminating']),
+    'fb_posts': (['Facebook_Id', 'post_id'], ['page_category', 'type', 'month_year'],
+                 ['Likes', 'Shares', 'attack_msg_type_illuminating', 'incivility_illuminating']),
+    'twitter': (['id', 'url'], ['source', 'lang', 'month_year'],
+                ['likeCount', 'viewCount', 'attack_msg_type_illuminating', 'incivility_illuminating']),
+}
+TEXT_VALUES = ['alpha', 'beta', 'gamma', 'Facebook, Instagram', 'line one\nline two', 'delta']
+
+
+def write_dataset(path, dataset, rows=600, groups=40, seed=0):
+
+    # A CSV shaped like `dataset`: `groups` values of the first key column,
+    # a second key mostly unique per row (some repeated, so some two-column
+    # groups have several rows), about 5% blank cells and a blank row.
+
+    rng = random.Random(seed)
+    keys, texts, numbers = COLUMNS[dataset]
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(keys + texts + numbers)
+        for i in range(rows):
+            if i == rows // 2:
+                writer.writerow([''] * (len(keys) + len(texts) + len(numbers)))
+            first = str(rng.randrange(groups))
+            second = str(7_000_000_000 + (i - i % 3 if i % 7 == 0 else i))
+            if dataset == 'twitter':
+                second = f'https://x.com/user/status/{second}'
+            row = [first, second]
+            for _ in texts:
+                row.append('' if rng.random() < 0.05 else rng.choice(TEXT_VALUES))
+            for col in numbers:
+                if rng.random() < 0.05:
+                    row.append('')
+                elif col.endswith('_illuminating'):
+                    row.append(str(int(rng.random() < 0.2)))
+                else:
+                    row.append(str(rng.randrange(1000)))
+            writer.writerow(row)
+    return path
+
+
+def run_records(tmp_path, dataset, engine, csv_path, name=None, **options):
+    # The records of one run_analysis.run, keyed by (grouping, key, column)
+    stats_path = tmp_path / f'{name or engine}.jsonl'
+    run(dataset, engine, str(csv_path), stats_path=str(stats_path), text_report=False, **options)
+    return load_records(stats_path)
+
+
+def load_records(path):
+    with open(path, encoding='utf-8') as fh:
+        records = [json.loads(line) for line in fh]
+    by_name = {}
+    for record in records:
+        name = (record.pop('grouping'), tuple(record.pop('key')), record.pop('column'))
+        assert name not in by_name, f'duplicate record {name}'
+        record.pop('dataset')
+        record.pop('engine')
+        by_name[name] = record
+    return by_name
+
+
+def assert_same_records(got, expected, rel=1e-9):
+    # Same record set and the same statistics, floats up to rel
+    assert sorted(got) == sorted(expected)
+    for name, record in expected.items():
+        for field, value in record.items():
+            other = got[name][field]
+            if isinstance(value, float) and isinstance(other, (int, float)):
+                assert math.isclose(other, value, rel_tol=rel, abs_tol=1e-12), (name, field, other, value)
+            else:
+                assert other == value, (name, field, other, value)
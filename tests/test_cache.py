@@ -0,0 +1,52 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# The on-disk cache (cache.py): hits while the source is unchanged, rebuilds
+# when its content changes.
+
+import os
+
+import cache
+
+
+def cached_text(path, cache_dir, builds):
+    def build():
+        builds.append(1)
+        with open(path, encoding='utf-8') as fh:
+            return fh.read()
+    return cache.cached(str(path), 'text', build, cache.write_pickle, cache.read_pickle, str(cache_dir))
+
+
+def test_hit_while_unchanged_and_rebuild_on_change(tmp_path):
+    path, builds = tmp_path / 'data.csv', []
+    path.write_text('a\n1\n')
+    assert cached_text(path, tmp_path / 'cache', builds) == 'a\n1\n'
+    assert cached_text(path, tmp_path / 'cache', builds) == 'a\n1\n'
+    assert len(builds) == 1
+    # touched, same content: still a hit
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cached_text(path, tmp_path / 'cache', builds) == 'a\n1\n'
+    assert len(builds) == 1
+    # same size and mtime kept by the writer, new content: rebuilt by hash
+    path.write_text('a\n2\n')
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    assert cached_text(path, tmp_path / 'cache', builds) == 'a\n2\n'
+    assert len(builds) == 2
+
+
+def test_change_during_build_is_not_cached(tmp_path):
+    path, builds = tmp_path / 'data.csv', []
+    path.write_text('a\n1\n')
+    st = os.stat(path)
+
+    def build():
+        # the file is rewritten (same size, same mtime) while it is being read
+        builds.append(1)
+        path.write_text('a\n2\n')
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        return 'a\n1\n'
+
+    cache.cached(str(path), 'text', build, cache.write_pickle, cache.read_pickle, str(tmp_path / 'cache'))
+    assert cached_text(path, tmp_path / 'cache', builds) == 'a\n2\n'
+    assert len(builds) == 2
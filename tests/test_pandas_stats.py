@@ -0,0 +1,61 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# The pandas engine's execution modes against its in-memory run.
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from parity import assert_same_records, run_records, write_dataset
+from run_analysis import run
+
+DATASETS = ['fb_ads', 'fb_posts', 'twitter']
+
+
+def overall_section(path):
+    # The report up to the rule opening its first grouped section
+    return path.read_text(encoding='utf-8').split('=' * 60)[:3]
+
+
+@pytest.mark.parametrize('dataset', DATASETS)
+def test_chunked_matches_in_memory(tmp_path, dataset):
+    # 180 rows: every group, the whole file included, fits in one quantile
+    # sketch level, so the chunked quartiles are exact too
+    csv_path = write_dataset(tmp_path / f'{dataset}.csv', dataset, rows=180)
+    expected = run_records(tmp_path, dataset, 'pandas', csv_path)
+    got = run_records(tmp_path, dataset, 'pandas', csv_path, name='chunked', chunksize=50)
+    # merged variances of 10-digit ids differ from the two-pass ones past 1e-9
+    assert_same_records(got, expected, rel=1e-6)
+    one_shot, chunked = tmp_path / 'one_shot.txt', tmp_path / 'chunked.txt'
+    run(dataset, 'pandas', str(csv_path), str(one_shot))
+    run(dataset, 'pandas', str(csv_path), str(chunked), chunksize=50)
+    assert overall_section(chunked) == overall_section(one_shot)
+
+
+@pytest.mark.parametrize('dataset', DATASETS)
+def test_spilled_matches_in_memory(tmp_path, dataset):
+    csv_path = write_dataset(tmp_path / f'{dataset}.csv', dataset, rows=180)
+    expected = run_records(tmp_path, dataset, 'pandas', csv_path)
+    assert_same_records(run_records(tmp_path, dataset, 'pandas', csv_path, name='spilled', max_groups=40), expected)
+    one_shot, spilled = tmp_path / 'one_shot.txt', tmp_path / 'spilled.txt'
+    run(dataset, 'pandas', str(csv_path), str(one_shot))
+    run(dataset, 'pandas', str(csv_path), str(spilled), max_groups=40)
+    assert spilled.read_text(encoding='utf-8') == one_shot.read_text(encoding='utf-8')
+
+
+def test_spilled_blocks_merge_in_key_order(tmp_path):
+    import pandas_stats
+    csv_path = write_dataset(tmp_path / 'fb_ads.csv', 'fb_ads')
+    df = pandas_stats.read_dataset(str(csv_path), pandas_stats.SCHEMAS['fb_ads'])
+    keys = ['page_id', 'ad_id']
+    frame = pandas_stats.grouped_frame(df, keys)
+    paths = []
+    for p in range(3):
+        part = pandas_stats.grouped_frame(df[df['page_id'] % 3 == p], keys)
+        paths.append(str(tmp_path / f'result{p}.pkl'))
+        pandas_stats.SpilledFrame.write_partition(part, paths[-1], block=20)
+    spilled = pandas_stats.SpilledFrame(paths, frame.iloc[:0], list(frame.columns))
+    blocks = list(spilled.blocks(block=50))
+    assert len(blocks) > 1
+    pd.testing.assert_frame_equal(pd.concat(blocks), frame)
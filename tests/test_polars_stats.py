@@ -0,0 +1,47 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# The polars engine's report and execution modes.
+
+import pytest
+
+pytest.importorskip('polars')
+
+from parity import assert_same_records, load_records, run_records, write_dataset
+from run_analysis import run, run_polars_batch
+
+
+def test_report_shows_every_group(tmp_path):
+    csv_path = write_dataset(tmp_path / 'fb_ads.csv', 'fb_ads')
+    records = run_records(tmp_path, 'fb_ads', 'polars', csv_path)
+    report_path = tmp_path / 'report.txt'
+    run('fb_ads', 'polars', str(csv_path), str(report_path))
+    report = report_path.read_text(encoding='utf-8')
+    assert '…' not in report
+    # one table row per record, plus the header rows
+    assert report.count('\n│') >= len(records)
+
+
+@pytest.mark.parametrize('sink_format', ['parquet', 'csv'])
+def test_sunk_groupings_match_in_memory(tmp_path, sink_format):
+    csv_path = write_dataset(tmp_path / 'fb_posts.csv', 'fb_posts')
+    expected = run_records(tmp_path, 'fb_posts', 'polars', csv_path)
+    got = run_records(tmp_path, 'fb_posts', 'polars', csv_path, 'sunk',
+                      sink_dir=str(tmp_path / 'sink'), sink_format=sink_format)
+    assert_same_records(got, expected)
+    assert sorted(p.suffix for p in (tmp_path / 'sink').iterdir()) == [f'.{sink_format}'] * 2
+
+
+def test_batch_matches_separate_runs(tmp_path):
+    jobs, expected = {}, {}
+    for dataset in ['fb_ads', 'fb_posts', 'twitter']:
+        csv_path = write_dataset(tmp_path / f'{dataset}.csv', dataset)
+        report_path = tmp_path / f'{dataset}.txt'
+        run(dataset, 'polars', str(csv_path), str(report_path), stats_path=str(tmp_path / f'{dataset}.jsonl'))
+        expected[dataset] = (report_path.read_text(encoding='utf-8'), load_records(tmp_path / f'{dataset}.jsonl'))
+        jobs[dataset] = (str(csv_path), str(tmp_path / f'batch_{dataset}.txt'), str(tmp_path / f'batch_{dataset}.jsonl'))
+    run_polars_batch(jobs)
+    for dataset, (_, report_path, stats_path) in jobs.items():
+        report, records = expected[dataset]
+        assert open(report_path, encoding='utf-8').read() == report
+        assert_same_records(load_records(stats_path), records)
@@ -0,0 +1,157 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# The pure engine's statistics helpers and accumulators.
+
+import math
+import random
+import statistics
+
+import pytest
+
+import pure_python_stats as pps
+from parity import assert_same_records, run_records, write_dataset
+from run_analysis import run
+
+
+def test_stats_numeric_rounds_and_uses_the_population_std():
+    stats = pps.stats_numeric(['1', '2', '4'])
+    assert stats == {'count': 3, 'mean': 2.3333, 'min': 1.0, 'max': 4.0, 'std': 1.2472,
+                     '25%': 1.5, '50%': 2.0, '75%': 3.0}
+
+
+def test_numeric_records_are_unrounded_with_the_sample_std():
+    rng = random.Random(1)
+    nums = [rng.random() for _ in range(50)]
+    record = pps.stats_floats(nums).record
+    assert math.isclose(record['mean'], statistics.fmean(nums))
+    assert math.isclose(record['std'], statistics.stdev(nums))
+    assert pps.stats_floats([3.0]).record['std'] is None
+
+
+def accumulate(nums):
+    acc = pps.ColumnAccumulator()
+    for x in nums:
+        acc.add(repr(x))
+    return acc
+
+
+def test_streamed_mean_is_sum_over_n():
+    # 1/32, which Welford's running mean overshoots in this order and rounds up
+    nums = [1.0] * 5 + [0.0] * 155
+    random.Random(1).shuffle(nums)
+    assert accumulate(nums).result() == pps.stats_floats(nums)
+    assert pps.stats_floats(nums)['mean'] == 0.0312
+
+
+def test_stream_summary_matches_overall_summary(tmp_path):
+    rng = random.Random(2)
+    path = tmp_path / 'data.csv'
+    lines = ['a,b,c'] + [f'{rng.randrange(2)},{rng.random() * 1e9:.3f},{rng.choice("xyz")}' for _ in range(150)]
+    path.write_text('\n'.join(lines) + '\n')
+    header, rows = pps.load_csv(str(path))
+    assert pps.stream_summary(str(path)) == (header, pps.overall_summary(header, rows))
+
+
+def test_merged_mean_is_sum_over_n():
+    nums = [1.0] * 5 + [0.0] * 155
+    random.Random(1).shuffle(nums)
+    merged = accumulate(nums[:70])
+    for part in (nums[70:71], nums[71:]):
+        merged.merge(accumulate(part))
+    assert merged.result() == pps.stats_floats(nums)
+    assert merged.result().record['mean'] == sum(nums) / len(nums)
+
+
+def test_grouped_summaries_match_stats_numeric():
+    rng = random.Random(3)
+    rows = [[rng.choice('ab'), str(rng.randrange(2))] for _ in range(400)]
+    (groups,) = pps.grouped_summaries(['key', 'value'], rows, [['key']])
+    for (key,), stats in groups.items():
+        assert stats['value'] == pps.stats_numeric([v for k, v in rows if k == key])
+
+
+def test_summarize_groups_matches_grouped_summary(tmp_path):
+    rng = random.Random(4)
+    path = tmp_path / 'data.csv'
+    keys = ['1', ' 1', '2', '', '"3\n"']
+    lines = ['key,value,text'] + [f'{rng.choice(keys)},{rng.randrange(100)},{rng.choice("xy")}' for _ in range(200)]
+    path.write_text('\n'.join(lines) + '\n')
+    header, rows = pps.load_csv(str(path))
+    expected = pps.grouped_summary(header, rows, ['key'])
+    for key in ['1', ' 1', '', '3\n']:
+        assert pps.summarize_groups(str(path), ['key'], [key], cache_dir=str(tmp_path)) == {(key,): expected[(key,)]}
+    assert pps.summarize_groups(str(path), ['key'], ['1', '2', '4'], cache_dir=None) == \
+        {k: v for k, v in expected.items() if k in [('1',), ('2',)]}
+
+
+def test_shards_end_on_record_boundaries(tmp_path):
+    path = str(write_dataset(tmp_path / 'fb_ads.csv', 'fb_ads', rows=180))
+    header, rows = pps.load_csv(path)
+    assert any('\n' in cell for row in rows for cell in row)
+    for shards in range(1, 13):
+        header_end, ranges = pps.shard_offsets(path, shards)
+        assert [row for start, end in ranges for row in pps.iter_shard_rows(path, start, end)] == rows
+
+
+@pytest.mark.parametrize('dataset', ['fb_ads', 'twitter'])
+def test_sharded_run_matches_in_memory(tmp_path, dataset):
+    csv_path = write_dataset(tmp_path / f'{dataset}.csv', dataset, rows=180)
+    expected = run_records(tmp_path, dataset, 'pure', csv_path)
+    # merged running variances of the 10-digit ids differ in the 9th digit
+    assert_same_records(run_records(tmp_path, dataset, 'pure', csv_path, 'sharded', workers=3), expected, 1e-6)
+
+
+def test_sharded_groups_recount_columns_that_turn_to_text(tmp_path):
+    path = tmp_path / 'data.csv'
+    values = [str(i % 7) for i in range(100)] + ['n/a', 'x'] * 50
+    path.write_text('key,mixed\n' + ''.join(f'{i % 3},{v}\n' for i, v in enumerate(values)))
+    header, rows = pps.load_csv(str(path))
+    expected = pps.grouped_summary(header, rows, ['key'])
+    header, levels = pps.parallel_group_accumulators(str(path), [['key']], workers=3)
+    assert {key: acc.result(header) for key, acc in levels[1].items()} == expected
+
+
+def test_incremental_runs_match_in_memory(tmp_path):
+    full = write_dataset(tmp_path / 'full.csv', 'fb_ads', rows=180).read_bytes()
+    path, state = tmp_path / 'fb_ads.csv', str(tmp_path / 'fb_ads.state')
+    # appended in pieces cut at arbitrary bytes, mid-record and inside quotes
+    cuts = sorted(random.Random(5).sample(range(len(full)), 6)) + [len(full)]
+    with open(path, 'wb') as fh:
+        start = 0
+        for cut in cuts:
+            fh.write(full[start:cut])
+            fh.flush()
+            start = cut
+            got = run_records(tmp_path, 'fb_ads', 'pure', path, 'incremental', state_path=state)
+    assert_same_records(got, run_records(tmp_path, 'fb_ads', 'pure', path), 1e-6)
+
+
+def test_incremental_state_of_a_rewritten_file_is_dropped(tmp_path):
+    path, state = tmp_path / 'fb_ads.csv', str(tmp_path / 'fb_ads.state')
+    write_dataset(path, 'fb_ads', rows=180)
+    run_records(tmp_path, 'fb_ads', 'pure', path, 'incremental', state_path=state)
+    write_dataset(path, 'fb_ads', rows=180, seed=1)
+    got = run_records(tmp_path, 'fb_ads', 'pure', path, 'incremental', state_path=state)
+    assert_same_records(got, run_records(tmp_path, 'fb_ads', 'pure', path), 1e-6)
+
+
+@pytest.mark.parametrize('dataset', ['fb_ads', 'fb_posts'])
+def test_spilled_run_matches_in_memory(tmp_path, dataset):
+    csv_path = write_dataset(tmp_path / f'{dataset}.csv', dataset, rows=180)
+    expected = run_records(tmp_path, dataset, 'pure', csv_path)
+    assert_same_records(run_records(tmp_path, dataset, 'pure', csv_path, 'spilled', max_groups=10), expected, 1e-6)
+    # groups come out in the same order, so the text reports are the same
+    one_shot, spilled = tmp_path / 'one_shot.txt', tmp_path / 'spilled.txt'
+    run(dataset, 'pure', str(csv_path), str(one_shot))
+    run(dataset, 'pure', str(csv_path), str(spilled), max_groups=10)
+    assert spilled.read_text() == one_shot.read_text()
+
+
+def test_count_groups_is_exact_within_the_limit(tmp_path):
+    csv_path = str(write_dataset(tmp_path / 'fb_ads.csv', 'fb_ads', rows=180))
+    header, rows = pps.load_csv(csv_path)
+    key_sets = [['page_id'], ['page_id', 'ad_id']]
+    exact = sum(len({tuple(row[header.index(k)] for k in keys) for row in rows}) for keys in key_sets)
+    assert pps.count_groups(csv_path, key_sets, exact) == exact
+    assert pps.count_groups(csv_path, key_sets, 10) > 10
@@ -0,0 +1,44 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# The statistics records (stats_output.py) are one schema across the engines:
+# the same records, with the same values, whichever engine wrote them.
+
+import importlib.util
+
+import pytest
+
+from parity import assert_same_records, run_records, write_dataset
+
+DATASETS = ['fb_ads', 'fb_posts', 'twitter']
+ENGINES = [e for e in ('pandas', 'polars') if importlib.util.find_spec(e) is not None]
+
+
+@pytest.mark.parametrize('dataset', DATASETS)
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engines_write_the_same_records(tmp_path, dataset, engine):
+    csv_path = write_dataset(tmp_path / f'{dataset}.csv', dataset)
+    expected = run_records(tmp_path, dataset, 'pure', csv_path)
+    assert_same_records(run_records(tmp_path, dataset, engine, csv_path), expected)
+
+
+def test_records_leave_out_the_grouping_keys(tmp_path):
+    csv_path = write_dataset(tmp_path / 'fb_ads.csv', 'fb_ads')
+    records = run_records(tmp_path, 'fb_ads', 'pure', csv_path)
+    assert not [name for name in records if name[2] in name[0].split(',')]
+    assert ('', (), 'page_id') in records
+
+
+def test_single_row_groups_have_no_std(tmp_path):
+    csv_path = write_dataset(tmp_path / 'fb_ads.csv', 'fb_ads')
+    records = run_records(tmp_path, 'fb_ads', 'pure', csv_path)
+    singles = [r for (grouping, _, _), r in records.items()
+               if grouping == 'page_id,ad_id' and r['count'] == 1 and r['mean'] is not None]
+    assert singles and all(r['std'] is None for r in singles)
+
+
+def test_top_ties_go_to_the_smallest_value(tmp_path):
+    path = tmp_path / 'fb_ads.csv'
+    path.write_text('page_id,ad_id,currency\n1,10,USD\n1,11,EUR\n1,12,EUR\n1,13,USD\n')
+    for engine in ['pure'] + ENGINES:
+        assert run_records(tmp_path, 'fb_ads', engine, path)[('', (), 'currency')]['top'] == 'EUR'
@@ -0,0 +1,43 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Engine selection for --engine auto and the command line checks around it.
+
+import pytest
+
+import run_analysis
+
+
+def installed(monkeypatch, *engines):
+    monkeypatch.setattr(run_analysis, 'engine_available', lambda engine: engine == 'pure' or engine in engines)
+
+
+def too_big(monkeypatch, path):
+    monkeypatch.setattr(run_analysis, 'total_memory', lambda: path.stat().st_size)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('page_id,ad_id\n1,2\n')
+    return path
+
+
+def test_streaming_runs_polars_out_of_core(monkeypatch, csv_path):
+    installed(monkeypatch, 'polars', 'pandas')
+    too_big(monkeypatch, csv_path)
+    assert run_analysis.choose_engine(str(csv_path), streaming=True) == ('polars', {})
+    assert run_analysis.choose_engine(str(csv_path))[0] == 'pure'
+
+
+def test_streaming_without_polars_does_not_pick_pandas_for_a_big_file(monkeypatch, csv_path):
+    installed(monkeypatch, 'pandas')
+    too_big(monkeypatch, csv_path)
+    assert run_analysis.choose_engine(str(csv_path), streaming=True)[0] == 'pure'
+
+
+def test_sink_dir_without_polars_is_rejected_up_front(monkeypatch, csv_path, tmp_path, capsys):
+    installed(monkeypatch, 'pandas')
+    with pytest.raises(SystemExit):
+        run_analysis.main(['fb_ads', '--input', str(csv_path), '--sink-dir', str(tmp_path / 'out')])
+    assert '--sink-dir needs polars' in capsys.readouterr().err
@@ -0,0 +1,121 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# The bounded-memory sketches (sketches.py) against exact counts, alone and
+# merged from parts.
+
+import random
+from collections import Counter
+
+import pure_python_stats as pps
+from parity import assert_same_records, run_records, write_dataset
+from sketches import DEFAULT_QUANTILE_K, CategoricalSketch, HyperLogLog, QuantileSketch, SpaceSaving, sorted_quantile
+
+
+def test_hyperloglog_is_exact_while_small_and_close_after():
+    small = HyperLogLog()
+    small.merge(HyperLogLog())
+    for i in range(200):
+        small.add(f'v{i % 150}')
+    assert small.count() == 150
+    parts = [HyperLogLog() for _ in range(4)]
+    for i in range(100_000):
+        parts[i % 4].add(i)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert abs(merged.count() - 100_000) < 0.03 * 100_000
+
+
+def test_space_saving_bounds_hold_after_merges():
+    rng = random.Random(6)
+    values = [min(int(rng.paretovariate(1.2)), 5000) for _ in range(50_000)]
+    truth = Counter(values)
+    parts = [SpaceSaving(k=50) for _ in range(5)]
+    for i, v in enumerate(values):
+        parts[i % 5].add(v)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    reported = {v: (count, error) for v, count, error in merged.top()}
+    for v, (count, error) in reported.items():
+        assert count - error <= truth[v] <= count
+    assert all(v in reported for v, n in truth.items() if n > len(values) / 50)
+    assert merged.top(1)[0][0] == truth.most_common(1)[0][0]
+
+
+def test_categorical_sketch_is_exact_for_few_values():
+    values = [random.Random(7).choice('abcdefg') for _ in range(30)] + ['a'] * 10
+    sketch = CategoricalSketch()
+    sketch.update(values[:25])
+    rest = CategoricalSketch()
+    rest.update(values[25:])
+    sketch.merge(rest)
+    assert sketch.result() == pps.stats_categorical(values)
+
+
+def test_approx_run_matches_exact_counts(tmp_path):
+    # 180 rows: fewer distinct values than the HyperLogLog's exact set holds
+    csv_path = write_dataset(tmp_path / 'twitter.csv', 'twitter', rows=180)
+    exact = run_records(tmp_path, 'twitter', 'pure', csv_path)
+    for workers in (1, 3):
+        approx = run_records(tmp_path, 'twitter', 'pure', csv_path, 'approx', approx=True, workers=workers)
+        assert sorted(approx) == sorted(exact)
+        for name, record in exact.items():
+            # numeric columns are not sketched; merged variances differ past 1e-9
+            if record['unique'] is None:
+                assert_same_records({name: approx[name]}, {name: record}, 1e-6)
+                continue
+            fields = ['count', 'unique', 'freq']
+            assert {f: approx[name][f] for f in fields} == {f: record[f] for f in fields}, name
+
+
+def rank_error(values, estimate, q):
+    # How far the estimate's rank is from q, as a fraction of the values
+    below = sum(v < estimate for v in values)
+    at_or_below = sum(v <= estimate for v in values)
+    target = q * (len(values) - 1)
+    return max(0, below - target, target - at_or_below) / len(values)
+
+
+def test_quantile_sketch_is_exact_up_to_k():
+    values = [random.Random(8).gauss(0, 1) for _ in range(DEFAULT_QUANTILE_K)]
+    sketch = QuantileSketch()
+    sketch.update(values[:80])
+    rest = QuantileSketch()
+    rest.update(values[80:])
+    sketch.merge(rest)
+    assert sketch.is_exact()
+    qs = [0, 0.25, 0.5, 0.75, 1]
+    assert sketch.quantiles(qs) == [sorted_quantile(sorted(values), q) for q in qs]
+
+
+def test_merged_quantile_sketches_stay_within_their_rank_error():
+    rng = random.Random(9)
+    values = [rng.lognormvariate(0, 2) for _ in range(20_000)]
+    parts = [QuantileSketch() for _ in range(7)]
+    for i, x in enumerate(values):
+        parts[i % 7].add(x)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.n == len(values) and not merged.is_exact()
+    qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+    for q, estimate in zip(qs, merged.quantiles(qs)):
+        assert rank_error(values, estimate, q) < 0.02, q
+
+
+def test_grouped_quartiles_of_merged_runs_stay_within_the_rank_error(tmp_path):
+    csv_path = write_dataset(tmp_path / 'fb_posts.csv', 'fb_posts', rows=2000, groups=5)
+    header, rows = pps.load_csv(str(csv_path))
+    one_process = run_records(tmp_path, 'fb_posts', 'pure', csv_path)
+    sharded = run_records(tmp_path, 'fb_posts', 'pure', csv_path, 'sharded', workers=3)
+    i = header.index('Likes')
+    for (grouping, key, column), record in sharded.items():
+        if grouping != 'Facebook_Id' or column != 'Likes':
+            continue
+        values = [float(row[i]) for row in rows if row[0] == key[0] and row[i].strip()]
+        assert record['count'] == len(values) > DEFAULT_QUANTILE_K
+        for q, field in [(0.25, 'p25'), (0.5, 'p50'), (0.75, 'p75')]:
+            for result in (record, one_process[(grouping, key, column)]):
+                assert rank_error(values, result[field], q) < 0.02, (key, field)
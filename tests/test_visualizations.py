@@ -0,0 +1,37 @@
+# Aditya Deshmukh
+# SUID: 668192355
+
+# Chart aggregates (Visualizations.py) against the charts drawn from the rows.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('matplotlib')
+
+from matplotlib import cbook
+
+import Visualizations
+
+
+def test_boxes_match_boxplot_stats(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 150
+    frame = pd.DataFrame({
+        'page_id': rng.integers(0, 10, rows),
+        'ad_id': np.arange(rows),
+        'incivility_illuminating': (rng.random(rows) < 0.1).astype(float),
+        'scam_illuminating': rng.normal(0.5, 0.1, rows).round(3),
+        'freefair_illuminating': rng.random(rows),
+        'fraud_illuminating': (rng.random(rows) < 0.3).astype(float),
+    })
+    frame.loc[::17, 'scam_illuminating'] = np.nan
+    path = tmp_path / 'fb_ads.csv'
+    frame.to_csv(path, index=False)
+    boxes = Visualizations.compute_aggregates(str(path), 'fb_ads', chunksize=40)['boxes']
+    assert boxes['incivility_illuminating']['fliers'] == [1.0]
+    for col, box in boxes.items():
+        expected = cbook.boxplot_stats(frame[col].dropna().to_numpy())[0]
+        for stat in ('q1', 'med', 'q3', 'whislo', 'whishi'):
+            assert box[stat] == pytest.approx(expected[stat]), (col, stat)
+        assert box['fliers'] == sorted(set(expected['fliers'].tolist())), col